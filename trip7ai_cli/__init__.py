@@ -0,0 +1,3 @@
+"""trip7ai 数据脚本的统一命令行入口（见 cli.py）"""
+
+__version__ = '0.1.0'
@@ -0,0 +1,7 @@
+import sys
+
+from .cli import main
+
+# 多进程（spawn）的子进程会以 __mp_main__ 重新导入本模块，不能再次执行命令
+if __name__ == '__main__':
+    sys.exit(main())
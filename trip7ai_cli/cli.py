@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+各脚本的统一入口：trip7ai <子命令> [该脚本自己的参数 ...]
+
+  trip7ai check --folder ./data --xlsx
+  trip7ai reschedule --input 副本LLM+data基础.csv --workers 4
+  trip7ai verify --input 副本LLM+data基础_修改.csv --engine numpy
+  trip7ai check --help            # 子命令的参数说明（即原脚本的 --help）
+  trip7ai pipeline pipeline.json  # 按依赖运行多个步骤（见 pipeline.py）
+
+脚本仍放在原来的目录里（模块之间按平铺的模块名互相导入），这里只负责：
+- 把脚本目录加入 sys.path：安装后为 trip7ai_cli.modify / .check / .compress 子包所在目录，
+  在源码目录中直接运行（python -m trip7ai_cli）时为仓库里的同名目录
+- 只导入所选子命令的模块，调用它的 main(argv)；pandas / numpy / holidays / Pillow 等由各脚本按需加载，
+  本模块只用标准库里导入很快的几个模块（trip7ai --help 与各子命令 --help 的启动时间见 startup_budget.py）
+
+脚本的 main(argv) 与其中的函数也可以在别的 Python 程序里直接调用，见 load()。
+"""
+
+import os
+import sys
+
+PROG = 'trip7ai'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子包名 → 仓库中的脚本目录
+SCRIPT_DIRS = {
+    'modify': '修改数据脚本',
+    'check': '检查数据脚本',
+    'compress': '压缩图片脚本',
+}
+
+# 子命令 → (所在目录, 模块, 说明)；所在目录为 None 的是本包中的模块
+COMMANDS = {
+    'compress': ('compress', 'compress_images', '批量压缩图片（Pillow）'),
+    'check': ('check', 'check_data', '检查 itschool 学习记录的时间规则'),
+    'check-dxai': ('check', 'chack_data_dxai', '检查 DXAI 学习记录的时间规则'),
+    'generate': ('modify', 'generate_springboot_new', '生成 SpringBoot 学习记录'),
+    'reschedule': ('modify', 'change_course_llm_data', '按工作日调度法重排 LLM 数据'),
+    'verify': ('modify', 'verify_llm_schedule', '重放调度规则核对排程结果'),
+    'simulate': ('modify', 'simulate_schedule', '按参数网格模拟调度规则'),
+    'pipeline': (None, 'trip7ai_cli.pipeline', '按依赖关系运行以上各步骤，跳过输入没有变化的步骤'),
+}
+
+
+def script_dir(key: str) -> str:
+    """脚本目录的实际路径（安装后的子包目录，或源码目录中的原目录）"""
+    source = os.path.join(ROOT, SCRIPT_DIRS[key])
+    if os.path.isdir(source):
+        return source
+    from importlib.util import find_spec
+    spec = find_spec(f'{__package__ or "trip7ai_cli"}.{key}')
+    if spec is None or not spec.submodule_search_locations:
+        raise ImportError(f'找不到脚本目录 {SCRIPT_DIRS[key]}（trip7ai_cli.{key}）')
+    return list(spec.submodule_search_locations)[0]
+
+
+def add_script_paths(first: str = None) -> None:
+    """把各脚本目录加入 sys.path（first 排在最前）；检查脚本会导入排程目录里的 value_parsing，所以全部加入"""
+    keys = sorted(SCRIPT_DIRS, key=lambda k: k != first)
+    for key in reversed(keys):
+        path = script_dir(key)
+        if path in sys.path:
+            sys.path.remove(path)
+        sys.path.insert(0, path)
+
+
+def load(command: str):
+    """导入子命令对应的脚本模块（供在同一进程中复用其函数）"""
+    from importlib import import_module
+    key, module, _ = COMMANDS[command]
+    add_script_paths(key)
+    return import_module(module)
+
+
+def run(command: str, argv=None):
+    """在当前进程中执行子命令，argv 为该脚本自己的参数列表；返回 main 的返回值（脚本出错时照常 sys.exit）"""
+    module = load(command)
+    saved = sys.argv
+    # argparse 用 sys.argv[0] 作为用法说明中的程序名
+    sys.argv = [f'{PROG} {command}'] + list(argv or [])
+    try:
+        return module.main(sys.argv[1:])
+    finally:
+        sys.argv = saved
+
+
+def usage() -> str:
+    width = max(len(name) for name in COMMANDS)
+    lines = [f'用法: {PROG} <子命令> [参数 ...]', '', '子命令:']
+    lines += [f'  {name:<{width}}  {help_text}' for name, (_, _, help_text) in COMMANDS.items()]
+    lines += ['', f'各子命令的参数: {PROG} <子命令> --help']
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    # 不用 argparse：--help 只打印子命令表，不为此导入任何模块
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0 if argv else 2
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f'{PROG}: 未知的子命令 {command!r}\n\n{usage()}', file=sys.stderr)
+        return 2
+    if sys.platform == 'win32':
+        # 终端输出保持UTF-8，避免中文乱码（原来由各脚本在 __main__ 中处理）
+        sys.stdout.reconfigure(encoding='utf-8')
+    return run(command, rest)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按依赖关系运行各脚本的流水线，输入没有变化的步骤直接跳过：
+
+  trip7ai pipeline pipeline.json                  # 运行输入有变化的步骤
+  trip7ai pipeline pipeline.json --dry-run        # 只列出哪些步骤会运行
+  trip7ai pipeline pipeline.json --force verify   # 不论输入是否变化都运行 verify（不给步骤名则全部）
+
+配置为 JSON，路径相对于配置文件所在的目录（各步骤也在该目录下运行），示例见仓库根目录的 pipeline.example.json：
+  {"stages": {
+    "reschedule": {"command": "reschedule", "args": ["--input", "llm.csv", "--output", "llm_new.csv"],
+                   "inputs": ["llm.csv"], "outputs": ["llm_new.csv"]},
+    "verify":     {"command": "verify", "args": ["--input", "llm_new.csv", "--report", "mismatches.jsonl"],
+                   "inputs": ["llm_new.csv"], "outputs": ["mismatches.jsonl"]}}}
+- command 为 trip7ai 的子命令，args 为该脚本自己的参数；inputs / outputs 可为文件、目录或通配符
+- 可选：after（额外的前置步骤）、ok_codes（视为成功的退出码，默认 [0]）
+
+- 依赖：步骤的输入与另一步骤的输出重合即依赖它；有环时报错
+- 跳过：指纹 = 子命令 + 参数 + 各输入文件内容的 sha256 + 相关脚本目录中 .py 的 sha256，
+  与上次成功时相同、且声明的输出仍与当时一致时跳过。上游重新运行但输出内容没变时，下游照样跳过。
+  指纹按运行结束后的状态记录（check 会把 Highlight 列写回输入 CSV，下次不会因此重跑）
+  文件的 sha256 按（大小, 修改时间）缓存在状态文件里，未改动的大文件不重复读取
+- 并发：互不依赖的步骤在 --jobs 个进程中同时运行。只有一个前置、且前置只被它依赖的步骤与前置连成一串，
+  在同一进程中依次运行：上一步输出的 CSV 以解析好的表交给下一步（table_handoff），不再重新读入。
+  --jobs 1 时全部步骤在当前进程中依次运行，所有前后相接的步骤都这样传递
+- 各步骤的输出写到 .trip7ai-pipeline/logs/<步骤>.log，状态在 .trip7ai-pipeline/state.json
+- 有步骤失败时，依赖它的步骤不运行，退出码为 1；配置有误时退出码为 2
+"""
+
+import argparse
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import redirect_stderr, redirect_stdout
+
+from . import cli
+
+STATE_DIR = '.trip7ai-pipeline'
+HASH_BLOCK = 1 << 20
+RACY_NS = 2 * 10 ** 9  # 修改时间在这之内的文件不缓存 sha256（同一时刻内再次改写时大小与修改时间可能不变）
+DONE = ('ok', 'cached')
+
+
+# ---- 配置与依赖 ----
+def load_config(path: str) -> dict:
+    """读取配置，返回 {步骤名: 步骤}；配置有误时抛出 ValueError"""
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    specs = config.get('stages') if isinstance(config, dict) else None
+    if not isinstance(specs, dict) or not specs:
+        raise ValueError('配置中没有 stages')
+    stages = {}
+    for name, spec in specs.items():
+        command = spec.get('command')
+        if command not in cli.COMMANDS or command == 'pipeline':
+            raise ValueError(f'步骤 {name}：未知的子命令 {command!r}')
+        unknown = [dep for dep in spec.get('after', []) if dep not in specs]
+        if unknown:
+            raise ValueError(f'步骤 {name}：after 中的步骤不存在 {unknown}')
+        stages[name] = {
+            'name': name,
+            'command': command,
+            'args': [str(a) for a in spec.get('args', [])],
+            'inputs': [os.path.normpath(p) for p in spec.get('inputs', [])],
+            'outputs': [os.path.normpath(p) for p in spec.get('outputs', [])],
+            'after': list(spec.get('after', [])),
+            'ok_codes': list(spec.get('ok_codes', [0])),
+        }
+    return stages
+
+
+def _is_glob(path: str) -> bool:
+    return any(c in path for c in '*?[')
+
+
+def overlaps(a: str, b: str) -> bool:
+    """两个路径 / 通配符是否可能指同一个文件（目录包含其下的文件）"""
+    if a == b or (_is_glob(a) and fnmatch.fnmatch(b, a)) or (_is_glob(b) and fnmatch.fnmatch(a, b)):
+        return True
+    return b.startswith(a + os.sep) or a.startswith(b + os.sep)
+
+
+def build_graph(stages: dict) -> dict:
+    """{步骤: 前置步骤的集合}"""
+    upstream = {name: set(stage['after']) for name, stage in stages.items()}
+    for name, stage in stages.items():
+        for other, producer in stages.items():
+            if other != name and any(overlaps(i, o) for i in stage['inputs'] for o in producer['outputs']):
+                upstream[name].add(other)
+    topo_order(upstream)
+    return upstream
+
+
+def topo_order(upstream: dict) -> list:
+    """拓扑序（同一层内保持配置中的先后）；有环时抛出 ValueError"""
+    order, done = [], set()
+    remaining = list(upstream)
+    while remaining:
+        ready = [name for name in remaining if upstream[name] <= done]
+        if not ready:
+            raise ValueError(f"步骤之间有环：{', '.join(remaining)}")
+        order += ready
+        done.update(ready)
+        remaining = [name for name in remaining if name not in done]
+    return order
+
+
+def chains(upstream: dict, order: list) -> list:
+    """把一对一相接的步骤连成串（同一进程中依次运行），返回各串的步骤名列表"""
+    downstream = {name: [m for m in order if name in upstream[m]] for name in order}
+    tasks, assigned = [], set()
+    for name in order:
+        if name in assigned:
+            continue
+        chain = [name]
+        while len(downstream[chain[-1]]) == 1 and len(upstream[downstream[chain[-1]][0]]) == 1:
+            chain.append(downstream[chain[-1]][0])
+        assigned.update(chain)
+        tasks.append(chain)
+    return tasks
+
+
+def handoff_paths(stages: list) -> list:
+    """依次运行的步骤中，前面写出、后面读取的文件（在内存中传递）"""
+    paths = []
+    for k, stage in enumerate(stages):
+        later = [i for s in stages[k + 1:] for i in s['inputs']]
+        paths += [o for o in stage['outputs'] if not _is_glob(o) and any(overlaps(i, o) for i in later)]
+    return paths
+
+
+# ---- 内容指纹 ----
+def file_digest(path: str, known: dict) -> str:
+    """文件内容的 sha256；known 为 {绝对路径: [大小, 修改时间, sha256]}，两者未变时直接复用"""
+    full = os.path.abspath(path)
+    st = os.stat(full)
+    rec = known.get(full)
+    if rec and rec[0] == st.st_size and rec[1] == st.st_mtime_ns:
+        return rec[2]
+    h = hashlib.sha256()
+    with open(full, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            h.update(block)
+    if time.time_ns() - st.st_mtime_ns > RACY_NS:
+        known[full] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+    return h.hexdigest()
+
+
+def expand(pattern: str) -> list:
+    """路径 / 目录 / 通配符 → 其下的全部文件（排序）"""
+    if _is_glob(pattern):
+        paths = glob.glob(pattern, recursive=True)
+    elif os.path.exists(pattern):
+        paths = [pattern]
+    else:
+        return []
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d != STATE_DIR)
+            files += [os.path.join(root, n) for n in names]
+    return sorted({os.path.normpath(f) for f in files})
+
+
+def digests(patterns: list, known: dict) -> dict:
+    """{路径或通配符: {文件: sha256}}"""
+    return {p: {f: file_digest(f, known) for f in expand(p)} for p in patterns}
+
+
+def code_digest(command: str, known: dict) -> str:
+    """步骤用到的脚本目录中全部 .py 的指纹（检查与排程脚本互相导入，两个目录一起算）"""
+    key = cli.COMMANDS[command][0]
+    h = hashlib.sha256()
+    for k in ([key] if key == 'compress' else ['modify', 'check']):
+        folder = cli.script_dir(k)
+        for name in sorted(os.listdir(folder)):
+            if name.endswith('.py'):
+                h.update(f"{k}/{name}:{file_digest(os.path.join(folder, name), known)}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+def stage_key(stage: dict, known: dict) -> str:
+    payload = {
+        'command': stage['command'], 'args': stage['args'],
+        'inputs': digests(stage['inputs'], known), 'code': code_digest(stage['command'], known),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def is_fresh(stage: dict, entry, known: dict) -> bool:
+    """输入与上次成功运行时相同，且声明的输出没有被改动"""
+    return (entry is not None and entry.get('key') == stage_key(stage, known)
+            and entry.get('outputs') == digests(stage['outputs'], known))
+
+
+# ---- 运行 ----
+def _call(stage: dict) -> int:
+    """在当前进程中运行子命令，返回退出码"""
+    try:
+        code = cli.run(stage['command'], stage['args'])
+    except SystemExit as e:
+        code = e.code
+        if code is not None and not isinstance(code, int):
+            print(code, file=sys.stderr)  # sys.exit("消息")
+            code = 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    return code or 0
+
+
+def run_stage(stage: dict, entry, known: dict, force: bool, log_dir: str) -> dict:
+    """运行一个步骤（输入未变化时跳过）；返回 {'status': ok / cached / failed, 'entry': 新的状态, ...}"""
+    log = os.path.join(log_dir, f"{stage['name']}.log")
+    if not force and is_fresh(stage, entry, known):
+        return {'status': 'cached', 'entry': entry, 'log': log}
+    t0 = time.perf_counter()
+    with open(log, 'w', encoding='utf-8') as f, redirect_stdout(f), redirect_stderr(f):
+        code = _call(stage)
+    result = {'status': 'failed', 'entry': None, 'log': log, 'code': code, 'seconds': time.perf_counter() - t0}
+    if code not in stage['ok_codes']:
+        return result
+    missing = [p for p in stage['outputs'] if not expand(p)]
+    if missing:
+        result['error'] = f"没有生成声明的输出 {missing}"
+        return result
+    # 指纹按运行后的状态记录：步骤可能改写了自己的输入
+    result['status'] = 'ok'
+    result['entry'] = {'key': stage_key(stage, known), 'outputs': digests(stage['outputs'], known),
+                       'seconds': round(result['seconds'], 3)}
+    return result
+
+
+def run_task(task: dict):
+    """
+    在一个进程中依次运行一串步骤（进程池的任务）；中途失败时后面的步骤不运行
+    返回 ({步骤: 结果}, 更新后的文件指纹缓存)
+    """
+    cli.add_script_paths()
+    import table_handoff
+    known = task['known']
+    table_handoff.expect(*task['handoff'])
+    results = {}
+    try:
+        for stage in task['stages']:
+            result = run_stage(stage, task['entries'].get(stage['name']), known,
+                               stage['name'] in task['force'], task['log_dir'])
+            results[stage['name']] = result
+            if result['status'] == 'failed':
+                break
+    finally:
+        if task['clear']:
+            table_handoff.clear()
+    return results, known
+
+
+def describe(name: str, result: dict) -> str:
+    status = result['status']
+    if status == 'cached':
+        return f"[{name}] 跳过：输入与上次运行时相同（上次的输出见 {result['log']}）"
+    if status == 'ok':
+        return f"[{name}] 完成 {result['seconds']:.1f}s"
+    if status == 'blocked':
+        return f"[{name}] 未运行：前置步骤失败"
+    detail = result.get('error') or f"退出码 {result.get('code')}"
+    return f"[{name}] 失败：{detail}，日志 {result.get('log')}"
+
+
+def run_pipeline(stages: dict, upstream: dict, state: dict, jobs: int, force: set, log_dir: str) -> dict:
+    """按依赖运行全部步骤，更新 state；返回 {步骤: 结果}"""
+    order = topo_order(upstream)
+    tasks = chains(upstream, order)
+    known = state['files']
+    entries = state['stages']
+    status = {}
+
+    def ready(chain):
+        return all(status.get(u, {}).get('status') in DONE for u in upstream[chain[0]])
+
+    def blocked(chain):
+        return any(status.get(u, {}).get('status') in ('failed', 'blocked') for u in upstream[chain[0]])
+
+    def make_task(chain, handoff, clear=True):
+        return {'stages': [stages[n] for n in chain], 'entries': {n: entries.get(n) for n in chain},
+                'known': known, 'force': force, 'log_dir': log_dir, 'handoff': handoff, 'clear': clear}
+
+    def finish(chain, results, new_known):
+        known.update(new_known)
+        for name in chain:
+            result = results.get(name, {'status': 'blocked'})
+            status[name] = result
+            if result['status'] in DONE:
+                entries[name] = result['entry']
+            else:
+                entries.pop(name, None)
+            print(describe(name, result), flush=True)
+
+    if jobs <= 1:
+        # 全部在当前进程中：所有前后相接的步骤都在内存中传递
+        handoff = handoff_paths([stages[n] for n in order])
+        try:
+            for chain in tasks:
+                if blocked(chain):
+                    finish(chain, {}, {})
+                else:
+                    finish(chain, *run_task(make_task(chain, handoff, clear=False)))
+        finally:
+            import table_handoff
+            table_handoff.clear()
+        return status
+
+    pending = list(tasks)
+    running = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for chain in list(pending):
+                if blocked(chain):
+                    pending.remove(chain)
+                    finish(chain, {}, {})
+                elif ready(chain):
+                    pending.remove(chain)
+                    task = make_task(chain, handoff_paths([stages[n] for n in chain]))
+                    running[pool.submit(run_task, task)] = chain
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                chain = running.pop(future)
+                try:
+                    results, new_known = future.result()
+                except Exception as e:  # 工作进程异常退出
+                    results, new_known = {chain[0]: {'status': 'failed', 'error': repr(e)}}, {}
+                finish(chain, results, new_known)
+    return status
+
+
+def dry_run(stages: dict, upstream: dict, state: dict, force: set) -> None:
+    """只判断各步骤是否会运行（前置会重新运行的步骤，要等前置运行后才能判断）"""
+    rerun = set()
+    for name in topo_order(upstream):
+        if upstream[name] & rerun:
+            print(f"[{name}] 待定：前置步骤会重新运行")
+            rerun.add(name)
+        elif name in force or not is_fresh(stages[name], state['stages'].get(name), state['files']):
+            print(f"[{name}] 运行")
+            rerun.add(name)
+        else:
+            print(f"[{name}] 跳过：输入与上次运行时相同")
+
+
+# ---- 状态文件 ----
+def load_state(path: str) -> dict:
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    state.setdefault('files', {})
+    state.setdefault('stages', {})
+    return state
+
+
+def save_state(state: dict, path: str) -> None:
+    state['files'] = {p: rec for p, rec in state['files'].items() if os.path.exists(p)}
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='按依赖关系运行各脚本，跳过输入没有变化的步骤')
+    parser.add_argument('config', help='流水线配置（JSON）')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='同时运行的步骤数（1：全部在当前进程中依次运行）')
+    parser.add_argument('--force', nargs='*', default=None, metavar='STAGE',
+                        help='不论输入是否变化都运行这些步骤（不给步骤名则全部）')
+    parser.add_argument('--dry-run', action='store_true', help='只列出会运行的步骤，不运行')
+    args = parser.parse_args(argv)
+
+    try:
+        stages = load_config(args.config)
+        upstream = build_graph(stages)
+        unknown = [name for name in args.force or () if name not in stages]
+        if unknown:
+            raise ValueError(f'--force 中的步骤不存在 {unknown}')
+    except (OSError, ValueError) as e:
+        print(f'{args.config}: {e}', file=sys.stderr)
+        return 2
+    force = set(stages) if args.force == [] else set(args.force or ())
+
+    os.chdir(os.path.dirname(os.path.abspath(args.config)))
+    log_dir = os.path.join(STATE_DIR, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    state_path = os.path.join(STATE_DIR, 'state.json')
+    state = load_state(state_path)
+
+    if args.dry_run:
+        dry_run(stages, upstream, state, force)
+        return 0
+    t0 = time.perf_counter()
+    try:
+        status = run_pipeline(stages, upstream, state, args.jobs, force, log_dir)
+    finally:
+        save_state(state, state_path)
+    counts = {s: sum(1 for r in status.values() if r['status'] == s) for s in ('ok', 'cached', 'failed', 'blocked')}
+    print(f"完成 {counts['ok']}，跳过 {counts['cached']}，失败 {counts['failed']}，未运行 {counts['blocked']}"
+          f"（{time.perf_counter() - t0:.1f}s）")
+    return 1 if counts['failed'] or counts['blocked'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测量命令行的启动时间，并检查是否在预算内：
+
+  python -m trip7ai_cli.startup_budget                 # trip7ai --help 预算 100 ms，各子命令 --help 预算 200 ms
+  python -m trip7ai_cli.startup_budget --top-only      # 只测 trip7ai --help
+  python -m trip7ai_cli.startup_budget --runs 20 --budget-ms 80 --command-budget-ms 150
+
+每次在新进程中运行（python -m trip7ai_cli ...），取中位数；同时用 -X importtime 列出导入最慢的模块
+（子命令超出预算时也列出它的）。子命令的 --help 只应导入该脚本及其标准库依赖，
+pandas / numpy 等到 main 真正处理数据时才加载。
+解释器本身的启动时间（python -c pass）一并给出作对照。任一命令超出预算时退出码为 1。
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from .cli import COMMANDS, ROOT
+
+BUDGET_MS = 100.0
+COMMAND_BUDGET_MS = 200.0
+
+
+def _env() -> dict:
+    # 源码目录中未安装时也能 python -m trip7ai_cli
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+
+
+def time_command(args, runs: int) -> float:
+    """新进程中运行 python args 的墙钟时间（毫秒，中位数）"""
+    env = _env()
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable] + args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       env=env, cwd=ROOT, check=False)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def slowest_imports(args, top: int = 5) -> list:
+    """-X importtime 中累计耗时最多的顶层导入：[(微秒, 模块名), ...]"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime'] + args, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, env=_env(), cwd=ROOT, text=True, check=False)
+    found = []
+    for line in proc.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        if not name.startswith('  ', 1):  # 只看顶层（缩进一级以内）
+            found.append((int(parts[1]), name.strip()))
+    return sorted(found, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='测量 trip7ai 的启动时间')
+    parser.add_argument('--runs', type=int, default=10, help='每条命令运行的次数（取中位数）')
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS, help='trip7ai --help 的预算（毫秒）')
+    parser.add_argument('--command-budget-ms', type=float, default=COMMAND_BUDGET_MS,
+                        help='各子命令 --help 的预算（毫秒）')
+    parser.add_argument('--top-only', action='store_true', help='只测量 trip7ai --help，不测各子命令')
+    args = parser.parse_args(argv)
+
+    baseline = time_command(['-c', 'pass'], args.runs)
+    print(f"python -c pass: {baseline:.1f} ms")
+    over = []
+    top = time_command(['-m', 'trip7ai_cli', '--help'], args.runs)
+    print(f"trip7ai --help: {top:.1f} ms（预算 {args.budget_ms:.0f} ms）")
+    for us, name in slowest_imports(['-m', 'trip7ai_cli', '--help']):
+        print(f"  {us / 1000:6.1f} ms  {name}")
+    if top > args.budget_ms:
+        over.append(f"trip7ai --help {top:.1f} ms > {args.budget_ms:.0f} ms")
+    if not args.top_only:
+        for command in COMMANDS:
+            cmd = ['-m', 'trip7ai_cli', command, '--help']
+            ms = time_command(cmd, args.runs)
+            print(f"trip7ai {command} --help: {ms:.1f} ms（预算 {args.command_budget_ms:.0f} ms）")
+            if ms > args.command_budget_ms:
+                for us, name in slowest_imports(cmd):
+                    print(f"  {us / 1000:6.1f} ms  {name}")
+                over.append(f"trip7ai {command} --help {ms:.1f} ms > {args.command_budget_ms:.0f} ms")
+    for line in over:
+        print(f"超出启动预算：{line}", file=sys.stderr)
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,247 +6,563 @@
 - new_started_at = 同行 first_finished_time
 - new_started_at_UTC = new_started_at + 9 小时（按需求，非传统换算）
 - next_started_at = new_started_at_UTC + course_video_length（若缺失则保持为空）
-- rest_time = 2-6 的随机整数
+- rest_time = 2-6 的随机整数（每个用户的随机数流由 seed 与 user_id 派生，与文件中用户的先后无关）
 
 额外规则：flag 为 “留” 的行不改动（跳过更新）。
 
 保留其他列不变，输出到新文件。
+
+输入按 user_id 分组时逐组流式处理（内存只保留一个用户的行）；未分组时外部排序（临时文件），
+两种方式结果与整表读入相同。可接在管道中间：
+  python change_course_llm_data.py --input 副本LLM+data基础.csv --output 修改.csv
+  cat export.csv | python change_course_llm_data.py --input - --output - --sort | gzip > 修改.csv.gz
+增量模式（--cache）：按用户对参与调度的输入列求指纹，只重新计算指纹、规则参数或随机数位置变化的用户：
+  python change_course_llm_data.py --cache change_course.cache.sqlite --report recomputed.csv
+只把变化的行推到数据库（--delta，按 id 更新四列，格式说明见 delta_output.py）：
+  python change_course_llm_data.py --delta changed.sql --table llm_data
+  python change_course_llm_data.py --delta changed.tsv --delta-format copy --table llm_data
 """
 
 import csv
+import io
 import sys
 import codecs
-from datetime import datetime, timedelta
+import heapq
+import hashlib
+import json
+import sqlite3
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+from collections import deque
+from itertools import groupby
+from multiprocessing import Pool
+from operator import itemgetter
 import random
-from collections import defaultdict
-
-if sys.platform == 'win32':
-    # 终端输出保持UTF-8，避免中文乱码
-    sys.stdout = codecs.getwriter("utf-8")(sys.stdout.detach())
 
+from delta_output import FORMATS as DELTA_FORMATS, close_delta, load_hint, open_delta, write_change
+from schedule_kernel import (
+    REST_MAX, REST_MIN, UTC_SHIFT_HOURS, UTC_SHIFT_SEC,
+    duration_from_minutes, new_calendar, next_current, parse_datetime, parse_time_string, place_row,
+)
+from schedule_timeline import TimelineRow, WorkCalendar, format_seconds, to_seconds
+import table_handoff
 
 INPUT_FILE = "副本LLM+data基础.csv"
 OUTPUT_FILE = "副本LLM+data基础_修改.csv"
-UTC_SHIFT_HOURS = 9  # new_started_at_UTC = new_started_at + 9 小时
-REST_MIN = 2
-REST_MAX = 6
 RANDOM_SEED = 456
 
 
-def parse_time_string(time_str: str) -> float:
-    """解析视频时长字符串为分钟数（支持 H:M:S 或 M:S）。
-    返回分钟数（float）。无效或空返回0。
-    """
-    if not time_str or time_str.strip() == "":
-        return 0.0
+def is_kept(row: list, flag_index: int) -> bool:
+    """flag 为 “留” 的行不改动"""
     try:
-        parts = time_str.strip().split(":")
-        if len(parts) == 3:
-            hours, minutes, seconds = map(int, parts)
-            return hours * 60 + minutes + seconds / 60.0
-        elif len(parts) == 2:
-            minutes, seconds = map(int, parts)
-            return minutes + seconds / 60.0
+        return row[flag_index].strip() == "留"
     except Exception:
-        pass
-    return 0.0
+        return False
 
 
-def parse_datetime(dt_str: str):
-    """解析日期时间字符串为 datetime。
-    允许格式：YYYY/MM/DD HH:MM 或 YYYY/MM/DD HH:MM:SS。
-    无效返回 None。
+def schedule_user(idx_list, rows, cols: dict, rand: random.Random, calendar: WorkCalendar) -> list:
     """
-    if not dt_str or dt_str.strip() == "":
-        return None
-    s = dt_str.strip()
-    try:
-        return datetime.strptime(s, "%Y/%m/%d %H:%M")
-    except ValueError:
+    按工作日调度一个 user_id 的全部行（规则见 schedule_kernel），返回 TimelineRow 列表（跳过的行不在其中）
+    cols：first_finished_time / course_video_length / flag 的列号
+    """
+    fft_index = cols['first_finished_time']
+    length_index = cols['course_video_length']
+    flag_index = cols['flag']
+    scheduled = []
+    current = None  # 工作日调度中的当前 UTC 起点（秒）
+    for idx in idx_list:
+        row = rows[idx]
+        # 跳过 flag 为 “留” 的行
+        if is_kept(row, flag_index):
+            continue
+
+        # 休息时间
+        rest_val = rand.randint(REST_MIN, REST_MAX)
+
+        # 第一条：current = first_finished_time + 9h；后续：沿用上一次的 current
+        if current is None:
+            fft_dt = parse_datetime(row[fft_index] if fft_index < len(row) else "")
+            if fft_dt is None:
+                # 无法解析则跳过该行更新
+                continue
+            current = to_seconds(fft_dt) + UTC_SHIFT_SEC
+
+        dur = duration_from_minutes(parse_time_string(row[length_index] if length_index < len(row) else ""))
+        start, end, day_start = place_row(current, dur, calendar)
+        scheduled.append(TimelineRow(idx, start, end, rest_val))
+        # 下一个课程的开始时间（完全连续）
+        current = next_current(end, rest_val, day_start, calendar)
+    return scheduled
+
+
+# ---- 流式读写：按 user_id 分组逐组处理 ----
+class NotGroupedError(Exception):
+    """输入未按 user_id 分组（同一 user_id 在其他用户之后再次出现）"""
+
+
+def open_input(path: str):
+    if path == '-':
+        return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def open_output(path: str):
+    if path == '-':
+        # Windows 下 sys.stdout 已换成 codecs 包装，底层流在 .stream
+        raw = sys.stdout.buffer if hasattr(sys.stdout, 'buffer') else sys.stdout.stream
+        return io.TextIOWrapper(raw, encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def row_uid(row: list, uid_index: int) -> str:
+    return row[uid_index] if uid_index < len(row) else ""
+
+
+def iter_user_groups(numbered_rows, uid_index: int):
+    """已按 user_id 分组的输入：逐组产出 [(行号, 行), ...]，内存只保留当前一组"""
+    seen = set()
+    group = []
+    uid = None
+    for i, row in numbered_rows:
+        key = row_uid(row, uid_index)
+        if group and key != uid:
+            yield group
+            seen.add(uid)
+            group = []
+        if not group:
+            if key in seen:
+                raise NotGroupedError(f"第 {i + 2} 行的 user_id={key} 在其他用户之后再次出现")
+            uid = key
+        group.append((i, row))
+    if group:
+        yield group
+
+
+def is_grouped(path: str, uid_index: int) -> bool:
+    """预扫描输入文件（只看 user_id 列）：同一 user_id 的行是否连续"""
+    with open_input(path) as f:
+        reader = csv.reader(f)
+        next(reader, None)
         try:
-            return datetime.strptime(s, "%Y/%m/%d %H:%M:%S")
-        except ValueError:
-            return None
+            for _ in iter_user_groups(enumerate(reader), uid_index):
+                pass
+        except NotGroupedError:
+            return False
+    return True
+
+
+def _spill_run(buffer: list, tmp_dir: str, runs: list) -> None:
+    buffer.sort(key=itemgetter(0))
+    # 两次排序（分组、排回原顺序）同时在用临时目录，文件名不能按序号取
+    fd, path = tempfile.mkstemp(suffix='.csv', dir=tmp_dir)
+    with open(fd, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        for key, row in buffer:
+            writer.writerow(list(key) + row)
+    runs.append(path)
+    buffer.clear()
+
+
+def _read_run(path: str, key_width: int):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for rec in csv.reader(f):
+            yield tuple(int(x) for x in rec[:key_width]), rec[key_width:]
+
+
+def external_sorted(items, key_width: int, buffer_rows: int, tmp_dir: str):
+    """
+    外部排序：items 为 (整数键元组, 行)，每 buffer_rows 行排好序写成一个临时文件，最后多路归并；
+    全部放得下时不落盘
+    """
+    buffer = []
+    runs = []
+    for item in items:
+        buffer.append(item)
+        if len(buffer) >= buffer_rows:
+            _spill_run(buffer, tmp_dir, runs)
+    if not runs:
+        buffer.sort(key=itemgetter(0))
+        yield from buffer
+        return
+    if buffer:
+        _spill_run(buffer, tmp_dir, runs)
+    yield from heapq.merge(*(_read_run(path, key_width) for path in runs), key=itemgetter(0))
+
+
+def sorted_user_groups(numbered_rows, uid_index: int, buffer_rows: int, tmp_dir: str):
+    """未分组的输入：按（user_id 首次出现的先后, 行号）外部排序后逐组产出，组的顺序与整表读入时相同"""
+    ranks = {}
+
+    def keyed():
+        for i, row in numbered_rows:
+            yield (ranks.setdefault(row_uid(row, uid_index), len(ranks)), i), row
+
+    for _, items in groupby(external_sorted(keyed(), 2, buffer_rows, tmp_dir), key=lambda item: item[0][0]):
+        yield [(key[1], row) for key, row in items]
 
 
-def format_datetime(dt: datetime) -> str:
-    """格式化 datetime 为字符串（YYYY/M/D HH:MM）。None 返回空串。"""
-    if dt is None:
-        return ""
-    return f"{dt.year}/{dt.month}/{dt.day} {dt.hour}:{dt.minute:02d}"
+def scheduled_values(rows: list, cols: dict, rand: random.Random, calendar: WorkCalendar) -> list:
+    """调度一组，返回每行要写回的 [UTC, next, 本地, rest] 文本（不更新的行为 None）"""
+    values = [None] * len(rows)
+    # 文本只在这里生成（本地 new_started_at = UTC - 9h）
+    for item in schedule_user(range(len(rows)), rows, cols, rand, calendar):
+        values[item.index] = [format_seconds(item.start), format_seconds(item.end),
+                              format_seconds(item.start - UTC_SHIFT_SEC), str(item.rest)]
+    return values
 
-def is_weekend(dt: datetime) -> bool:
-    return dt.weekday() >= 5
 
-def is_workday(dt: datetime) -> bool:
-    return not is_weekend(dt)
+# ---- 每个用户独立的随机数流 ----
+# 每个进程任务包含的用户组数
+GROUPS_PER_TASK = 200
 
-def get_next_workday(dt: datetime) -> datetime:
-    next_day = dt + timedelta(days=1)
-    while not is_workday(next_day):
-        next_day = next_day + timedelta(days=1)
-    return next_day
+CALENDAR = None
 
 
-def main():
+def get_calendar() -> WorkCalendar:
+    """工作日表每个进程建一次"""
+    global CALENDAR
+    if CALENDAR is None:
+        CALENDAR = new_calendar()
+    return CALENDAR
+
+
+def user_rng(seed: int, uid: str) -> random.Random:
+    """由 seed 和 user_id 派生该用户自己的随机数流：结果与文件中用户的先后、筛选无关"""
+    digest = hashlib.sha256(f"{seed}/user/{uid}".encode('utf-8')).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+
+def schedule_task(task) -> list:
+    """进程池任务：[(user_id, 行列表), ...] → 每组的写回文本"""
+    seed, cols, items = task
+    return [scheduled_values(rows, cols, user_rng(seed, uid), get_calendar()) for uid, rows in items]
+
+
+def _prepare_batch(batch: list, ctx: dict, stats: dict) -> dict:
+    """
+    一批用户组：统计“留”行、查缓存；共享随机数流（--shared-rng）时按顺序当场计算，
+    否则把未命中缓存的组收集为一个任务
+    """
+    cols = ctx['cols']
+    cache = ctx['cache']
+    shared = ctx['shared_rand']
+    info = {'groups': batch, 'values': [None] * len(batch), 'misses': []}
+    for pos, group in enumerate(batch):
+        rows = [row for _, row in group]
+        uid = row_uid(rows[0], cols['user_id'])
+        kept = sum(1 for row in rows if is_kept(row, cols['flag']))
+        stats['skipped_liu'] += kept
+        # 共享随机数流时，每个非“留”行取一次 rest，用户在流中的位置决定其结果
+        draws = len(rows) - kept
+        rng_offset = stats['draws'] if shared else 0
+        stats['draws'] += draws
+        values = cached_values(cache, uid, rows, cols, rng_offset) if cache else None
+        if values is not None:
+            info['values'][pos] = values
+            if shared:
+                for _ in range(draws):
+                    shared.randint(REST_MIN, REST_MAX)
+            continue
+        info['misses'].append((pos, uid, rows, rng_offset))
+        if shared:
+            info['values'][pos] = scheduled_values(rows, cols, shared, get_calendar())
+    return info
+
+
+def _finish_batch(info: dict, computed, ctx: dict, stats: dict):
+    """写回四列（--delta 时先把变化的行写到增量输出）、存缓存，按组产出 (行号, 行)"""
+    cols = ctx['cols']
+    delta = ctx['delta']
+    targets = [cols['new_started_at_UTC'], cols['next_started_at'], cols['new_started_at'], cols['rest_time']]
+    if computed is not None:
+        for (pos, _, _, _), values in zip(info['misses'], computed):
+            info['values'][pos] = values
+    if ctx['cache']:
+        for pos, uid, rows, rng_offset in info['misses']:
+            store_values(ctx['cache'], uid, rows, cols, rng_offset, info['values'][pos])
+    for group, values in zip(info['groups'], info['values']):
+        for (_, row), vals in zip(group, values):
+            if vals is not None:
+                if delta:
+                    write_change(delta, row_uid(row, cols['id']), [row[col] for col in targets], vals)
+                for col, value in zip(targets, vals):
+                    row[col] = value
+                stats['updated'] += 1
+        stats['rows'] += len(group)
+        yield from group
+
+
+def _batches(groups, size: int):
+    batch = []
+    for group in groups:
+        batch.append(group)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _miss_task(info: dict, ctx: dict):
+    return ctx['seed'], ctx['cols'], [(uid, rows) for _, uid, rows, _ in info['misses']]
+
+
+def reschedule_groups(groups, ctx: dict, stats: dict):
+    """
+    逐组调度并就地写回四列，按输入的组顺序产出 (行号, 行)
+    ctx：cols、seed、shared_rand（--shared-rng 时的共享 Random，否则 None）、cache（open_cache 的返回值或 None）、
+    delta（open_delta 的返回值或 None）、pool（进程池或 None）、workers
+    进程池模式下每 GROUPS_PER_TASK 组一个任务，最多 2 × workers 个任务在途，缓存只在主进程读写
+    """
+    pending = deque()
+    for batch in _batches(groups, GROUPS_PER_TASK):
+        info = _prepare_batch(batch, ctx, stats)
+        if ctx['shared_rand']:
+            yield from _finish_batch(info, None, ctx, stats)
+        elif ctx['pool'] is None:
+            yield from _finish_batch(info, schedule_task(_miss_task(info, ctx)), ctx, stats)
+        else:
+            pending.append((info, ctx['pool'].apply_async(schedule_task, (_miss_task(info, ctx),))))
+            while len(pending) > 2 * ctx['workers']:
+                info, result = pending.popleft()
+                yield from _finish_batch(info, result.get(), ctx, stats)
+    while pending:
+        info, result = pending.popleft()
+        yield from _finish_batch(info, result.get(), ctx, stats)
+
+
+# ---- 增量模式（--cache）：按用户指纹复用上次的结果 ----
+# 调度规则本身变化时加 1，使已有缓存全部失效
+# 2：first_finished_time 改用 value_parsing 解析，也接受 YYYY-M-D 写法
+RULE_VERSION = 2
+
+
+def rule_params_key(seed: int, shared_rng: bool) -> str:
+    return json.dumps([RULE_VERSION, UTC_SHIFT_HOURS, REST_MIN, REST_MAX, seed, shared_rng])
+
+
+def user_input_hash(rows: list, cols: dict) -> str:
+    """一个用户参与调度的输入：各行的 flag、first_finished_time、course_video_length（按行序）"""
+    h = hashlib.sha1()
+    for row in rows:
+        for name in ('flag', 'first_finished_time', 'course_video_length'):
+            index = cols[name]
+            h.update((row[index] if index < len(row) else '').encode('utf-8'))
+            h.update(b'\x1f')
+        h.update(b'\x1e')
+    return h.hexdigest()
+
+
+def open_cache(path: str, params: str, report_path: str = None) -> dict:
+    """打开（或新建）SQLite 缓存：每个 user_id 一行，记录参数、输入指纹、随机数位置和写回的文本"""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS users ("
+                 "user_id TEXT PRIMARY KEY, params TEXT, input TEXT, rng_offset INTEGER, outputs TEXT, run INTEGER)")
+    run = (conn.execute("SELECT MAX(run) FROM users").fetchone()[0] or 0) + 1
+    report = None
+    if report_path:
+        report = open(report_path, 'w', encoding='utf-8', newline='')
+        csv.writer(report).writerow(['user_id', 'reason'])
+    return {
+        'conn': conn, 'run': run, 'params': params, 'report': report,
+        'reused': 0, 'reasons': {'new': 0, 'params': 0, 'input': 0, 'rng_offset': 0},
+    }
+
+
+def cached_values(cache: dict, uid: str, rows: list, cols: dict, rng_offset: int):
+    """指纹一致时返回缓存的写回文本，否则记录重新计算的原因并返回 None"""
+    found = cache['conn'].execute(
+        "SELECT params, input, rng_offset, outputs FROM users WHERE user_id = ?", (uid,)).fetchone()
+    input_hash = user_input_hash(rows, cols)
+    if found is None:
+        reason = 'new'
+    elif found[0] != cache['params']:
+        reason = 'params'
+    elif found[1] != input_hash:
+        reason = 'input'
+    elif found[2] != rng_offset:
+        reason = 'rng_offset'
+    else:
+        cache['conn'].execute("UPDATE users SET run = ? WHERE user_id = ?", (cache['run'], uid))
+        cache['reused'] += 1
+        return json.loads(found[3])
+    cache['reasons'][reason] += 1
+    if cache['report']:
+        csv.writer(cache['report']).writerow([uid, reason])
+    return None
+
+
+def store_values(cache: dict, uid: str, rows: list, cols: dict, rng_offset: int, values: list) -> None:
+    cache['conn'].execute(
+        "INSERT OR REPLACE INTO users (user_id, params, input, rng_offset, outputs, run) VALUES (?, ?, ?, ?, ?, ?)",
+        (uid, cache['params'], user_input_hash(rows, cols), rng_offset,
+         json.dumps(values, ensure_ascii=False), cache['run']))
+
+
+def close_cache(cache: dict) -> None:
+    """删除本次输入中已不存在的用户，提交并关闭"""
+    cache['conn'].execute("DELETE FROM users WHERE run != ?", (cache['run'],))
+    cache['conn'].commit()
+    cache['conn'].close()
+    if cache['report']:
+        cache['report'].close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='按 user_id 工作日调度法更新 new_started_at / UTC / next_started_at / rest_time')
+    parser.add_argument('--input', default=INPUT_FILE, help='输入 CSV（- 为标准输入）')
+    parser.add_argument('--output', default=OUTPUT_FILE, help='输出 CSV（- 为标准输出，此时提示信息写到标准错误）')
+    parser.add_argument('--sort', action='store_true',
+                        help='输入未按 user_id 分组时使用外部排序（标准输入无法预扫描，需显式指定）')
+    parser.add_argument('--sort-buffer', type=int, default=200000, help='外部排序时每个临时文件的行数')
+    parser.add_argument('--cache', default=None,
+                        help='增量模式：SQLite 缓存文件，只重新计算输入或参数有变化的用户，其余复用上次结果')
+    parser.add_argument('--report', default=None, help='增量模式下把重新计算的用户及原因写到此 CSV')
+    parser.add_argument('--seed', type=int, default=RANDOM_SEED, help='随机种子（每个用户的 rest 由 seed 与 user_id 派生）')
+    parser.add_argument('--shared-rng', action='store_true',
+                        help='所有用户按文件顺序共用一个随机数流（旧版行为，用于复现以前的输出；不能与 --workers 同用）')
+    parser.add_argument('--workers', type=int, default=1, help='并行调度的进程数（输出与进程数无关）')
+    parser.add_argument('--delta', default=None,
+                        help='另外写出增量文件：只含四个调度列有变化的行，按 id 更新（输出 CSV 照常写出）')
+    parser.add_argument('--delta-format', choices=DELTA_FORMATS, default='update',
+                        help='update：批量 UPDATE ... CASE 语句；copy：导入临时表用的制表符分隔文件')
+    parser.add_argument('--table', default='llm_data', help='增量输出中要更新的表名')
+    parser.add_argument('--batch-size', type=int, default=500, help='update 格式每条 UPDATE 语句包含的行数')
+    args = parser.parse_args(argv)
+    if args.shared_rng and args.workers > 1:
+        # 在打开（截断）输出文件之前拒绝
+        parser.error('--shared-rng 需要按文件顺序依次调度，不能与 --workers 同时使用')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    out_stream = None
+    if args.output == '-':
+        # CSV 占用标准输出，提示信息改写到标准错误
+        out_stream = open_output('-')
+        with redirect_stdout(sys.stderr):
+            run(args, out_stream)
+    else:
+        run(args, out_stream)
+
+
+def run(args, out_stream=None):
     print("=" * 60)
     print("副本LLM+data基础 CSV列更新脚本")
     print("=" * 60)
-    print(f"输入文件: {INPUT_FILE}")
-    print(f"输出文件: {OUTPUT_FILE}")
+    print(f"输入文件: {'标准输入' if args.input == '-' else args.input}")
+    print(f"输出文件: {'标准输出' if args.output == '-' else args.output}")
     print(f"UTC计算: new_started_at + {UTC_SHIFT_HOURS} 小时")
     print("=" * 60)
     print()
 
-    # 读取CSV
-    print("正在读取文件...")
     try:
-        with open(INPUT_FILE, 'r', encoding='utf-8', newline='') as f:
-            reader = csv.reader(f)
-            header = next(reader)
-            rows = list(reader)
+        in_f = open_input(args.input)
+        reader = csv.reader(in_f)
+        header = next(reader)
     except FileNotFoundError:
-        print(f"❌ 错误：找不到文件 {INPUT_FILE}")
+        print(f"❌ 错误：找不到文件 {args.input}")
         sys.exit(1)
     except Exception as e:
         print(f"❌ 读取文件失败: {e}")
         sys.exit(1)
 
-    print(f"✅ 读取了 {len(rows)} 行数据\n")
-
     # 获取列索引
     try:
-        first_finished_time_index = header.index('first_finished_time')
-        course_video_length_index = header.index('course_video_length')
-        new_started_at_index = header.index('new_started_at')
-        new_started_at_UTC_index = header.index('new_started_at_UTC')
-        next_started_at_index = header.index('next_started_at')
-        rest_time_index = header.index('rest_time')
-        flag_index = header.index('flag')
-        user_id_index = header.index('user_id')
+        cols = {name: header.index(name) for name in (
+            'first_finished_time', 'course_video_length', 'new_started_at', 'new_started_at_UTC',
+            'next_started_at', 'rest_time', 'flag', 'user_id') + (('id',) if args.delta else ())}
     except ValueError as e:
         print(f"❌ 错误：CSV缺少必要列: {e}")
         sys.exit(1)
 
-    # 随机数生成器
-    rand = random.Random(RANDOM_SEED)
+    # 分组方式：已分组的输入逐组流式处理；否则外部排序（组的顺序与整表读入时相同，结果一致）
+    use_sort = args.sort or (args.input != '-' and not is_grouped(args.input, cols['user_id']))
+    print(f"处理方式: {'外部排序后按 user_id 分组' if use_sort else '按 user_id 分组流式处理'}\n")
 
-    print("正在按 user_id 工作日调度法连续更新列数据...")
-    updated = 0
-    skipped_liu = 0
-
-    # 分组：按 user_id 保持原顺序
-    groups = defaultdict(list)
-    for idx, r in enumerate(rows):
-        uid = r[user_id_index] if user_id_index < len(r) else ""
-        groups[uid].append(idx)
-
-    for uid, idx_list in groups.items():
-        current_time = None  # 工作日调度中的当前 UTC 起点
-        for idx in idx_list:
-            row = rows[idx]
-            # 跳过 flag 为 “留” 的行
+    out_path = args.output
+    if out_stream is None:
+        try:
+            out_stream = open_output(args.output)
+        except Exception as e:
+            print(f"❌ 打开输出文件失败: {e}")
+            # 尝试写入备用文件名（可能原文件被占用）
+            alt = args.output.replace('.csv', '_new.csv')
             try:
-                flag_val = row[flag_index].strip()
-            except Exception:
-                flag_val = ""
-            if flag_val == "留":
-                skipped_liu += 1
-                continue
+                out_stream = open_output(alt)
+                out_path = alt
+                print(f"✅ 改为写入备用文件: {alt}\n")
+            except Exception as e2:
+                print(f"❌ 备用文件也无法打开: {e2}")
+                sys.exit(1)
+
+    stats = {'rows': 0, 'updated': 0, 'skipped_liu': 0, 'draws': 0}
+    ctx = {
+        'cols': cols, 'seed': args.seed,
+        # 随机数：默认每个用户独立（由 seed 与 user_id 派生）；--shared-rng 时全体共用一个
+        'shared_rand': random.Random(args.seed) if args.shared_rng else None,
+        'cache': open_cache(args.cache, rule_params_key(args.seed, args.shared_rng), args.report) if args.cache else None,
+        'delta': open_delta(args.delta, args.delta_format, args.table, args.batch_size) if args.delta else None,
+        'pool': Pool(args.workers) if args.workers > 1 else None,
+        'workers': args.workers,
+    }
+    cache = ctx['cache']
+    delta = ctx['delta']
 
-            # 休息时间
-            rest_val = rand.randint(REST_MIN, REST_MAX)
-
-            # 第一条：current_time = first_finished_time + 9h；后续：沿用上一次的 current_time
-            if current_time is None:
-                fft_str = row[first_finished_time_index] if first_finished_time_index < len(row) else ""
-                fft_dt = parse_datetime(fft_str)
-                if fft_dt is None:
-                    # 无法解析则跳过该行更新
-                    continue
-                current_time = fft_dt + timedelta(hours=UTC_SHIFT_HOURS)
-
-            # 确保当前时间在工作日
-            if not is_workday(current_time):
-                next_workday = get_next_workday(current_time)
-                current_time = next_workday.replace(hour=9, minute=0)
-
-            # 使用连续计算的时间（UTC）
-            utc_time = current_time
-
-            # 计算结束时间
-            dur_str = row[course_video_length_index] if course_video_length_index < len(row) else ""
-            minutes = parse_time_string(dur_str)
-            next_time = utc_time + timedelta(minutes=minutes) if minutes > 0 else utc_time
-
-            # 检查结束时间是否超过18:00
-            end_of_day = utc_time.replace(hour=18, minute=0, second=0, microsecond=0)
-            if next_time > end_of_day:
-                next_workday = get_next_workday(utc_time)
-                utc_time = next_workday.replace(hour=9, minute=0)
-                next_time = utc_time + timedelta(minutes=minutes)
-
-            # 午休处理（12:00-13:00）
-            lunch_start = utc_time.replace(hour=12, minute=0, second=0, microsecond=0)
-            lunch_end = utc_time.replace(hour=13, minute=0, second=0, microsecond=0)
-            if next_time > lunch_start and next_time < lunch_end:
-                utc_time = lunch_end
-                next_time = utc_time + timedelta(minutes=minutes)
-            elif utc_time < lunch_start and next_time > lunch_end:
-                utc_time = lunch_end
-                next_time = utc_time + timedelta(minutes=minutes)
-
-            # 计算 new_started_at（本地=UTC-9h）
-            local_start = utc_time - timedelta(hours=UTC_SHIFT_HOURS)
-
-            # 更新行
-            row[new_started_at_UTC_index] = format_datetime(utc_time)
-            row[next_started_at_index] = format_datetime(next_time)
-            row[new_started_at_index] = format_datetime(local_start)
-            row[rest_time_index] = str(rest_val)
-
-            updated += 1
-
-            # 计算下一个课程的开始时间（完全连续）
-            current_time = next_time + timedelta(minutes=rest_val)
-
-            # 检查是否需要跨过午休
-            if current_time > lunch_start and current_time < lunch_end:
-                current_time = lunch_end
-
-            # 检查是否超过工作时间（17:30后跳到下一个工作日）
-            if current_time.hour >= 18 or (current_time.hour == 17 and current_time.minute > 30):
-                next_workday = get_next_workday(current_time)
-                current_time = next_workday.replace(hour=9, minute=0)
-
-            # 最后再次确认不在周末
-            if not is_workday(current_time):
-                next_workday = get_next_workday(current_time)
-                current_time = next_workday.replace(hour=9, minute=0)
-
-    print(f"✅ 已更新 {updated} 行（跳过 留: {skipped_liu} 行）\n")
-
-    # 写入输出文件
-    print("正在写入文件...")
-    try:
-        with open(OUTPUT_FILE, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(header)
-            writer.writerows(rows)
-        print(f"✅ 成功写入: {OUTPUT_FILE}\n")
-    except Exception as e:
-        print(f"❌ 写入文件失败: {e}")
-        # 尝试写入备用文件名（可能原文件被占用）
-        alt = OUTPUT_FILE.replace('.csv', '_new.csv')
+    print("正在按 user_id 工作日调度法连续更新列数据...")
+    with in_f, out_stream, tempfile.TemporaryDirectory(prefix='change_course_') as tmp_dir:
+        writer = csv.writer(out_stream)
+        writer.writerow(header)
+        emit = writer.writerow
+        kept = None
+        if table_handoff.wanted(out_path):
+            # 流水线中后面的步骤要读这个输出：行同时留在内存里，省去重新读入 CSV
+            kept = []
+
+            def emit(row):
+                writer.writerow(row)
+                kept.append(row)
+        numbered = enumerate(reader)
         try:
-            with open(alt, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(header)
-                writer.writerows(rows)
-            print(f"✅ 备用写入成功: {alt}\n")
-        except Exception as e2:
-            print(f"❌ 备用写入也失败: {e2}")
+            if use_sort:
+                groups = sorted_user_groups(numbered, cols['user_id'], args.sort_buffer, tmp_dir)
+                done = reschedule_groups(groups, ctx, stats)
+                # 按原行号排回输入顺序
+                for _, row in external_sorted((((i,), row) for i, row in done), 1, args.sort_buffer, tmp_dir):
+                    emit(row)
+            else:
+                for _, row in reschedule_groups(iter_user_groups(numbered, cols['user_id']), ctx, stats):
+                    emit(row)
+        except NotGroupedError as e:
+            print(f"❌ 输入未按 user_id 分组：{e}；请加 --sort 使用外部排序")
             sys.exit(1)
+        finally:
+            if ctx['pool']:
+                ctx['pool'].close()
+                ctx['pool'].join()
+    if kept is not None:
+        table_handoff.put(out_path, header, kept)
+
+    print(f"✅ 处理了 {stats['rows']} 行数据")
+    print(f"✅ 已更新 {stats['updated']} 行（跳过 留: {stats['skipped_liu']} 行）\n")
+    if cache:
+        close_cache(cache)
+        reasons = cache['reasons']
+        print(f"增量模式：复用 {cache['reused']} 个用户，重新计算 {sum(reasons.values())} 个用户"
+              f"（新用户 {reasons['new']}，输入变化 {reasons['input']}，"
+              f"随机数位置变化 {reasons['rng_offset']}，参数变化 {reasons['params']}）")
+        if args.report:
+            print(f"重新计算的用户列表: {args.report}")
+        print()
+    if delta:
+        close_delta(delta)
+        print(f"增量输出: {args.delta}（{args.delta_format}）：有变化 {delta['changed']} 行，"
+              f"无变化 {delta['unchanged']} 行" + (f"，缺少 id 未输出 {delta['no_key']} 行" if delta['no_key'] else ""))
+        if args.delta_format == 'copy':
+            print(load_hint(delta, args.delta))
+        print()
 
     print("=" * 60)
     print("✅ 处理完成！")
@@ -260,4 +576,7 @@ def main():
 
 
 if __name__ == "__main__":
+    if sys.platform == 'win32':
+        # 终端输出保持UTF-8，避免中文乱码
+        sys.stdout = codecs.getwriter("utf-8")(sys.stdout.detach())
     main()
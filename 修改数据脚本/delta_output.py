@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+change_course_llm_data.py 的增量输出（--delta）：只写出四个调度列
+（new_started_at_UTC / next_started_at / new_started_at / rest_time）确实变化的行，按 id 定位
+- update：批量 UPDATE ... SET 列 = CASE id WHEN ... END WHERE id IN (...)，每条语句 --batch-size 行
+  （MySQL / SQLite 可直接执行；PostgreSQL 的时间列不接受 CASE 产生的文本，用 copy 格式）
+- copy：id + 四列的制表符分隔文件（NULL 写作 \\N），先导入临时表再按 id 关联更新，命令见 load_hint
+是否变化按数据库中的值判断：时间列按 'YYYY-MM-DD HH:MM:SS' 比较（'2025/1/5 09:05' 与 '2025/1/5 9:05' 相同），
+整数列（id、rest_time）按数值比较。值的写法与 springboot_output.py 相同。
+"""
+
+from springboot_output import DATETIME_COLUMNS, INT_RE, INTEGER_COLUMNS, copy_field, sql_datetime, sql_literal
+
+
+FORMATS = ['update', 'copy']
+KEY_COLUMN = 'id'
+DELTA_COLUMNS = ['new_started_at_UTC', 'next_started_at', 'new_started_at', 'rest_time']
+
+
+def db_value(col: str, value: str) -> str:
+    """写入数据库后的值（用于判断是否变化）"""
+    value = value.strip()
+    if col in DATETIME_COLUMNS:
+        return sql_datetime(value)
+    if col in INTEGER_COLUMNS and INT_RE.match(value):
+        return str(int(value))
+    return value
+
+
+def open_delta(path: str, fmt: str, table: str = 'llm_data', batch_size: int = 500) -> dict:
+    """打开增量输出；返回的 dict 交给 write_change / close_delta"""
+    return {
+        'f': open(path, 'w', encoding='utf-8', newline=''), 'format': fmt, 'table': table,
+        'batch_size': max(1, batch_size), 'pending': [], 'changed': 0, 'unchanged': 0, 'no_key': 0,
+    }
+
+
+def _flush_update(out: dict) -> None:
+    pending = out['pending']
+    if not pending:
+        return
+    keys = [key for key, _ in pending]
+    sets = []
+    for k, col in enumerate(DELTA_COLUMNS):
+        whens = ' '.join(f"WHEN {key} THEN {values[k]}" for key, values in pending)
+        sets.append(f"  {col} = CASE {KEY_COLUMN} {whens} ELSE {col} END")
+    out['f'].write(f"UPDATE {out['table']} SET\n" + ",\n".join(sets)
+                   + f"\nWHERE {KEY_COLUMN} IN ({', '.join(keys)});\n")
+    out['pending'] = []
+
+
+def write_change(out: dict, key: str, old: list, new: list) -> bool:
+    """
+    一行的四列（顺序同 DELTA_COLUMNS）：旧值与新值在数据库中相同则不输出；没有 id 的行无法定位，只计数
+    返回是否写出
+    """
+    if all(db_value(col, a) == db_value(col, b) for col, a, b in zip(DELTA_COLUMNS, old, new)):
+        out['unchanged'] += 1
+        return False
+    if key.strip() == '':
+        out['no_key'] += 1
+        return False
+    out['changed'] += 1
+    if out['format'] == 'copy':
+        out['f'].write('\t'.join(copy_field(col, v) for col, v in zip([KEY_COLUMN] + DELTA_COLUMNS,
+                                                                       [key.strip()] + new)) + '\n')
+        return True
+    out['pending'].append((sql_literal(KEY_COLUMN, key.strip()),
+                           [sql_literal(col, v) for col, v in zip(DELTA_COLUMNS, new)]))
+    if len(out['pending']) >= out['batch_size']:
+        _flush_update(out)
+    return True
+
+
+def close_delta(out: dict) -> None:
+    if out['format'] == 'update':
+        _flush_update(out)
+    out['f'].close()
+
+
+def load_hint(out: dict, path: str) -> str:
+    """copy 格式的导入与更新命令示例"""
+    table = out['table']
+    cols = ', '.join([KEY_COLUMN] + DELTA_COLUMNS)
+    sets_pg = ', '.join(f"{col} = s.{col}" for col in DELTA_COLUMNS)
+    sets_my = ', '.join(f"t.{col} = s.{col}" for col in DELTA_COLUMNS)
+    return (f"PostgreSQL：CREATE TEMP TABLE delta_stage AS SELECT {cols} FROM {table} WITH NO DATA;\n"
+            f"  \\copy delta_stage ({cols}) FROM '{path}'\n"
+            f"  UPDATE {table} SET {sets_pg} FROM delta_stage s WHERE {table}.{KEY_COLUMN} = s.{KEY_COLUMN};\n"
+            f"MySQL：CREATE TEMPORARY TABLE delta_stage SELECT {cols} FROM {table} LIMIT 0;\n"
+            f"  LOAD DATA LOCAL INFILE '{path}' INTO TABLE delta_stage ({cols});\n"
+            f"  UPDATE {table} t JOIN delta_stage s ON t.{KEY_COLUMN} = s.{KEY_COLUMN} SET {sets_my};")
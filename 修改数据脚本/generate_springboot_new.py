@@ -9,27 +9,39 @@
   如果超出 16:30，跳到下一个工作日 9:00(+0-30min) 或 13:00(+0-60min)
 - next_started_at = new_started_at_UTC + course_video_length
 - rest_time 为 2-6（分钟）随机，每条都生成；第 n+1 条使用第 n 条的 rest_time 作为间隔
+- 截止日期（--deadline）：先从最后一条倒推出每条最晚允许的开始时间，
+  随机选择只在不超过该时间的范围内进行，每份一次生成、不重试；
+  某个首条日期无论如何都赶不上截止日期时直接报错
 
 使用：
   python generate_springboot_new.py --input "副本springboot新增.csv" \
     --output "副本springboot新增_生成22.csv" --count 22 --cutoff "2025/12/12"
 可通过 --base-index 指定作为基准的行（具有 video_id、course_id 的行）。
+数据库批量导入（SQL 输出的格式说明见 springboot_output.py）：
+  python generate_springboot_new.py --sets 20000 --format insert --table t --output gen.sql
+  python generate_springboot_new.py --sets 20000 --format copy --table t --output gen.tsv
+全体排程（所有份共用一个日历，每 10 分钟最多 40 人同时观看，新的一份从负荷最小的日期开始）：
+  python generate_springboot_new.py --sets 150 --plan --max-per-slot 40 --deadline 2025/12/19
+  （每天只有 9:00–10:30、13:00–16:30 可以开始观看，默认日期范围内每 10 分钟 20 人约可排 80 份、40 人约 150 份）
 """
 
 import csv
+import io
+import math
+import os
 import sys
 import codecs
+import hashlib
 import argparse
+import bisect
 from datetime import datetime, timedelta, time, date
 import random
+from multiprocessing import Pool
 from typing import Optional, Tuple
 
-
-if sys.platform == 'win32':
-    try:
-        sys.stdout = codecs.getwriter("utf-8")(sys.stdout.detach())
-    except Exception:
-        pass
+import springboot_output
+from schedule_timeline import format_datetime, from_seconds, to_seconds
+from value_parsing import duration_minutes
 
 
 # 列名常量（与 CSV 表头保持一致）
@@ -41,29 +53,26 @@ COLUMNS = [
 
 
 def parse_hms_to_minutes(hms: str) -> float:
-    """将形如 '0:30:02' 或 '0:30:41' 的时长解析为分钟数（含秒）"""
-    if not hms:
-        return 0.0
-    try:
-        parts = hms.split(':')
-        if len(parts) == 3:
-            h, m, s = map(int, parts)
-            return h * 60 + m + s / 60.0
-        elif len(parts) == 2:
-            m, s = map(int, parts)
-            return m + s / 60.0
-    except Exception:
-        pass
-    return 0.0
+    """将形如 '0:30:02' 或 '0:30:41' 的时长解析为分钟数（含秒）；无效为 0"""
+    return duration_minutes(hms) or 0.0
 
 
 def format_dt(dt: datetime) -> str:
-    """格式化为 'YYYY/MM/DD HH:MM' 文本"""
-    return f"{dt.year}/{dt.month}/{dt.day} {dt.hour}:{dt.minute:02d}"
+    """格式化为 'YYYY/MM/DD HH:MM' 文本（日期前缀按日缓存，见 schedule_timeline）"""
+    return format_datetime(dt)
+
+
+# 额外的休息日（--checker-safe 时填入日本节假日，与 check_data.is_weekday_jp 一致）
+HOLIDAYS = frozenset()
+
+
+def set_holidays(days) -> None:
+    global HOLIDAYS
+    HOLIDAYS = frozenset(days)
 
 
 def is_weekday(d: date) -> bool:
-    return d.weekday() < 5  # 0-4 是周一到周五
+    return d.weekday() < 5 and d not in HOLIDAYS  # 0-4 是周一到周五
 
 
 def next_workday(base: datetime) -> datetime:
@@ -137,66 +146,211 @@ def pick_random_worktime_in_range(start_d: date, end_d: date, rng: random.Random
         return base + timedelta(minutes=minute)
 
 
-def pick_random_worktime_on_day(chosen: date, rng: random.Random) -> datetime:
+def pick_random_worktime_on_day(chosen: date, rng: random.Random,
+                                latest: Optional[datetime] = None) -> datetime:
     """在指定工作日 chosen 内随机选择一个时间点：
     - 上午 9:00–10:30 或 下午 13:00–16:30
+    指定 latest 时只在不晚于 latest 的部分中选择（调用方保证至少有一个可选时间）
     """
-    if rng.randint(0, 1) == 0:  # 上午
-        minute = rng.randint(0, 90)
-        base = datetime.combine(chosen, time(9, 0))
-        return base + timedelta(minutes=minute)
-    else:  # 下午
-        minute = rng.randint(0, 210)
-        base = datetime.combine(chosen, time(13, 0))
-        return base + timedelta(minutes=minute)
+    return pick_from_windows(cap_windows(first_start_windows(chosen), latest), rng)
+
+
+# ---- 可行性：不做拒绝采样，先算出每条最晚允许的开始时间 ----
+# 每条的休息时间（分钟）
+REST_MIN = 2
+REST_MAX = 6
+ONE_SEC = timedelta(seconds=1)
+
+
+def first_start_windows(d: date) -> list:
+    """首条开始时间的候选窗口：[(起点, 最大偏移分钟), ...]"""
+    return [(datetime.combine(d, time(9, 0)), 90), (datetime.combine(d, time(13, 0)), 210)]
 
 
-def apply_excel_like_rule(prev_next_started_at: datetime, prev_rest_min: int, rng: random.Random) -> datetime:
+def next_day_windows(d: date) -> list:
+    """跳到新工作日时的候选窗口：9:00(+0..30) 或 13:00(+0..60)"""
+    return [(datetime.combine(d, time(9, 0)), 30), (datetime.combine(d, time(13, 0)), 60)]
+
+
+def cap_windows(windows: list, latest: Optional[datetime]) -> list:
+    """把窗口截到不晚于 latest；整个窗口都晚于 latest 的去掉"""
+    if latest is None:
+        return windows
+    capped = []
+    for base, max_offset in windows:
+        if base <= latest:
+            capped.append((base, min(max_offset, int((latest - base).total_seconds() // 60))))
+    return capped
+
+
+def pick_from_windows(windows: list, rng: random.Random) -> datetime:
+    """先随机选窗口（只有一个可选时不消耗随机数），再在窗口内随机分钟"""
+    base, max_offset = windows[rng.randint(0, 1)] if len(windows) == 2 else windows[0]
+    return base + timedelta(minutes=rng.randint(0, max_offset))
+
+
+def prev_workday(d: date) -> date:
+    d = d - timedelta(days=1)
+    while not is_weekday(d):
+        d = d - timedelta(days=1)
+    return d
+
+
+# --checker-safe：每条的开始和结束都须落在 check_data 的工作时段 [9,12) ∪ [13,18) 的同一段内
+def segment_last(t: datetime) -> datetime:
+    """t 所在时段内允许的最晚结束时间（上午 11:59，下午 17:59）"""
+    return t.replace(hour=11 if t.hour < 12 else 17, minute=59, second=0, microsecond=0)
+
+
+def fits_segment(start: datetime, length: Optional[timedelta]) -> bool:
+    return length is None or start + length <= segment_last(start)
+
+
+def fit_windows(windows: list, length: Optional[timedelta]) -> list:
+    """把窗口截到整条仍能放进同一时段（length 为 None 时不限制）"""
+    if length is None:
+        return windows
+    fitted = []
+    for base, max_offset in windows:
+        room = int((segment_last(base) - length - base).total_seconds() // 60)
+        if room >= 0:
+            fitted.append((base, min(max_offset, room)))
+    return fitted
+
+
+def choose_earliest(windows: list) -> datetime:
+    return windows[0][0]
+
+
+def choose_latest(windows: list) -> datetime:
+    return max(base + timedelta(minutes=max_offset) for base, max_offset in windows)
+
+
+def place_start(candidate: datetime, choose, latest: Optional[datetime] = None,
+                length: Optional[timedelta] = None) -> datetime:
+    """
+    Excel 规则的统一实现，choose(windows) 决定随机部分的取法（随机 / 最早 / 最晚）：
+    - 非工作日 → 下一工作日 9:00(+0..30) 或 13:00(+0..60)
+    - 时分 >= 16:30 → 同上
+    - 10:30 ≤ candidate < 13:00 → 当天 13:00 + 0..60
+    - HOUR < 9 → 当天 9:00；否则 → candidate
+    latest：随机部分只取不晚于 latest 的值；
+    length（--checker-safe）：整条须放进同一时段，上午放不下的顺延到 13:00(+0..60)，下午放不下的顺延到下一工作日
+    """
+    def _pick(windows):
+        return choose(cap_windows(fit_windows(windows, length), latest))
+
+    d = candidate.date()
+    if not is_weekday(d):
+        nd = d
+        while not is_weekday(nd):
+            nd = nd + timedelta(days=1)
+        return _pick(next_day_windows(nd))
+    if candidate.time() >= time(16, 30):
+        return _pick(next_day_windows(next_workday(candidate).date()))
+    lunch = [(datetime.combine(d, time(13, 0)), 60)]
+    if time(10, 30) <= candidate.time() < time(13, 0):
+        return _pick(lunch)
+
+    start = datetime.combine(d, time(9, 0)) if candidate.hour < 9 else candidate
+    if fits_segment(start, length):
+        return start
+    if start.hour < 12:
+        return _pick(lunch)
+    return _pick(next_day_windows(next_workday(candidate).date()))
+
+
+def earliest_start_from(candidate: datetime, length: Optional[timedelta] = None) -> datetime:
+    """Excel 规则下，从 candidate 出发可能得到的最早开始时间（随机偏移取 0）"""
+    return place_start(candidate, choose_earliest, length=length)
+
+
+def latest_start_from(candidate: datetime, length: Optional[timedelta] = None) -> datetime:
+    """Excel 规则下，从 candidate 出发可能得到的最晚开始时间（随机偏移取最大）"""
+    return place_start(candidate, choose_latest, length=length)
+
+
+def latest_candidate_for(limit: datetime, length: Optional[timedelta] = None) -> datetime:
+    """earliest_start_from 的逆：最晚的 candidate，使其最早开始时间仍不晚于 limit。
+    规则对 candidate 单调不减，且开始时间不早于 candidate，所以：
+    - limit 落在可直接开始的时段（工作日 9:00–10:30、13:00–16:30）→ limit 本身
+    - limit 落在 10:30–13:00 → 当天 10:30 前一秒
+    - limit 落在 16:30 以后 → 当天 16:30 前一秒
+    - limit 落在 9:00 前或非工作日 → 上一个工作日 16:30 前一秒
+    --checker-safe（length 不为 None）时还要看能否放进时段，仍单调，按整分钟二分查找
+    """
+    if length is not None:
+        if earliest_start_from(limit, length) <= limit:
+            return limit
+        # 两周内总有可用的时段；找不到时返回下界，后续可行性检查会报错
+        lo = limit - timedelta(days=14)
+        lo_min, hi_min = 0, int((limit - lo).total_seconds() // 60)
+        if earliest_start_from(lo, length) > limit:
+            return lo
+        while hi_min - lo_min > 1:
+            mid = (lo_min + hi_min) // 2
+            if earliest_start_from(lo + timedelta(minutes=mid), length) <= limit:
+                lo_min = mid
+            else:
+                hi_min = mid
+        return lo + timedelta(minutes=lo_min)
+
+    d = limit.date()
+    t = limit.time()
+    if not is_weekday(d) or t < time(9, 0):
+        return datetime.combine(prev_workday(d), time(16, 30)) - ONE_SEC
+    if time(10, 30) <= t < time(13, 0):
+        return datetime.combine(d, time(10, 30)) - ONE_SEC
+    if t >= time(16, 30):
+        return datetime.combine(d, time(16, 30)) - ONE_SEC
+    return limit
+
+
+def latest_starts(lengths: list, deadline_dt: datetime, fit_lengths: Optional[list] = None) -> list:
+    """从最后一条倒推：每条最晚允许的开始时间（之后全部取最理想的随机结果仍能按期完成）
+    fit_lengths：--checker-safe 时与 lengths 相同（每条须放进同一时段），否则为 None
+    """
+    fit_lengths = fit_lengths or [None] * len(lengths)
+    latest = [deadline_dt - lengths[-1]]
+    for j in range(len(lengths) - 2, -1, -1):
+        latest.append(latest_candidate_for(latest[-1], fit_lengths[j + 1]) - timedelta(minutes=REST_MIN) - lengths[j])
+    latest.reverse()
+    return latest
+
+
+def finish_bounds(first_start: datetime, lengths: list, fit_lengths: Optional[list] = None) -> Tuple[datetime, datetime]:
+    """给定首条开始时间，最后一条 next_started_at 的最早/最晚可能值"""
+    fit_lengths = fit_lengths or [None] * len(lengths)
+    early = first_start + lengths[0]
+    late = first_start + lengths[0]
+    for length, fit in zip(lengths[1:], fit_lengths[1:]):
+        early = earliest_start_from(early + timedelta(minutes=REST_MIN), fit) + length
+        late = latest_start_from(late + timedelta(minutes=REST_MAX), fit) + length
+    return early, late
+
+
+def pick_rest(prev_next: datetime, limit: Optional[datetime], rng: random.Random) -> int:
+    """随机休息时间；limit 为下一条 candidate 的上限（None 表示不受限）"""
+    rest_max = REST_MAX
+    if limit is not None:
+        rest_max = min(REST_MAX, int((limit - prev_next).total_seconds() // 60))
+    return rng.randint(REST_MIN, rest_max)
+
+
+def apply_excel_like_rule(prev_next_started_at: datetime, prev_rest_min: int, rng: random.Random,
+                          latest: Optional[datetime] = None, length: Optional[timedelta] = None) -> datetime:
     """实现题述 Excel 规则，得到本行 new_started_at_UTC：
     以 candidate = prev_next_started_at + prev_rest_min。
     - 若 candidate 的时分 >= 16:30 → 下个工作日 9:00(+0..30) 或 13:00(+0..60)
     - 若 HOUR(candidate) < 9 → 当天 9:00
     - 若 10:30 ≤ candidate < 13:00 → 当天 13:00 + 0..60
     - 否则 → candidate
-    同时处理周末：如果命中周末，则移动到下一工作日 9:00(+0..30) 或 13:00(+0..60)
+    同时处理周末（及 HOLIDAYS）：如果命中，则移动到下一工作日 9:00(+0..30) 或 13:00(+0..60)
+    指定 latest 时随机部分只在不晚于 latest 的范围内选择
+    （调用方保证 earliest_start_from(candidate, length) <= latest）；length 见 place_start
     """
     candidate = prev_next_started_at + timedelta(minutes=prev_rest_min)
-
-    def _pick_next_day_start(d: date) -> datetime:
-        # 选择 9:00(+0..30) 或 13:00(+0..60)
-        if rng.randint(0, 1) == 0:
-            return datetime.combine(d, time(9, 0)) + timedelta(minutes=rng.randint(0, 30))
-        else:
-            return datetime.combine(d, time(13, 0)) + timedelta(minutes=rng.randint(0, 60))
-
-    # 如果是周末，直接跳到下一个工作日
-    if candidate.weekday() >= 5:
-        nd = candidate.date()
-        while nd.weekday() >= 5:
-            nd = nd + timedelta(days=1)
-        return _pick_next_day_start(nd)
-
-    hm_val = candidate.hour + candidate.minute / 60.0
-
-    # >= 16:30 → 下一工作日
-    if hm_val >= 16.5:
-        nd = next_workday(candidate).date()
-        return _pick_next_day_start(nd)
-
-    # < 9 → 当天 9:00
-    if candidate.hour < 9:
-        d = candidate.date()
-        return datetime.combine(d, time(9, 0))
-
-    # [10:30, 13:00) → 当天 13:00 + 随机 0..60
-    t_1030 = time(10, 30)
-    t_1300 = time(13, 0)
-    if t_1030 <= candidate.time() < t_1300:
-        d = candidate.date()
-        return datetime.combine(d, time(13, 0)) + timedelta(minutes=rng.randint(0, 60))
-
-    # 其他 → candidate
-    return candidate
+    return place_start(candidate, lambda windows: pick_from_windows(windows, rng), latest, length)
 
 
 def pick_base_row(rows, header_norm, base_index: Optional[int]) -> Tuple[int, dict]:
@@ -238,6 +392,344 @@ def pick_base_row(rows, header_norm, base_index: Optional[int]) -> Tuple[int, di
     return idx, data
 
 
+def plan_first_windows(candidate_days: list, lengths: list, deadline_dt: datetime,
+                       fit_lengths: Optional[list] = None) -> Tuple[list, dict]:
+    """
+    计算每条最晚允许的开始时间，以及每个候选首条日期上可选的首条开始窗口
+    有日期无法在截止前完成（即使每一步都取最早的随机结果）时直接报错，说明原因
+    fit_lengths：见 latest_starts
+    返回：(latest, {日期: [(起点, 最大偏移分钟), ...]})
+    """
+    fit_lengths = fit_lengths or [None] * len(lengths)
+    too_long = [j + 1 for j, fit in enumerate(fit_lengths) if fit is not None and not fit_windows(next_day_windows(candidate_days[0]), fit)]
+    if too_long:
+        raise RuntimeError(f"第 {', '.join(map(str, too_long))} 条视频超过 5 小时，放不进任何一个工作时段（13:00–17:59）")
+
+    latest = latest_starts(lengths, deadline_dt, fit_lengths)
+    day_windows = {}
+    infeasible = []
+    for d in candidate_days:
+        windows = cap_windows(fit_windows(first_start_windows(d), fit_lengths[0]), latest[0])
+        if windows:
+            day_windows[d] = windows
+        else:
+            infeasible.append(d)
+
+    first_earliest = choose_earliest(fit_windows(first_start_windows(candidate_days[0]), fit_lengths[0]))
+    last_latest = choose_latest(fit_windows(first_start_windows(candidate_days[-1]), fit_lengths[0]))
+    earliest_finish, _ = finish_bounds(first_earliest, lengths, fit_lengths)
+    _, latest_finish = finish_bounds(last_latest, lengths, fit_lengths)
+    print(f"完成时间可能范围：最早 {format_dt(earliest_finish)}，最晚 {format_dt(latest_finish)}"
+          f"（截止 {format_dt(deadline_dt)}）")
+
+    if infeasible:
+        days_text = ', '.join(f"{d.year}/{d.month}/{d.day}" for d in infeasible)
+        reason = (f"{len(lengths)} 条视频（合计 {sum(lengths, timedelta())}）按每天的时段排布，"
+                  f"首条最晚须在 {format_dt(latest[0])} 开始才能在 {format_dt(deadline_dt)} 前完成")
+        if day_windows:
+            last_ok = max(day_windows)
+            hint = f"请把 --first-range 的结束日期改为 {last_ok.year}/{last_ok.month}/{last_ok.day} 或更早，或推迟 --deadline"
+        else:
+            hint = (f"即使从 {format_dt(first_earliest)} 开始，最早也要到 {format_dt(earliest_finish)} 才能完成，"
+                    f"请推迟 --deadline 或提前 --first-range")
+        raise RuntimeError(f"以下首条日期无法在截止前完成：{days_text}\n{reason}\n{hint}")
+
+    for d, windows in day_windows.items():
+        if windows != fit_windows(first_start_windows(d), fit_lengths[0]):
+            ranges = '、'.join(f"{base:%H:%M}–{base + timedelta(minutes=m):%H:%M}" for base, m in windows)
+            print(f"首条日期 {d.year}/{d.month}/{d.day} 的可选开始时间：{ranges}")
+    return latest, day_windows
+
+
+def make_output_row(header_norm: list, video_id: str, course_id: str, length_str: str,
+                    start_utc: datetime, next_utc: datetime, rest: int) -> list:
+    """按表头顺序组装一行输出"""
+    r = {name: '' for name in header_norm}
+    r['disabled'] = '0'
+    r['seq'] = '0'
+    r['verify'] = '0'
+    r['is_finished'] = '0'
+    r['video_id'] = video_id
+    r['course_id'] = course_id
+    r['course_video_length'] = length_str
+    r['new_started_at_UTC'] = format_dt(start_utc)
+    r['next_started_at'] = format_dt(next_utc)
+    r['rest_time'] = str(rest)
+    # 复制到旧列
+    r['started_at'] = r['new_started_at_UTC']
+    r['first_finished_time'] = r['next_started_at']
+    return [r.get(col, '') for col in header_norm]
+
+
+# ---- 每份独立的随机数流 ----
+# 每次交给一个进程的份数（结果与分块方式、进程数无关）
+SETS_PER_TASK = 500
+
+
+def derive_seed(seed: int, *labels) -> int:
+    """由基础 seed 和标签（如 'set', 5）派生独立的 64 位种子"""
+    text = '/'.join(str(x) for x in (seed,) + labels)
+    return int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'big')
+
+
+def assigned_day_for(k: int, candidate_days: list, seed: int) -> date:
+    """第 k 份的首条日期：每 len(candidate_days) 份为一轮，每轮独立洗牌，保证各日期均匀分配"""
+    block = list(candidate_days)
+    random.Random(derive_seed(seed, 'days', k // len(block))).shuffle(block)
+    return block[k % len(block)]
+
+
+def parse_set_list(text: str, sets_count: int) -> list:
+    """'1,3,5-8'（从 1 开始的份号）→ 排好序、去重的 0 起索引"""
+    indices = set()
+    for token in _parse_list(text):
+        lo, _, hi = token.partition('-')
+        try:
+            lo_i = int(lo)
+            hi_i = int(hi) if hi else lo_i
+        except ValueError:
+            raise RuntimeError(f'参数 --only-sets 格式错误：{token}（应为 1,3,5-8 这样的份号）')
+        if lo_i < 1 or hi_i > sets_count or lo_i > hi_i:
+            raise RuntimeError(f'参数 --only-sets 超出范围：{token}（份号为 1..{sets_count}）')
+        indices.update(range(lo_i - 1, hi_i))
+    return sorted(indices)
+
+
+def generate_set_rows(k: int, ctx: dict) -> list:
+    """python 引擎：用第 k 份自己的随机数流生成一份的全部行"""
+    rng = random.Random(derive_seed(ctx['seed'], 'set', k))
+    lengths = ctx['lengths']
+    latest = ctx['latest']
+    rows = []
+    # 第一条：在分配到的工作日的可选窗口中随机时间，之后逐条一次生成，不再重试
+    first_day = assigned_day_for(k, ctx['candidate_days'], ctx['seed'])
+    start_utc = pick_from_windows(ctx['day_windows'][first_day], rng)
+    for j in range(len(lengths)):
+        if j > 0:
+            start_utc = apply_excel_like_rule(prev_next, prev_rest, rng, latest[j], ctx['fit_lengths'][j])
+        next_utc = start_utc + lengths[j]
+        rest = pick_rest(next_utc, ctx['candidate_limits'][j], rng)
+        rows.append(make_output_row(ctx['header_norm'], ctx['vid_list'][j],
+                                    ctx['cid_list'][j], ctx['lengths_strs'][j], start_utc, next_utc, rest))
+        prev_next = next_utc
+        prev_rest = rest
+    return rows
+
+
+def load_check_data():
+    """导入 检查数据脚本/check_data.py（--checker-safe 用）"""
+    checker_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '检查数据脚本')
+    if checker_dir not in sys.path:
+        sys.path.insert(0, checker_dir)
+    try:
+        import check_data
+    except ImportError as e:
+        print(f"--checker-safe 需要 检查数据脚本/check_data.py 及其依赖（pandas、holidays）：{e}", file=sys.stderr)
+        sys.exit(1)
+    return check_data
+
+
+def checker_findings(block: str, header_norm: list) -> list:
+    """用 check_data 的时间规则（条件 0-3）复核一份输出：
+    new_started_at_UTC / next_started_at / course_video_length 对应 視聴開始時間 / 視聴完了時間 / 標準視聴時間
+    返回：[(份内行号, 描述), ...]
+    """
+    check_data = load_check_data()
+    i_start = header_norm.index('new_started_at_UTC')
+    i_end = header_norm.index('next_started_at')
+    i_std = header_norm.index('course_video_length')
+    rows = list(csv.reader(io.StringIO(block, newline='')))
+    issues, _prev = check_data.evaluate_time_rules(
+        list(range(len(rows))),
+        [check_data.parse_dt(r[i_start]) for r in rows],
+        [check_data.parse_dt(r[i_end]) for r in rows],
+        [check_data.time_to_minutes(r[i_std]) for r in rows])
+    return sorted(issues)
+
+
+def generate_chunk(task) -> list:
+    """生成一批份，返回每份一段 CSV 文本（可在子进程中执行）"""
+    ctx, indices = task
+    set_holidays(ctx['holidays'])
+    if ctx['engine'] == 'numpy':
+        import springboot_batch
+        assigned = [assigned_day_for(k, ctx['candidate_days'], ctx['seed']) for k in indices]
+        uniforms = springboot_batch.set_uniforms([derive_seed(ctx['seed'], 'set', k) for k in indices],
+                                                 len(ctx['lengths']))
+        starts, nexts, rests = springboot_batch.generate_sets(
+            assigned, ctx['lengths'], ctx['latest'], ctx['candidate_limits'], uniforms, is_weekday,
+            ctx['fit_lengths'])
+        blocks = springboot_batch.format_blocks(ctx['header_norm'], ctx['vid_list'], ctx['cid_list'],
+                                                ctx['lengths_strs'], starts, nexts, rests)
+    else:
+        blocks = []
+        for k in indices:
+            buf = io.StringIO()
+            csv.writer(buf).writerows(generate_set_rows(k, ctx))
+            blocks.append(buf.getvalue())
+
+    validate_blocks(ctx, indices, blocks)
+    return blocks
+
+
+def validate_blocks(ctx: dict, indices, blocks) -> None:
+    """--checker-safe：逐份用 check_data 复核，有问题直接报错（正常情况下不会发生）"""
+    if not ctx['checker_safe']:
+        return
+    for k, block in zip(indices, blocks):
+        findings = checker_findings(block, ctx['header_norm'])
+        if findings:
+            detail = '；'.join(f"第 {row + 1} 条 {reason}" for row, reason in findings[:5])
+            raise RuntimeError(f"第 {k + 1} 份未通过 check_data 复核：{detail}")
+
+
+# ---- 全体排程（--plan）：所有份依次排在同一个日历上 ----
+# 按“时段”（--slot-minutes 分钟一格）计数同时观看的人数，已满的时段号放在有序列表里二分查找；
+# 按日期累计观看分钟数，新的一份从负荷最小的候选日开始；排不下时改从最早的候选日重排这一份
+def new_occupancy(slot_minutes: int, max_per_slot: int) -> dict:
+    return {
+        'slot_minutes': slot_minutes, 'cap': max_per_slot,
+        'count': {},      # 时段号 -> 同时观看人数
+        'full': [],       # 已满的时段号（升序）
+        'day_load': {},   # 日期 -> 观看分钟数
+    }
+
+
+def slot_range(occ: dict, start: datetime, end: datetime, held: int = -1) -> range:
+    """
+    [start, end) 覆盖的时段号（时段号 = 整数分钟时间线 // 时段长度）
+    held：同一份上一条已计入的最后一个时段号；同一个人在一个时段里只算一次，这些时段不再计数
+    """
+    return range(max(to_seconds(start) // 60 // occ['slot_minutes'], held + 1),
+                 (to_seconds(end) - 1) // 60 // occ['slot_minutes'] + 1)
+
+
+def slot_start(occ: dict, slot: int) -> datetime:
+    return from_seconds(slot * occ['slot_minutes'] * 60)
+
+
+def first_full_slot(occ: dict, start: datetime, end: datetime, held: int = -1) -> Optional[int]:
+    """[start, end) 需要新计入的时段中第一个已满的时段号，O(log n)"""
+    if not occ['cap']:
+        return None
+    slots = slot_range(occ, start, end, held)
+    full = occ['full']
+    i = bisect.bisect_left(full, slots.start)
+    if i < len(full) and full[i] < slots.stop:
+        return full[i]
+    return None
+
+
+def occupy(occ: dict, start: datetime, end: datetime, held: int = -1) -> int:
+    """计入 [start, end) 的时段，返回计入后本份已计入的最后一个时段号（下一条的 held）"""
+    count = occ['count']
+    slots = slot_range(occ, start, end, held)
+    for slot in slots:
+        c = count.get(slot, 0) + 1
+        count[slot] = c
+        if c == occ['cap']:
+            bisect.insort(occ['full'], slot)
+    d = start.date()
+    occ['day_load'][d] = occ['day_load'].get(d, 0) + int((end - start).total_seconds() // 60)
+    return max(held, slots.stop - 1)
+
+
+def release(occ: dict, start: datetime, end: datetime, held: int = -1) -> None:
+    """撤销 occupy（held 与当时传给 occupy 的相同；一份没能排完时退回它已占用的时段）"""
+    count = occ['count']
+    for slot in slot_range(occ, start, end, held):
+        if count[slot] == occ['cap']:
+            occ['full'].pop(bisect.bisect_left(occ['full'], slot))
+        count[slot] -= 1
+    d = start.date()
+    occ['day_load'][d] -= int((end - start).total_seconds() // 60)
+
+
+def peak_load(occ: dict) -> int:
+    return max(occ['count'].values(), default=0)
+
+
+def push_past_full_slots(occ: dict, start: datetime, length: timedelta,
+                         fit: Optional[timedelta], latest: datetime, held: int = -1) -> Optional[datetime]:
+    """start 所需的时段有已满的，就顺延到该时段之后最早的合规开始时间；超过 latest 返回 None"""
+    while True:
+        if start > latest:
+            return None
+        full = first_full_slot(occ, start, start + length, held)
+        if full is None:
+            return start
+        start = earliest_start_from(slot_start(occ, full + 1), fit)
+
+
+def place_plan_set(ctx: dict, occ: dict, first_day: date, rng: random.Random) -> Optional[list]:
+    """从 first_day 开始排一份并占用时段；有一条赶不上截止时退回已占用的时段，返回 None"""
+    lengths = ctx['lengths']
+    latest = ctx['latest']
+    fit_lengths = ctx['fit_lengths']
+    rows = []
+    placed = []
+    held = -1
+    start_utc = pick_from_windows(ctx['day_windows'][first_day], rng)
+    for j in range(len(lengths)):
+        if j > 0:
+            candidate = prev_next + timedelta(minutes=prev_rest)
+            if earliest_start_from(candidate, fit_lengths[j]) > latest[j]:
+                start_utc = None
+            else:
+                start_utc = apply_excel_like_rule(prev_next, prev_rest, rng, latest[j], fit_lengths[j])
+        if start_utc is not None:
+            start_utc = push_past_full_slots(occ, start_utc, lengths[j], fit_lengths[j], latest[j], held)
+        if start_utc is None:
+            for start, end, before in placed:
+                release(occ, start, end, before)
+            return None
+        next_utc = start_utc + lengths[j]
+        placed.append((start_utc, next_utc, held))
+        held = occupy(occ, start_utc, next_utc, held)
+        rest = pick_rest(next_utc, ctx['candidate_limits'][j], rng)
+        rows.append(make_output_row(ctx['header_norm'], ctx['vid_list'][j],
+                                    ctx['cid_list'][j], ctx['lengths_strs'][j], start_utc, next_utc, rest))
+        prev_next = next_utc
+        prev_rest = rest
+    return rows
+
+
+def plan_set_rows(k: int, ctx: dict, occ: dict) -> list:
+    """
+    --plan：与 generate_set_rows 相同的随机数流，另外避开已满的时段、从负荷最小的日期开始；
+    这样排不下时，按日期从早到晚（离截止越远余量越大）依次改从其他候选日重排这一份，都排不下才报错
+    """
+    rng = random.Random(derive_seed(ctx['seed'], 'set', k))
+    loads = occ['day_load']
+    days = list(ctx['day_windows'])
+    least = min(loads.get(d, 0) for d in days)
+    ties = [d for d in days if loads.get(d, 0) == least]
+    first_day = ties[rng.randrange(len(ties))]
+
+    rows = place_plan_set(ctx, occ, first_day, rng)
+    for d in days:
+        if rows is not None:
+            return rows
+        if d != first_day:
+            rows = place_plan_set(ctx, occ, d, random.Random(derive_seed(ctx['seed'], 'set', k, 'retry', d.isoformat())))
+    if rows is None:
+        raise RuntimeError(
+            f"第 {k + 1} 份：在每 {occ['slot_minutes']} 分钟最多 {occ['cap']} 人的限制下，从任何候选日开始都无法在截止前排入"
+            f"（已排入 {k} 份），请放宽 --max-per-slot、推迟 --deadline 或减少份数")
+    return rows
+
+
+def plan_blocks(ctx: dict, sets_count: int, occ: dict):
+    """--plan：按份号依次排程，逐份产出 (份号, CSV 文本)"""
+    set_holidays(ctx['holidays'])
+    for k in range(sets_count):
+        buf = io.StringIO()
+        csv.writer(buf).writerows(plan_set_rows(k, ctx, occ))
+        block = buf.getvalue()
+        validate_blocks(ctx, [k], [block])
+        yield k, block
+
+
 def _parse_list(text: Optional[str]) -> list:
     if not text:
         return []
@@ -245,7 +737,7 @@ def _parse_list(text: Optional[str]) -> list:
     return [tok.strip() for tok in raw.split() if tok.strip()]
 
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description='生成 22 份数据，每份32条（组间空行）')
     parser.add_argument('--input', default='副本springboot新增.csv')
     parser.add_argument('--output', default='副本springboot新增_生成22.csv')
@@ -260,10 +752,30 @@ def main():
     parser.add_argument('--video-ids', default=None, help='32个video_id，逗号或空白分隔；若缺省则从CSV读取')
     parser.add_argument('--course-ids', default=None, help='与video_id一一对应；若缺省则从CSV映射')
     parser.add_argument('--lengths', default=None, help='32个课程时长（h:m:s），逗号或空白分隔；缺省则从CSV读取')
-
-    args = parser.parse_args()
-
-    rng = random.Random(args.seed)
+    parser.add_argument('--engine', choices=['python', 'numpy'], default='python',
+                        help='numpy：全部份批量向量生成（大量份时使用；同一 seed 可复现，但数值与 python 引擎不同）')
+    parser.add_argument('--format', choices=springboot_output.FORMATS, default='csv',
+                        help='csv：原格式；insert：多行 INSERT 语句；copy：LOAD DATA / COPY 用的制表符文件（NULL 为 \\N）')
+    parser.add_argument('--table', default='springboot_new', help='SQL 输出的表名')
+    parser.add_argument('--batch-size', type=int, default=1000, help='insert 格式每条 INSERT 的行数')
+    parser.add_argument('--sql-dialect', choices=springboot_output.DIALECTS, default='standard',
+                        help="insert 格式的字符串转义：standard（SQLite / PostgreSQL）；mysql（另转义反斜杠）")
+    parser.add_argument('--create-table', action='store_true',
+                        help='insert 格式开头加 CREATE TABLE IF NOT EXISTS（用于本地 SQLite 等替身库）')
+    parser.add_argument('--checker-safe', action='store_true',
+                        help='与 check_data 的规则一致：跳过日本节假日、每条整段落在 [9,12)∪[13,18)，'
+                             '生成后逐份用 check_data 的规则复核（需要 pandas、holidays）')
+    parser.add_argument('--plan', action='store_true',
+                        help='全体排程：所有份排在同一日历上，新的一份从负荷最小的日期开始，并限制每个时段的同时观看人数')
+    parser.add_argument('--max-per-slot', type=int, default=0, help='--plan 时每个时段最多同时观看人数（0 为不限）')
+    parser.add_argument('--slot-minutes', type=int, default=10, help='--plan 的时段长度（分钟）')
+    parser.add_argument('--workers', type=int, default=1, help='并行进程数；输出与进程数无关，逐字节相同')
+    parser.add_argument('--only-sets', default=None,
+                        help='只重新生成指定的份（从 1 开始的份号，如 "3,7,10-12"），结果与完整生成中的对应份相同')
+
+    args = parser.parse_args(argv)
+    if args.plan and (args.engine == 'numpy' or args.workers > 1):
+        parser.error('--plan 需要依次排程，不能与 --engine numpy 或 --workers 同时使用')
 
     # 读取 CSV
     # 使用 utf-8-sig 读取，自动去除 BOM；并兼容表头名中的空白
@@ -355,6 +867,12 @@ def main():
     # 份数确定
     sets_count = args.sets if args.count is None else args.count
 
+    if args.checker_safe:
+        # 与 check_data 使用同一份日本节假日表（截止日之后留一年余量，供顺延使用）
+        check_data = load_check_data()
+        set_holidays(h for y in range(first_start_date.year, deadline_date.year + 2)
+                     for h in check_data.japan_holidays(y))
+
     # 计算范围内的工作日列表，并做均匀随机分配到每份以减少集中落到某一天
     candidate_days = []
     cur_day = first_start_date
@@ -365,150 +883,72 @@ def main():
     if not candidate_days:
         raise RuntimeError('指定范围内没有工作日可用')
 
-    assigned_days = []
-    while len(assigned_days) < sets_count:
-        block = list(candidate_days)
-        rng.shuffle(block)
-        assigned_days.extend(block)
-    assigned_days = assigned_days[:sets_count]
-
-    def make_row_template():
-        return {name: '' for name in header_norm}
-
-    out_rows = []
-    for s in range(sets_count):
-        # 多次尝试以确保最终不超过 deadline
-        max_attempts = 200
-        generated_rows = None
-        for _attempt in range(max_attempts):
-            # 第一条：在分配到的工作日中随机时间
-            first_day = assigned_days[s]
-            first_start_utc = pick_random_worktime_on_day(first_day, rng)
-            first_len_min = parse_hms_to_minutes(lengths_strs[0])
-            first_next = first_start_utc + timedelta(minutes=first_len_min)
-            first_rest = rng.randint(2, 6)
-
-            trial_rows = []
-            # 第1条
-            r1 = make_row_template()
-            r1['disabled'] = '0'
-            r1['seq'] = '0'
-            r1['verify'] = '0'
-            r1['is_finished'] = '0'
-            r1['video_id'] = vid_list[0]
-            r1['course_id'] = cid_list[0]
-            r1['course_video_length'] = lengths_strs[0]
-            r1['new_started_at_UTC'] = format_dt(first_start_utc)
-            r1['next_started_at'] = format_dt(first_next)
-            r1['rest_time'] = str(first_rest)
-            # 复制到旧列
-            r1['started_at'] = r1['new_started_at_UTC']
-            r1['first_finished_time'] = r1['next_started_at']
-
-            out_row1 = [''] * len(header)
-            for i, col in enumerate(header_norm):
-                out_row1[i] = r1.get(col, '')
-            trial_rows.append(out_row1)
-
-            prev_next = first_next
-            prev_rest = first_rest
-
-            # 后续31条
-            for j in range(1, len(vid_list)):
-                start_utc = apply_excel_like_rule(prev_next, prev_rest, rng)
-                row_len_min = parse_hms_to_minutes(lengths_strs[j])
-                next_utc = start_utc + timedelta(minutes=row_len_min)
-                rest = rng.randint(2, 6)
-
-                r = make_row_template()
-                r['disabled'] = '0'
-                r['seq'] = '0'
-                r['verify'] = '0'
-                r['is_finished'] = '0'
-                r['video_id'] = vid_list[j]
-                r['course_id'] = cid_list[j]
-                r['course_video_length'] = lengths_strs[j]
-                r['new_started_at_UTC'] = format_dt(start_utc)
-                r['next_started_at'] = format_dt(next_utc)
-                r['rest_time'] = str(rest)
-                # 复制到旧列
-                r['started_at'] = r['new_started_at_UTC']
-                r['first_finished_time'] = r['next_started_at']
-
-                out_row = [''] * len(header)
-                for i, col in enumerate(header_norm):
-                    out_row[i] = r.get(col, '')
-                trial_rows.append(out_row)
-
-                prev_next = next_utc
-                prev_rest = rest
-
-            # 检查最后一个 next_started_at 是否不超过截止日期
-            if prev_next <= deadline_dt:
-                generated_rows = trial_rows
-                break
-
-        if generated_rows is None:
-            # 回退：使用范围起始日的 9:00 作为首条起点再生成一次（尽量满足约束）
-            first_start_utc = datetime.combine(first_start_date, time(9, 0))
-            first_len_min = parse_hms_to_minutes(lengths_strs[0])
-            first_next = first_start_utc + timedelta(minutes=first_len_min)
-            first_rest = 2
-
-            trial_rows = []
-            r1 = make_row_template()
-            r1['disabled'] = '0'
-            r1['seq'] = '0'
-            r1['verify'] = '0'
-            r1['is_finished'] = '0'
-            r1['video_id'] = vid_list[0]
-            r1['course_id'] = cid_list[0]
-            r1['course_video_length'] = lengths_strs[0]
-            r1['new_started_at_UTC'] = format_dt(first_start_utc)
-            r1['next_started_at'] = format_dt(first_next)
-            r1['rest_time'] = str(first_rest)
-            out_row1 = [''] * len(header)
-            for i, col in enumerate(header_norm):
-                out_row1[i] = r1.get(col, '')
-            trial_rows.append(out_row1)
-            prev_next = first_next
-            prev_rest = first_rest
-            for j in range(1, len(vid_list)):
-                start_utc = apply_excel_like_rule(prev_next, prev_rest, rng)
-                row_len_min = parse_hms_to_minutes(lengths_strs[j])
-                next_utc = start_utc + timedelta(minutes=row_len_min)
-                rest = 2
-                r = make_row_template()
-                r['disabled'] = '0'
-                r['seq'] = '0'
-                r['verify'] = '0'
-                r['is_finished'] = '0'
-                r['video_id'] = vid_list[j]
-                r['course_id'] = cid_list[j]
-                r['course_video_length'] = lengths_strs[j]
-                r['new_started_at_UTC'] = format_dt(start_utc)
-                r['next_started_at'] = format_dt(next_utc)
-                r['rest_time'] = str(rest)
-                out_row = [''] * len(header)
-                for i, col in enumerate(header_norm):
-                    out_row[i] = r.get(col, '')
-                trial_rows.append(out_row)
-                prev_next = next_utc
-                prev_rest = rest
-            generated_rows = trial_rows
-
-        out_rows.extend(generated_rows)
-        if s != sets_count - 1:
-            out_rows.append([''] * len(header))
-
-    # 写出 CSV
-    with open(args.output, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(header)
-        writer.writerows(out_rows)
-
-    print(f"✅ 已生成 {sets_count} 份，每份 {len(vid_list)} 条，共 {len(out_rows)} 行到 {args.output}")
+    # 可行性：先算出每条最晚允许的开始时间，以及每个首条日期可选的开始窗口
+    if args.checker_safe:
+        # 输出只到分钟：时长向上取整到整分钟，保证输出的“结束 - 开始”不短于标准时长（条件 1）
+        lengths = [timedelta(minutes=math.ceil(parse_hms_to_minutes(x) - 1e-9)) for x in lengths_strs]
+        fit_lengths = lengths
+    else:
+        lengths = [timedelta(seconds=round(parse_hms_to_minutes(x) * 60)) for x in lengths_strs]
+        fit_lengths = [None] * len(lengths)
+    latest, day_windows = plan_first_windows(candidate_days, lengths, deadline_dt, fit_lengths)
+    # 第 j 条的 rest 决定第 j+1 条的 candidate，其上限由第 j+1 条的最晚开始倒推
+    candidate_limits = [latest_candidate_for(t, fit) for t, fit in zip(latest[1:], fit_lengths[1:])] + [None]
+
+    if args.engine == 'numpy':
+        import springboot_batch
+        springboot_batch.require_numpy()
+
+    # 每份的首条日期与随机数都由 (seed, 份号) 派生，任意份可单独生成，也可分给多个进程
+    ctx = {
+        'engine': args.engine, 'seed': args.seed, 'header_norm': header_norm,
+        'vid_list': vid_list, 'cid_list': cid_list, 'lengths_strs': lengths_strs, 'lengths': lengths,
+        'latest': latest, 'candidate_limits': candidate_limits,
+        'day_windows': day_windows, 'candidate_days': candidate_days,
+        'fit_lengths': fit_lengths, 'holidays': HOLIDAYS, 'checker_safe': args.checker_safe,
+    }
+    indices = parse_set_list(args.only_sets, sets_count) if args.only_sets else list(range(sets_count))
+    tasks = [(ctx, indices[i:i + SETS_PER_TASK]) for i in range(0, len(indices), SETS_PER_TASK)]
+
+    # 按份号顺序逐批写出（不在内存中保留全部结果）
+    out = springboot_output.open_output(args.output, args.format, header, header_norm,
+                                        table=args.table, batch_size=args.batch_size,
+                                        create_table=args.create_table, dialect=args.sql_dialect)
+    if args.plan:
+        # 每一份都依赖之前各份占用的时段，只能在一个进程里依次排程；--only-sets 只筛选输出
+        occ = new_occupancy(args.slot_minutes, args.max_per_slot)
+        wanted = set(indices)
+        try:
+            for k, block in plan_blocks(ctx, sets_count, occ):
+                if k in wanted:
+                    springboot_output.write_block(out, block)
+        finally:
+            total_rows = springboot_output.close_output(out)
+        loads = [occ['day_load'].get(d, 0) for d in candidate_days]
+        print(f"排程：时段峰值 {peak_load(occ)} 人/{args.slot_minutes} 分钟，"
+              f"首条候选日负荷 {min(loads)}–{max(loads)} 分钟")
+    else:
+        pool = Pool(args.workers) if args.workers > 1 else None
+        try:
+            results = pool.imap(generate_chunk, tasks) if pool else map(generate_chunk, tasks)
+            for blocks in results:
+                for block in blocks:
+                    springboot_output.write_block(out, block)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        total_rows = springboot_output.close_output(out)
+
+    print(f"✅ 已生成 {len(indices)} 份，每份 {len(vid_list)} 条，共 {total_rows} 行到 {args.output}")
+    if args.format == 'copy':
+        print(springboot_output.load_hint(out, args.output))
 
 
 if __name__ == '__main__':
+    if sys.platform == 'win32':
+        try:
+            sys.stdout = codecs.getwriter("utf-8")(sys.stdout.detach())
+        except Exception:
+            pass
     main()
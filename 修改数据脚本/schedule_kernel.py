@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+change_course_llm_data（排程）与 verify_llm_schedule（核对）共用的调度内核，
+时间为 schedule_timeline 的整数秒（视频时长带秒，逐条累积，不取整到分钟）。
+
+每个用户从第一条可解析的 first_finished_time + 9 小时开始，按行序逐条（“留”行不参与）：
+1. 当前起点不在工作日 → 下一个工作日 9:00
+2. 结束时间超过当天 18:00 → 下一个工作日 9:00 重新开始
+3. 结束落在午休 (12:00, 13:00) 内，或开始早于 12:00 而结束晚于 13:00 → 改为 13:00 开始
+4. 下一条的起点 = 结束 + rest 分钟；落在本条那天的午休 (12:00, 13:00) 内 → 13:00；
+   晚于 17:30 → 下一个工作日 9:00；最后再确认在工作日
+（移到下一个工作日 9:00 时保留秒，与最初按 datetime.replace(hour=9, minute=0) 实现时一致）
+
+排程时 rest 随机抽取，核对时用文件里记录的 rest 重放同一套规则，两边结果逐秒一致。
+"""
+
+from array import array
+from datetime import datetime
+
+from schedule_timeline import DAY_SEC, H9, H12, H13, H1730, H18, WorkCalendar, day_index
+from value_parsing import duration_minutes, parse_datetime  # parse_datetime 供排程 / 核对脚本从这里导入
+
+
+UTC_SHIFT_HOURS = 9  # new_started_at_UTC = new_started_at + 9 小时
+UTC_SHIFT_SEC = UTC_SHIFT_HOURS * 3600
+REST_MIN = 2
+REST_MAX = 6
+
+
+def parse_time_string(time_str: str) -> float:
+    """解析视频时长字符串为分钟数（支持 H:M:S 或 M:S）。
+    返回分钟数（float）。无效或空返回0。
+    """
+    return duration_minutes(time_str) or 0.0
+
+
+def new_calendar() -> WorkCalendar:
+    """排程用的工作日表：只排除周末（不含节假日），查到表外日期时自动扩展"""
+    return WorkCalendar(lambda d: d.weekday() < 5, day_index(datetime.now().date()) - 3 * 366)
+
+
+def next_workday_9(calendar: WorkCalendar, t: int) -> int:
+    """下一个工作日 9:00（保留秒）"""
+    return calendar.next_workday(t // DAY_SEC) * DAY_SEC + H9 + t % 60
+
+
+def duration_from_minutes(minutes: float) -> int:
+    """时长（分钟，含秒的小数）→ 秒；0 或无效时长按 0 处理"""
+    return round(minutes * 60) if minutes > 0 else 0
+
+
+# 规则标记：核对报告中说明期望值由哪些规则得出
+RULE_FIRST = 1         # 用户第一条：first_finished_time + 9h
+RULE_RESYNC = 2        # 上一条不符，从文件中的开始时间接续
+RULE_LUNCH_SKIP = 4    # 规则 4：结束 + rest 落在午休内 → 13:00
+RULE_AFTER_1730 = 8    # 规则 4：晚于 17:30 → 下一个工作日 9:00
+RULE_WORKDAY = 16      # 规则 1 / 4：不在工作日 → 下一个工作日 9:00
+RULE_END_18 = 32       # 规则 2：结束超过 18:00 → 下一个工作日 9:00
+RULE_LUNCH = 64        # 规则 3：与午休重叠 → 13:00
+RULE_NAMES = [
+    (RULE_FIRST, 'first'), (RULE_RESYNC, 'resync'), (RULE_LUNCH_SKIP, 'lunch_skip'),
+    (RULE_AFTER_1730, 'after_1730'), (RULE_WORKDAY, 'next_workday'), (RULE_END_18, 'end_after_18'),
+    (RULE_LUNCH, 'lunch'),
+]
+
+
+def rule_label(bits: int) -> str:
+    """规则标记 → 'first+lunch' 这样的说明；没有任何规则生效时为 continuous"""
+    return '+'.join(name for bit, name in RULE_NAMES if bits & bit) or 'continuous'
+
+
+def place_row_rules(current: int, dur: int, calendar: WorkCalendar):
+    """规则 1–3：由当前起点和时长得到本条的 (开始, 结束, 当天 0 点, 规则标记)"""
+    rules = 0
+    if not calendar.is_workday(current // DAY_SEC):
+        current = next_workday_9(calendar, current)
+        rules |= RULE_WORKDAY
+    start = current
+    end = start + dur
+    day_start = start // DAY_SEC * DAY_SEC
+    if end > day_start + H18:
+        start = next_workday_9(calendar, start)
+        end = start + dur
+        day_start = start // DAY_SEC * DAY_SEC
+        rules |= RULE_END_18
+    lunch_start = day_start + H12
+    lunch_end = day_start + H13
+    if lunch_start < end < lunch_end or (start < lunch_start and end > lunch_end):
+        start = lunch_end
+        end = start + dur
+        rules |= RULE_LUNCH
+    return start, end, day_start, rules
+
+
+def place_row(current: int, dur: int, calendar: WorkCalendar):
+    """place_row_rules 不带规则标记的版本：(开始, 结束, 当天 0 点)"""
+    start, end, day_start, _ = place_row_rules(current, dur, calendar)
+    return start, end, day_start
+
+
+def next_current_rules(end: int, rest: int, day_start: int, calendar: WorkCalendar):
+    """规则 4：本条结束 + rest 分钟 → (下一条的当前起点, 规则标记)"""
+    rules = 0
+    current = end + rest * 60
+    if day_start + H12 < current < day_start + H13:
+        current = day_start + H13
+        rules |= RULE_LUNCH_SKIP
+    if current % DAY_SEC // 60 > H1730 // 60:
+        current = next_workday_9(calendar, current)
+        rules |= RULE_AFTER_1730
+    if not calendar.is_workday(current // DAY_SEC):
+        current = next_workday_9(calendar, current)
+        rules |= RULE_WORKDAY
+    return current, rules
+
+
+def next_current(end: int, rest: int, day_start: int, calendar: WorkCalendar) -> int:
+    return next_current_rules(end, rest, day_start, calendar)[0]
+
+
+def replay(current: int, durations, rests, calendar: WorkCalendar):
+    """
+    批量入口：从当前起点依次排完一个用户的 n 条（durations 为秒、rests 为分钟），
+    返回 (starts, ends) 两个 array('q')
+    """
+    n = len(durations)
+    starts = array('q', bytes(8 * n))
+    ends = array('q', bytes(8 * n))
+    for k in range(n):
+        start, end, day_start = place_row(current, durations[k], calendar)
+        starts[k] = start
+        ends[k] = end
+        current = next_current(end, rests[k], day_start, calendar)
+    return starts, ends
+
+
+# ---- 向量版（NumPy）：同一套规则逐元素作用于整列，供批量核对按“第 k 条”同步推进所有用户 ----
+# numpy 在函数内导入：只用逐行规则的排程 / 核对不加载
+# 午休与 17:30 截止可以替换（参数模拟时每个元素一组取值，可为数组）；默认即上面的规则
+DAY_BOUNDS = {'lunch_start': H12, 'lunch_end': H13, 'cutoff': H1730}
+
+
+def calendar_tables(calendar: WorkCalendar, first_day: int, last_day: int):
+    """保证工作日表覆盖 [first_day, last_day] 并返回 (offset, is_workday, workday_after) 数组"""
+    calendar.ensure(first_day, last_day)
+    return calendar.arrays()
+
+
+def _next_workday_9_np(tables, t):
+    offset, _, after = tables
+    return after[t // DAY_SEC - offset] * DAY_SEC + H9 + t % 60
+
+
+def place_rows_np(current, dur, tables, bounds=DAY_BOUNDS):
+    """place_row_rules 的向量版：返回 (开始, 结束, 当天 0 点, 规则标记) 四个数组"""
+    import numpy as np
+    offset, is_workday, _ = tables
+    off = ~is_workday[current // DAY_SEC - offset]
+    rules = np.where(off, RULE_WORKDAY, 0)
+    start = np.where(off, _next_workday_9_np(tables, current), current)
+    end = start + dur
+    day_start = start // DAY_SEC * DAY_SEC
+    late = end > day_start + H18
+    rules |= np.where(late, RULE_END_18, 0)
+    start = np.where(late, _next_workday_9_np(tables, start), start)
+    end = start + dur
+    day_start = start // DAY_SEC * DAY_SEC
+    lunch_start = day_start + bounds['lunch_start']
+    lunch_end = day_start + bounds['lunch_end']
+    lunch = ((lunch_start < end) & (end < lunch_end)) | ((start < lunch_start) & (end > lunch_end))
+    rules |= np.where(lunch, RULE_LUNCH, 0)
+    start = np.where(lunch, lunch_end, start)
+    return start, start + dur, day_start, rules
+
+
+def next_current_np(end, rest, day_start, tables, bounds=DAY_BOUNDS):
+    """next_current_rules 的向量版：返回 (下一条的当前起点, 规则标记)"""
+    import numpy as np
+    offset, is_workday, _ = tables
+    current = end + rest * 60
+    lunch_end = day_start + bounds['lunch_end']
+    skip = (day_start + bounds['lunch_start'] < current) & (current < lunch_end)
+    rules = np.where(skip, RULE_LUNCH_SKIP, 0)
+    current = np.where(skip, lunch_end, current)
+    late = current % DAY_SEC // 60 > bounds['cutoff'] // 60
+    rules |= np.where(late, RULE_AFTER_1730, 0)
+    current = np.where(late, _next_workday_9_np(tables, current), current)
+    off = ~is_workday[current // DAY_SEC - offset]
+    rules |= np.where(off, RULE_WORKDAY, 0)
+    current = np.where(off, _next_workday_9_np(tables, current), current)
+    return current, rules
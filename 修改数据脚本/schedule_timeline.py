@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排程脚本共用的时间线表示（generate_springboot_new / springboot_batch / change_course_llm_data / verify_llm_schedule）：
+- 时间统一为整数秒（自 1970-01-01 起的本地时间，无时区）。视频时长带秒，且逐条累积，
+  所以时间线不取整到分钟；17:30、午休这类分钟级判断用“当天秒数 // 60”比较
+- 每天的边界（9:00、12:00、13:00、17:30、18:00）都是“日序号 × 86400 + 固定偏移”，
+  不再对每一行 datetime.replace；工作日与“之后第一个工作日”放在按日预先计算的表里（array，按需扩展）
+- 单行记录用 __slots__ 类，整列用 array('q')（需要时可 numpy.frombuffer 零拷贝转换；numpy 只在向量函数里导入）
+- 文本只在输出时生成：日期前缀按日缓存，时分用 1440 项的表
+"""
+
+from array import array
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_DATE = EPOCH.date()
+MIN_SEC = 60
+DAY_SEC = 86400
+
+# 当天的固定边界（秒）
+H9 = 9 * 3600
+H1030 = 10 * 3600 + 30 * 60
+H12 = 12 * 3600
+H13 = 13 * 3600
+H1630 = 16 * 3600 + 30 * 60
+H1730 = 17 * 3600 + 30 * 60
+H18 = 18 * 3600
+
+
+def to_seconds(dt: datetime) -> int:
+    return (dt.toordinal() - EPOCH.toordinal()) * DAY_SEC + dt.hour * 3600 + dt.minute * 60 + dt.second
+
+
+def from_seconds(sec: int) -> datetime:
+    return EPOCH + timedelta(seconds=int(sec))
+
+
+def day_index(d: date) -> int:
+    return d.toordinal() - EPOCH_DATE.toordinal()
+
+
+def day_date(day: int) -> date:
+    return date.fromordinal(EPOCH_DATE.toordinal() + int(day))
+
+
+def duration_seconds(td: timedelta) -> int:
+    return int(round(td.total_seconds()))
+
+
+class WorkCalendar:
+    """
+    按日的工作日表：is_workday(day) / next_workday(day)（day 之后、不含 day 的第一个工作日）
+    is_weekday 为日期判定函数（含节假日与否由调用方决定）；查到表外的日期时整表按 chunk 天向前 / 向后扩展
+    """
+    __slots__ = ('is_weekday', 'offset', 'workday', 'after', 'chunk')
+
+    def __init__(self, is_weekday, first_day: int, last_day: int = None, chunk: int = 366):
+        self.is_weekday = is_weekday
+        self.chunk = chunk
+        self._build(int(first_day), int(first_day) + chunk - 1 if last_day is None else int(last_day))
+
+    def _build(self, first_day: int, last_day: int) -> None:
+        n = last_day - first_day + 1
+        self.offset = first_day
+        self.workday = array('b', (1 if self.is_weekday(day_date(first_day + k)) else 0 for k in range(n)))
+        # “之后第一个工作日”从尾部往前填，表末尾之后再找一个工作日兜底
+        nxt = last_day + 1
+        while not self.is_weekday(day_date(nxt)):
+            nxt += 1
+        after = array('q', bytes(8 * n))
+        for k in range(n - 1, -1, -1):
+            after[k] = nxt
+            if self.workday[k]:
+                nxt = first_day + k
+        self.after = after
+
+    def ensure(self, first_day: int, last_day: int) -> None:
+        """保证表覆盖 [first_day, last_day]"""
+        lo = self.offset
+        hi = self.offset + len(self.workday) - 1
+        if first_day >= lo and last_day <= hi:
+            return
+        self._build(min(lo, first_day - self.chunk if first_day < lo else lo),
+                    max(hi, last_day + self.chunk if last_day > hi else hi))
+
+    def _index(self, day: int) -> int:
+        k = day - self.offset
+        if k < 0 or k >= len(self.workday):
+            self.ensure(day, day)
+            k = day - self.offset
+        return k
+
+    def is_workday(self, day: int) -> bool:
+        k = self._index(day)  # 先查下标：扩展表时会替换 workday / after
+        return bool(self.workday[k])
+
+    def next_workday(self, day: int) -> int:
+        k = self._index(day)
+        return self.after[k]
+
+    def arrays(self):
+        """(offset, is_workday, workday_after) 的 NumPy 版本，供批量引擎按下标查表"""
+        import numpy as np
+        return (self.offset, np.frombuffer(self.workday, dtype=np.int8).astype(bool),
+                np.frombuffer(self.after, dtype=np.int64))
+
+
+class TimelineRow:
+    """排好的一行：原始行号、开始 / 结束（秒）、rest（分钟）"""
+    __slots__ = ('index', 'start', 'end', 'rest')
+
+    def __init__(self, index: int, start: int, end: int, rest: int):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.rest = rest
+
+
+# ---- 输出时才格式化 ----
+HM_TEXT = tuple(f"{m // 60}:{m % 60:02d}" for m in range(1440))
+
+
+@lru_cache(maxsize=4096)
+def day_prefix(day: int) -> str:
+    d = day_date(day)
+    return f"{d.year}/{d.month}/{d.day} "
+
+
+def format_seconds(sec: int) -> str:
+    """整数秒 → 'YYYY/M/D H:MM'（秒截断）"""
+    minutes = sec // MIN_SEC
+    day = minutes // 1440
+    return day_prefix(day) + HM_TEXT[minutes - day * 1440]
+
+
+def format_datetime(dt: datetime) -> str:
+    """datetime → 'YYYY/M/D H:MM'"""
+    return day_prefix(dt.toordinal() - EPOCH_DATE.toordinal()) + HM_TEXT[dt.hour * 60 + dt.minute]
+
+
+def format_seconds_array(seconds):
+    """整数秒数组 → 'YYYY/M/D H:MM' 文本数组（对象数组），只对出现过的日期建前缀表"""
+    import numpy as np
+    minutes = seconds // MIN_SEC
+    days = minutes // 1440
+    day_min = int(days.min())
+    prefixes = np.array([day_prefix(day_min + k) for k in range(int(days.max()) - day_min + 1)], dtype=object)
+    return prefixes[days - day_min] + np.array(HM_TEXT, dtype=object)[minutes - days * 1440]
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+调度规则的参数模拟（不写回数据，只出统计）：
+输入只读一次、各列只解析一次，按参数网格（UTC 偏移、rest 范围、17:30 截止、午休时段）的全部组合，
+对所有用户同时重放 change_course_llm_data 的调度规则（schedule_kernel 的向量版，按“第 k 条”同步推进）。
+每个组合输出：
+- 每个用户的最后完成时间（最后一条的 next_started_at）：中位数 / P90 / 最晚，以及超过 --deadline 的用户数
+- 每个用户每天开始的视频数的分布（均值、P50、P90、最多，及完整直方图）
+rest 与 change_course_llm_data 相同：每个用户由 seed 与 user_id 派生随机数流（rest 范围相同的组合共用一份），
+所以默认参数那一组与实际排程结果逐条一致。
+
+用法：
+  python simulate_schedule.py --input 副本LLM+data基础.csv --rest 2-6 3-5 --cutoff 17:30 17:00 --deadline 2025/12/31
+  python simulate_schedule.py --utc-shift 9 8 --lunch 12:00-13:00 11:30-12:30 --output variants.csv --per-user last.csv
+
+安装依赖：
+  pip install numpy pandas
+"""
+
+import argparse
+import csv
+import sys
+from itertools import product
+
+from change_course_llm_data import INPUT_FILE, RANDOM_SEED, user_rng
+from schedule_kernel import (
+    DAY_BOUNDS, REST_MAX, REST_MIN, UTC_SHIFT_HOURS, calendar_tables, new_calendar, next_current_np,
+    parse_datetime, place_rows_np,
+)
+from schedule_timeline import DAY_SEC, HM_TEXT, format_seconds, to_seconds
+from value_parsing import MISSING, datetime_seconds_column
+
+REQUIRED_COLUMNS = ['user_id', 'flag', 'first_finished_time', 'course_video_length']
+
+# numpy / pandas（经 verify_batch）在 main 中才导入，trip7ai simulate --help 不必等待
+np = pd = duration_column = None
+
+
+def require_numpy():
+    """导入 verify_batch 及其 numpy / pandas；缺少时提示安装并退出"""
+    global np, pd, duration_column
+    import verify_batch
+    verify_batch.require_numpy()
+    np, pd, duration_column = verify_batch.np, verify_batch.pd, verify_batch.duration_column
+
+
+# ---- 参数 ----
+def clock(text: str) -> int:
+    """'17:30' → 当天秒数"""
+    try:
+        h, m = (int(x) for x in text.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"时间应为 H:MM：{text}")
+    if not (0 <= h < 24 and 0 <= m < 60):
+        raise argparse.ArgumentTypeError(f"时间超出范围：{text}")
+    return h * 3600 + m * 60
+
+
+def clock_range(text: str):
+    """'12:00-13:00' → (开始, 结束) 当天秒数"""
+    start, sep, end = text.partition('-')
+    if not sep or clock(start) >= clock(end):
+        raise argparse.ArgumentTypeError(f"时段应为 H:MM-H:MM 且开始早于结束：{text}")
+    return clock(start), clock(end)
+
+
+def rest_range(text: str):
+    """'2-6' → (2, 6) 分钟"""
+    lo, sep, hi = text.partition('-')
+    if not (sep and lo.isdigit() and hi.isdigit() and int(lo) <= int(hi)):
+        raise argparse.ArgumentTypeError(f"rest 范围应为 最小-最大（分钟）：{text}")
+    return int(lo), int(hi)
+
+
+def clock_text(sec: int) -> str:
+    return HM_TEXT[sec // 60]
+
+
+def make_variants(args) -> list:
+    variants = []
+    for shift, rest, cutoff, lunch in product(args.utc_shift, args.rest, args.cutoff, args.lunch):
+        label = (f"utc+{shift} rest{rest[0]}-{rest[1]} cut{clock_text(cutoff)} "
+                 f"lunch{clock_text(lunch[0])}-{clock_text(lunch[1])}")
+        variants.append({'label': label, 'utc_shift': shift, 'rest': rest, 'cutoff': cutoff, 'lunch': lunch})
+    return variants
+
+
+def parse_deadline(text: str) -> int:
+    """'YYYY/M/D H:MM' 或 'YYYY/M/D'（当天结束前）→ 时间线秒数"""
+    dt = parse_datetime(text)
+    if dt is None:
+        dt = parse_datetime(text.strip() + ' 0:00')
+        if dt is None:
+            raise argparse.ArgumentTypeError(f"无法解析的截止时间：{text}")
+        return to_seconds(dt) + DAY_SEC
+    return to_seconds(dt)
+
+
+# ---- 输入（所有组合共用） ----
+def load_users(f) -> dict:
+    """
+    读入并按 change_course_llm_data 的方式分组：user_id 首次出现的先后、组内行序，“留”行不参与，
+    每个用户从第一条可解析的 first_finished_time 起排程（之前的行同样消耗一次 rest 抽取）
+    """
+    df = pd.read_csv(f, dtype=str, keep_default_na=False)
+    missing = [name for name in REQUIRED_COLUMNS if name not in df.columns]
+    if missing:
+        raise ValueError(f"CSV缺少必要列: {missing}")
+    user_code, user_text = pd.factorize(df['user_id'].to_numpy(dtype=object), sort=False)
+    active = np.array([v.strip() != '留' for v in df['flag'].to_numpy(dtype=object)], dtype=bool)
+    order = np.argsort(user_code, kind='stable')
+    order = order[active[order]]
+    users = user_code[order]
+
+    # 每个用户的非“留”行各抽一次 rest（包括第一条可解析的 first_finished_time 之前的行）
+    new_user = np.r_[True, users[1:] != users[:-1]]
+    user_start = np.flatnonzero(new_user)
+    group_rows = np.diff(np.r_[user_start, len(users)])
+    group = np.repeat(np.arange(len(user_start)), group_rows)
+
+    fft = datetime_seconds_column(df['first_finished_time'].to_numpy(dtype=object)[order])
+    ok_fft = (fft != MISSING).astype(np.int64)
+    csum = np.cumsum(ok_fft)
+    seen = csum - np.repeat((csum - ok_fft)[user_start], group_rows)
+    rows = np.flatnonzero(seen > 0)
+    if len(rows) == 0:
+        raise ValueError("没有可排程的行（first_finished_time 均无法解析）")
+
+    # 参与排程的行（每个用户是其组内的一段后缀）与紧凑的用户编号
+    group = group[rows]
+    first = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    lengths = np.diff(np.r_[first, len(rows)])
+    uid = np.repeat(np.arange(len(first)), lengths)
+    kept_groups = group[first]
+    # 各用户的 rest 依次拼成一列：该行的 rest 在这一列中的位置
+    draws = group_rows[kept_groups]
+    draw = np.r_[0, np.cumsum(draws)[:-1]][uid] + rows - user_start[group]
+    return {
+        'user_ids': list(user_text[users[user_start[kept_groups]]]),
+        'draws': draws,
+        'draw': draw,
+        'uid': uid,
+        'pos': np.arange(len(rows)) - first[uid],
+        'lengths': lengths,
+        'fft': fft[rows[first]],
+        'dur': duration_column(df['course_video_length'].to_numpy(dtype=object)[order[rows]]),
+    }
+
+
+def rest_draws(data: dict, seed: int, rest) -> "np.ndarray":
+    """一个 rest 范围下每行的 rest：与 change_course_llm_data 的 user_rng 逐个抽取相同"""
+    lo, hi = rest
+    flat = np.empty(int(data['draws'].sum()), dtype=np.int64)
+    k = 0
+    for user_id, count in zip(data['user_ids'], data['draws'].tolist()):
+        rand = user_rng(seed, user_id)
+        flat[k:k + count] = [rand.randint(lo, hi) for _ in range(count)]
+        k += count
+    return flat[data['draw']]
+
+
+# ---- 全部组合 × 全部用户同时重放 ----
+def simulate(data: dict, variants: list, rests: dict):
+    """
+    返回 (每行开始的日序号 (组合, 行), 每个用户的最后完成时间 (组合, 用户))
+    rests：rest 范围 → rest_draws 的结果
+    """
+    n = len(data['uid'])
+    column = lambda key: np.array([v[key] for v in variants], dtype=np.int64)[:, None]
+    shift = column('utc_shift') * 3600
+    bounds = {
+        'lunch_start': np.array([v['lunch'][0] for v in variants], dtype=np.int64)[:, None],
+        'lunch_end': np.array([v['lunch'][1] for v in variants], dtype=np.int64)[:, None],
+        'cutoff': column('cutoff'),
+    }
+    rest = np.stack([rests[v['rest']] for v in variants])
+    dur = data['dur']
+
+    # 工作日表：最早的起点之前留几天，最晚的起点之后按每条最多推迟的天数留足余量
+    fft_day = data['fft'] // DAY_SEC
+    days_per_row = 4 + int(dur.max()) // DAY_SEC
+    tables = calendar_tables(new_calendar(), int(fft_day.min()) + int(shift.min()) // DAY_SEC - 7,
+                             int(fft_day.max()) + int(shift.max()) // DAY_SEC + 1
+                             + days_per_row * int(data['lengths'].max()) + 14)
+
+    start_day = np.empty((len(variants), n), dtype=np.int32)
+    last_end = np.empty((len(variants), len(data['fft'])), dtype=np.int64)
+    current = data['fft'][None, :] + shift
+
+    by_pos = np.argsort(data['pos'], kind='stable')
+    steps = np.r_[0, np.cumsum(np.bincount(data['pos']))]
+    for k in range(len(steps) - 1):
+        ids = by_pos[steps[k]:steps[k + 1]]   # 第 k 条所在的行
+        u = data['uid'][ids]
+        start, end, day_start, _ = place_rows_np(current[:, u], dur[ids], tables, bounds)
+        start_day[:, ids] = start // DAY_SEC
+        last_end[:, u] = end
+        current[:, u], _ = next_current_np(end, rest[:, ids], day_start, tables, bounds)
+    return start_day, last_end
+
+
+def quantile(values, q: float) -> int:
+    """取实际出现过的值（不插值）"""
+    return int(np.quantile(values, q, method='higher'))
+
+
+def variant_stats(uid, start_day, last_end, deadline) -> dict:
+    """一个组合的统计；行按（用户, 行序）排列，同一用户的开始日期不减"""
+    # 每个用户每天开始的视频数：相邻行换用户或换日期处分段
+    cut = np.flatnonzero(np.r_[True, (uid[1:] != uid[:-1]) | (start_day[1:] != start_day[:-1])])
+    per_day = np.diff(np.r_[cut, len(uid)])
+    hist = np.bincount(per_day)
+    return {
+        'users': len(last_end),
+        'past_deadline': '' if deadline is None else int((last_end > deadline).sum()),
+        'last_p50': format_seconds(quantile(last_end, 0.5)),
+        'last_p90': format_seconds(quantile(last_end, 0.9)),
+        'last_max': format_seconds(int(last_end.max())),
+        'per_day_mean': round(float(per_day.mean()), 2),
+        'per_day_p50': quantile(per_day, 0.5),
+        'per_day_p90': quantile(per_day, 0.9),
+        'per_day_max': int(per_day.max()),
+        'per_day_hist': ';'.join(f"{count}:{users}" for count, users in enumerate(hist.tolist()) if users),
+    }
+
+
+STATS_COLUMNS = [
+    'variant', 'utc_shift', 'rest_min', 'rest_max', 'cutoff', 'lunch', 'users', 'past_deadline',
+    'last_p50', 'last_p90', 'last_max', 'per_day_mean', 'per_day_p50', 'per_day_p90', 'per_day_max', 'per_day_hist',
+]
+
+
+def stats_row(variant: dict, stats: dict) -> list:
+    lunch = variant['lunch']
+    fields = {
+        'variant': variant['label'], 'utc_shift': variant['utc_shift'],
+        'rest_min': variant['rest'][0], 'rest_max': variant['rest'][1], 'cutoff': clock_text(variant['cutoff']),
+        'lunch': f"{clock_text(lunch[0])}-{clock_text(lunch[1])}", **stats,
+    }
+    return [fields[name] for name in STATS_COLUMNS]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='按参数网格模拟 change_course_llm_data 的调度规则，输出各组合的完成时间与每日视频数统计')
+    parser.add_argument('--input', default=INPUT_FILE, help='输入 CSV（与 change_course_llm_data 相同）')
+    parser.add_argument('--utc-shift', type=int, nargs='+', default=[UTC_SHIFT_HOURS], help='UTC 偏移（小时），可给多个')
+    parser.add_argument('--rest', type=rest_range, nargs='+', default=[(REST_MIN, REST_MAX)],
+                        help='rest 范围（分钟），如 2-6 3-5')
+    parser.add_argument('--cutoff', type=clock, nargs='+', default=[DAY_BOUNDS['cutoff']],
+                        help='下一条起点晚于此时刻则移到下一个工作日 9:00，如 17:30 17:00')
+    parser.add_argument('--lunch', type=clock_range, nargs='+',
+                        default=[(DAY_BOUNDS['lunch_start'], DAY_BOUNDS['lunch_end'])], help='午休时段，如 12:00-13:00')
+    parser.add_argument('--seed', type=int, default=RANDOM_SEED, help='随机种子（与 change_course_llm_data --seed 相同）')
+    parser.add_argument('--deadline', type=parse_deadline, default=None,
+                        help='统计最后完成时间（UTC 时间线）晚于此时刻的用户数：YYYY/M/D 或 YYYY/M/D H:MM')
+    parser.add_argument('--output', default=None, help='各组合的统计写到此 CSV')
+    parser.add_argument('--per-user', default=None, help='每个用户在各组合下的最后完成时间写到此 CSV')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    require_numpy()
+    variants = make_variants(args)
+    try:
+        data = load_users(args.input)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"用户数: {len(data['fft'])}，参与排程的行: {len(data['uid'])}，参数组合: {len(variants)}")
+
+    rests = {rest: rest_draws(data, args.seed, rest) for rest in dict.fromkeys(v['rest'] for v in variants)}
+    start_day, last_end = simulate(data, variants, rests)
+
+    rows = []
+    for k, variant in enumerate(variants):
+        stats = variant_stats(data['uid'], start_day[k], last_end[k], args.deadline)
+        rows.append(stats_row(variant, stats))
+        past = '' if args.deadline is None else f"，超过截止 {stats['past_deadline']} 人"
+        print(f"[{variant['label']}] 最后完成 P50 {stats['last_p50']} / P90 {stats['last_p90']} / "
+              f"最晚 {stats['last_max']}{past}；每天视频数 平均 {stats['per_day_mean']}，"
+              f"P90 {stats['per_day_p90']}，最多 {stats['per_day_max']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(STATS_COLUMNS)
+            writer.writerows(rows)
+        print(f"组合统计: {args.output}")
+    if args.per_user:
+        with open(args.per_user, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['user_id'] + [v['label'] for v in variants])
+            for j, user_id in enumerate(data['user_ids']):
+                writer.writerow([user_id] + [format_seconds(int(t)) for t in last_end[:, j]])
+        print(f"每个用户的最后完成时间: {args.per_user}")
+
+
+if __name__ == "__main__":
+    main()
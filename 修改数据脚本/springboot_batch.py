@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+generate_springboot_new.py 的批量引擎（--engine numpy）：
+- 时间线用 schedule_timeline 的整数秒表示，视频时长带秒，秒数会逐条累积，
+  所以不取整到分钟，保持与逐条生成完全相同的规则
+- 所有份同时推进：每一条（第 j 条）对全部份做一次向量运算，跨日/周末用 WorkCalendar 的“下一个工作日”表查找
+- 随机数一次性取出：每份每条 3 个均匀数（窗口选择、分钟偏移、rest），按各自上限换算为整数，
+  分布与逐条调用 rng.randint 相同；每份使用由基础 seed 派生的独立随机数流，
+  结果与分块方式无关、可复现（与 python 引擎的具体数值不同）
+- 输出时才格式化：日期前缀表 + 时分表拼接，整列一次生成
+
+安装依赖：
+  pip install numpy
+"""
+
+import sys
+
+from schedule_timeline import (
+    DAY_SEC, H9, H1030, H12, H13, H1630, WorkCalendar,
+    day_index, format_seconds_array, to_seconds,
+)
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+
+# 每份每条的随机数：窗口选择、分钟偏移、rest
+U_BRANCH, U_OFFSET, U_REST = 0, 1, 2
+
+
+def require_numpy():
+    if np is None:
+        print("缺少 numpy，请先安装：pip install numpy", file=sys.stderr)
+        sys.exit(1)
+
+
+def build_day_tables(first_day: int, last_day: int, is_weekday):
+    """
+    [first_day, last_day] 范围（天序号）内的工作日表：
+    返回 (offset, is_workday, workday_after)，
+    is_workday[d - offset] 为 d 是否工作日，workday_after[d - offset] 为 d 之后（不含 d）的第一个工作日
+    """
+    return WorkCalendar(is_weekday, first_day, last_day).arrays()
+
+
+def scaled_int(u, high):
+    """均匀数 u∈[0,1) → [0, high] 内的均匀整数（high 可为数组）"""
+    return np.minimum((u * (high + 1)).astype(np.int64), high)
+
+
+def pick_windows(u_branch, u_offset, windows, latest):
+    """
+    向量版 pick_from_windows：windows 为 [(起点数组, 最大偏移分钟), ...]（按时间先后），
+    先按 latest 截断（latest 为 None 表示不限），两个窗口都可选时各 1/2，否则取可选的第一个
+    """
+    bases = []
+    caps = []
+    for base, max_offset in windows:
+        cap = np.full(base.shape, max_offset, dtype=np.int64)
+        if latest is not None:
+            cap = np.minimum(cap, (latest - base) // 60)
+        bases.append(base)
+        caps.append(cap)
+    if len(windows) == 1:
+        return bases[0] + scaled_int(u_offset, np.maximum(caps[0], 0)) * 60
+    use_second = (caps[1] >= 0) & ((caps[0] < 0) | (u_branch >= 0.5))
+    base = np.where(use_second, bases[1], bases[0])
+    cap = np.maximum(np.where(use_second, caps[1], caps[0]), 0)
+    return base + scaled_int(u_offset, cap) * 60
+
+
+def fit_offset(base_tod: int, max_offset: int, fit_min):
+    """--checker-safe：窗口内最大偏移再截到整条仍在同一时段内（上午止于 11:59，下午止于 17:59）；
+    放不下时为负数，pick_windows 会改选另一个窗口"""
+    if fit_min is None:
+        return max_offset
+    seg_last = 11 * 60 + 59 if base_tod < H12 else 17 * 60 + 59
+    return min(max_offset, seg_last - base_tod // 60 - fit_min)
+
+
+def generate_sets(assigned_days, lengths, latest, candidate_limits, uniforms, is_weekday, fit_lengths=None):
+    """
+    批量生成全部份的时间线
+    assigned_days：每份首条日期；lengths：每条时长（timedelta）；
+    latest / candidate_limits：generate_springboot_new 倒推出的上限（datetime，最后一条的 candidate_limit 为 None）；
+    uniforms：形状 (份数, 条数, 3) 的 [0,1) 均匀数；
+    is_weekday：工作日判定（含节假日）；fit_lengths：--checker-safe 时为 lengths（整条须放进同一时段），否则 None
+    返回：(starts, nexts, rests)，形状均为 (份数, 条数)，时间为整数秒
+    """
+    require_numpy()
+    sets_count = len(assigned_days)
+    n = len(lengths)
+    length_sec = np.array([int(x.total_seconds()) for x in lengths], dtype=np.int64)
+    latest_sec = np.array([to_seconds(t) for t in latest], dtype=np.int64)
+    limit_sec = [None if t is None else to_seconds(t) for t in candidate_limits]
+    fit_min = [None if f is None else int(f.total_seconds() // 60) for f in (fit_lengths or [None] * n)]
+
+    first_days = np.array([day_index(d) for d in assigned_days], dtype=np.int64)
+    # 天数表：覆盖最早首条日期到“截止 + 全部时长 + 余量”（上限不约束时也足够）
+    span_days = int(length_sec.sum() // DAY_SEC) + 2 * n + 14
+    offset, is_workday, workday_after = build_day_tables(
+        int(first_days.min()), int(latest_sec.max() // DAY_SEC) + span_days, is_weekday)
+
+    starts = np.empty((sets_count, n), dtype=np.int64)
+    nexts = np.empty((sets_count, n), dtype=np.int64)
+    rests = np.empty((sets_count, n), dtype=np.int64)
+
+    # 第一条：首条日期 9:00(+0..90) 或 13:00(+0..210)
+    day0 = first_days * DAY_SEC
+    start = pick_windows(uniforms[:, 0, U_BRANCH], uniforms[:, 0, U_OFFSET],
+                         [(day0 + H9, fit_offset(H9, 90, fit_min[0])), (day0 + H13, fit_offset(H13, 210, fit_min[0]))],
+                         latest_sec[0])
+    for j in range(n):
+        u = uniforms[:, j]
+        if j > 0:
+            fit = fit_min[j]
+            cand = nexts[:, j - 1] + rests[:, j - 1] * 60
+            day = cand // DAY_SEC
+            tod = cand - day * DAY_SEC
+            jump = ~is_workday[day - offset] | (tod >= H1630)
+            lunch = ~jump & (tod >= H1030) & (tod < H13)
+            early = ~jump & (tod < H9)
+            if fit is not None:
+                # 整条放不进所在时段：上午的按午休规则顺延到 13:00，下午的顺延到下一工作日
+                direct_tod = np.where(early, H9, tod)
+                seg_last = np.where(direct_tod < H12, 11 * 3600 + 59 * 60, 17 * 3600 + 59 * 60)
+                overflow = ~jump & ~lunch & (direct_tod + fit * 60 > seg_last)
+                lunch = lunch | (overflow & (direct_tod < H12))
+                jump = jump | (overflow & (direct_tod >= H12))
+                early = early & ~lunch & ~jump
+
+            nd = workday_after[day - offset] * DAY_SEC
+            jumped = pick_windows(u[:, U_BRANCH], u[:, U_OFFSET],
+                                  [(nd + H9, fit_offset(H9, 30, fit)), (nd + H13, fit_offset(H13, 60, fit))],
+                                  latest_sec[j])
+            lunched = pick_windows(u[:, U_BRANCH], u[:, U_OFFSET], [(day * DAY_SEC + H13, fit_offset(H13, 60, fit))],
+                                   latest_sec[j])
+            start = np.where(jump, jumped, np.where(lunch, lunched, np.where(early, day * DAY_SEC + H9, cand)))
+        starts[:, j] = start
+        nexts[:, j] = start + length_sec[j]
+        rest_max = 6
+        if limit_sec[j] is not None:
+            rest_max = np.minimum(6, (limit_sec[j] - nexts[:, j]) // 60)
+        rests[:, j] = 2 + scaled_int(u[:, U_REST], rest_max - 2)
+    return starts, nexts, rests
+
+
+def csv_field(value: str) -> str:
+    """与 csv.writer（QUOTE_MINIMAL）相同的转义"""
+    if any(c in value for c in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def set_uniforms(seeds, n):
+    """每份一个独立的随机数流：形状 (份数, 条数, 3) 的 [0,1) 均匀数"""
+    require_numpy()
+    return np.stack([np.random.default_rng(seed).random((n, 3)) for seed in seeds])
+
+
+def format_blocks(header_norm, vid_list, cid_list, lengths_strs, starts, nexts, rests) -> list:
+    """
+    按表头顺序整列拼出输出，返回每份一段文本（含行尾 \r\n）
+    逐行交给 csv.writer 太慢：时间与 rest 不含需转义的字符，固定列预先转义，
+    各列用对象数组逐列拼接成整行文本，与 csv.writer 的输出逐字节相同
+    """
+    sets_count, n = starts.shape
+    start_text = format_seconds_array(starts.ravel())
+    next_text = format_seconds_array(nexts.ravel())
+    rest_text = np.array([str(r) for r in range(int(rests.max()) + 1)], dtype=object)[rests.ravel()]
+    per_row = {
+        'disabled': '0', 'seq': '0', 'verify': '0', 'is_finished': '0',
+    }
+    per_video = {'video_id': vid_list, 'course_id': cid_list, 'course_video_length': lengths_strs}
+    per_value = {
+        'new_started_at_UTC': start_text, 'started_at': start_text,
+        'next_started_at': next_text, 'first_finished_time': next_text,
+        'rest_time': rest_text,
+    }
+    line = None
+    for col in header_norm:
+        if col in per_value:
+            column = per_value[col]
+        elif col in per_video:
+            column = np.tile(np.array([csv_field(v) for v in per_video[col]], dtype=object), sets_count)
+        else:
+            column = csv_field(per_row.get(col, ''))
+        line = column if line is None else line + ',' + column
+    line = np.broadcast_to(line, (sets_count * n,)).reshape(sets_count, n)
+    return ['\r\n'.join(line[s]) + '\r\n' for s in range(sets_count)]
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+generate_springboot_new.py 的输出格式（逐份写出，不在内存中保留全部结果）：
+- csv：原有格式，组间空行
+- insert：多行 INSERT 语句，每条语句 --batch-size 行
+  字符串按 --sql-dialect 转义：standard（SQLite / PostgreSQL）只把 ' 写成 ''；
+  mysql 另把 \ 写成 \\（MySQL 默认 sql_mode 下反斜杠是转义符；开启 NO_BACKSLASH_ESCAPES 时用 standard）
+  可用 springboot_sqlite_check.py 导入本地 SQLite 并与 CSV 输出逐值比对
+- copy：制表符分隔、NULL 写作 \\N 的文本文件，可直接用于
+    MySQL：LOAD DATA LOCAL INFILE 'x.tsv' INTO TABLE t (列...);
+    PostgreSQL：\\copy t (列...) FROM 'x.tsv'
+SQL 输出中：
+- 空值写 NULL；id 列为空时不输出（交给数据库自增）
+- 时间列 'YYYY/M/D H:MM' 转为 'YYYY-MM-DD HH:MM:SS'
+- 整数列（INTEGER_COLUMNS）的纯整数不加引号；其余列一律按字符串加引号
+  （user_id、course_id 等全数字的编号也是字符串：保留前导 0，不会溢出，也不会与 VARCHAR 隐式比较）
+"""
+
+import csv
+import io
+import re
+
+
+FORMATS = ['csv', 'insert', 'copy']
+DIALECTS = ['standard', 'mysql']
+
+DATETIME_COLUMNS = {
+    'update_time', 'create_time', 'first_finished_time', 'started_at',
+    'new_started_at', 'new_started_at_UTC', 'next_started_at',
+}
+INTEGER_COLUMNS = {'id', 'disabled', 'seq', 'verify', 'is_finished', 'rest_time'}
+
+INT_RE = re.compile(r'-?\d+$')
+DT_RE = re.compile(r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})\s+(\d{1,2}):(\d{2})(?::(\d{2}))?$')
+
+
+def sql_datetime(text: str) -> str:
+    """'2025/12/3 9:05' → '2025-12-03 09:05:00'（无法识别时原样返回）"""
+    m = DT_RE.match(text.strip())
+    if not m:
+        return text
+    y, mo, d, h, mi, s = m.groups()
+    return f"{y}-{int(mo):02d}-{int(d):02d} {int(h):02d}:{mi}:{int(s or 0):02d}"
+
+
+def sql_literal(col: str, value: str, dialect: str = 'standard') -> str:
+    if value == '':
+        return 'NULL'
+    if col in DATETIME_COLUMNS:
+        value = sql_datetime(value)
+    elif col in INTEGER_COLUMNS and INT_RE.match(value):
+        return value
+    if dialect == 'mysql':
+        value = value.replace('\\', '\\\\')
+    return "'" + value.replace("'", "''") + "'"
+
+
+def copy_field(col: str, value: str) -> str:
+    if value == '':
+        return '\\N'
+    if col in DATETIME_COLUMNS:
+        value = sql_datetime(value)
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def create_table_sql(table: str, columns: list) -> str:
+    """本地 SQLite 等替身库用的建表语句（类型只作参考）"""
+    defs = []
+    for col in columns:
+        col_type = 'DATETIME' if col in DATETIME_COLUMNS else ('INTEGER' if col in INTEGER_COLUMNS else 'TEXT')
+        defs.append(f"  {col} {col_type}")
+    return f"CREATE TABLE IF NOT EXISTS {table} (\n" + ",\n".join(defs) + "\n);\n"
+
+
+def open_output(path: str, fmt: str, header: list, header_norm: list,
+                table: str = 'springboot_new', batch_size: int = 1000, create_table: bool = False,
+                dialect: str = 'standard') -> dict:
+    """
+    打开输出；返回的 dict 交给 write_block / close_output
+    SQL 格式只输出 id 以外的列（id 为空，由数据库分配）
+    """
+    f = open(path, 'w', encoding='utf-8', newline='')
+    out = {'f': f, 'format': fmt, 'rows': 0, 'sets': 0}
+    if fmt == 'csv':
+        csv.writer(f).writerow(header)
+        out['blank'] = ','.join([''] * len(header)) + '\r\n'
+        return out
+
+    keep = [i for i, col in enumerate(header_norm) if col != 'id']
+    columns = [header_norm[i] for i in keep]
+    out.update({'keep': keep, 'columns': columns, 'table': table, 'dialect': dialect})
+    if fmt == 'insert':
+        out['batch_size'] = max(1, batch_size)
+        out['pending'] = []
+        out['prefix'] = f"INSERT INTO {table} ({', '.join(columns)}) VALUES\n"
+        if create_table:
+            f.write(create_table_sql(table, columns))
+    return out
+
+
+def _flush_insert(out):
+    if out['pending']:
+        out['f'].write(out['prefix'] + ",\n".join(out['pending']) + ";\n")
+        out['pending'] = []
+
+
+def write_block(out: dict, block: str):
+    """写出一份（block 为该份的 CSV 文本，行尾 \\r\\n）"""
+    fmt = out['format']
+    f = out['f']
+    out['sets'] += 1
+    if fmt == 'csv':
+        if out['sets'] > 1:
+            f.write(out['blank'])
+        f.write(block)
+        out['rows'] += block.count('\r\n')
+        return
+
+    keep = out['keep']
+    columns = out['columns']
+    for row in csv.reader(io.StringIO(block, newline='')):
+        values = [row[i] for i in keep]
+        out['rows'] += 1
+        if fmt == 'copy':
+            f.write('\t'.join(copy_field(c, v) for c, v in zip(columns, values)) + '\n')
+            continue
+        out['pending'].append('(' + ', '.join(sql_literal(c, v, out['dialect'])
+                                              for c, v in zip(columns, values)) + ')')
+        if len(out['pending']) >= out['batch_size']:
+            _flush_insert(out)
+
+
+def close_output(out: dict) -> int:
+    """结束输出，返回写出的行数（CSV 含组间空行）"""
+    if out['format'] == 'insert':
+        _flush_insert(out)
+    out['f'].close()
+    if out['format'] == 'csv':
+        return out['rows'] + max(out['sets'] - 1, 0)
+    return out['rows']
+
+
+def load_hint(out: dict, path: str) -> str:
+    """copy 格式的导入命令示例"""
+    cols = ', '.join(out['columns'])
+    return (f"MySQL：LOAD DATA LOCAL INFILE '{path}' INTO TABLE {out['table']} ({cols});\n"
+            f"PostgreSQL：\\copy {out['table']} ({cols}) FROM '{path}'")
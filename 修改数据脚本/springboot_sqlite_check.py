@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+把 generate_springboot_new.py 的 insert 输出导入内存中的 SQLite，与同一 --seed 生成的 CSV 输出逐行逐值比对：
+
+  python generate_springboot_new.py --seed 1 --output out.csv
+  python generate_springboot_new.py --seed 1 --output out.sql --format insert
+  python springboot_sqlite_check.py --csv out.csv --sql out.sql
+
+- insert 输出需用 --sql-dialect standard（默认）生成；mysql 写法中的 \\\\ 在 SQLite 里不是转义
+- SQL 文件中没有建表语句（未加 --create-table）时按 INSERT 的列名建表
+- CSV 中的空值应为 NULL，时间列应为 'YYYY-MM-DD HH:MM:SS'，整数列应为整数，其余列应为原样的字符串
+  （如 user_id 的前导 0 不能丢）；CSV 中的 id 列与组间空行不参与比对
+有差异时打印前 --show 处并返回 1
+"""
+
+import argparse
+import csv
+import re
+import sqlite3
+import sys
+
+from springboot_output import DATETIME_COLUMNS, INT_RE, INTEGER_COLUMNS, create_table_sql, sql_datetime
+
+INSERT_RE = re.compile(r'INSERT INTO (\w+) \(([^)]*)\) VALUES')
+
+
+def expected_value(col: str, value: str):
+    """CSV 中的值写入数据库后应有的值"""
+    if value == '':
+        return None
+    if col in DATETIME_COLUMNS:
+        return sql_datetime(value)
+    if col in INTEGER_COLUMNS and INT_RE.match(value):
+        return int(value)
+    return value
+
+
+def load_sql(path: str):
+    """执行 SQL 文件，返回 (连接, 表名, 列名)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        script = f.read()
+    m = INSERT_RE.search(script)
+    if not m:
+        raise ValueError(f'{path} 中没有 INSERT 语句')
+    table = m.group(1)
+    columns = [c.strip() for c in m.group(2).split(',')]
+    conn = sqlite3.connect(':memory:')
+    if 'CREATE TABLE' not in script:
+        conn.executescript(create_table_sql(table, columns))
+    conn.executescript(script)
+    return conn, table, columns
+
+
+def read_csv_rows(path: str, columns: list):
+    """CSV 中非空行的 columns 各列（跳过组间空行）"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = [h.replace('\ufeff', '').strip() for h in next(reader)]
+        idx = [header.index(c) for c in columns]
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            yield [row[i] for i in idx]
+
+
+def compare(csv_path: str, sql_path: str, show: int = 10) -> int:
+    conn, table, columns = load_sql(sql_path)
+    db_rows = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid")
+    diffs = 0
+    n = 0
+    for n, (csv_row, db_row) in enumerate(zip(read_csv_rows(csv_path, columns), db_rows), start=1):
+        for col, text, got in zip(columns, csv_row, db_row):
+            want = expected_value(col, text)
+            if got != want:
+                diffs += 1
+                if diffs <= show:
+                    print(f"第 {n} 行 {col}: CSV {text!r} → 应为 {want!r}，SQLite 中为 {got!r}")
+    csv_count = sum(1 for _ in read_csv_rows(csv_path, columns))
+    db_count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    conn.close()
+    if csv_count != db_count:
+        print(f"行数不同：CSV {csv_count} 行，SQLite {db_count} 行")
+        diffs += 1
+    print(f"比对 {min(csv_count, db_count)} 行 × {len(columns)} 列，差异 {diffs} 处")
+    return diffs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='把 insert 输出导入 SQLite 并与 CSV 输出比对')
+    parser.add_argument('--csv', required=True, help='generate_springboot_new.py 的 CSV 输出')
+    parser.add_argument('--sql', required=True, help='同一 --seed 的 insert 输出（--sql-dialect standard）')
+    parser.add_argument('--show', type=int, default=10, help='最多打印的差异数')
+    args = parser.parse_args(argv)
+    return 1 if compare(args.csv, args.sql, args.show) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
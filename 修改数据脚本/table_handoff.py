@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+同一进程中依次运行的脚本之间传递解析好的表（trip7ai pipeline 用）：
+- 流水线先用 expect(路径, ...) 登记“后面还有步骤要读”的文件；
+  写出这些文件的脚本（change_course_llm_data）在写 CSV 的同时把表头和行列表留在内存里（put）
+- 读这些文件的脚本（verify_llm_schedule）先按路径取表（get），取到则不再读入、解析 CSV
+- 表与写出的文件内容相同：行为 csv.writer 写出的字符串列表，表头第一个字段去掉 BOM（与用 utf-8-sig 读文件相同）
+- 登记表时记下文件的大小与修改时间，之后文件被改写则丢弃内存中的表，回到读文件
+脚本单独运行时没有登记任何路径，wanted 总是 False，行为与原来相同。
+"""
+
+import os
+
+_expected = set()
+_tables = {}
+
+
+def _key(path: str) -> str:
+    return os.path.realpath(path)
+
+
+def _stamp(path: str):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def expect(*paths) -> None:
+    """登记之后要在内存中传递的文件"""
+    _expected.update(_key(p) for p in paths)
+
+
+def wanted(path: str) -> bool:
+    """写出 path 的脚本是否需要把表留在内存里"""
+    return path != '-' and _key(path) in _expected
+
+
+def put(path: str, header: list, rows: list) -> None:
+    """文件写完（已关闭）后登记它的内容"""
+    if not wanted(path):
+        return
+    header = list(header)
+    if header and header[0].startswith('\ufeff'):
+        header[0] = header[0][1:]
+    _tables[_key(path)] = (_stamp(path), header, rows)
+
+
+def get(path: str):
+    """返回 (表头, 行列表)；没有登记或文件已被改写时返回 None"""
+    if path == '-':
+        return None
+    entry = _tables.get(_key(path))
+    if entry is None:
+        return None
+    try:
+        fresh = _stamp(path) == entry[0]
+    except OSError:
+        fresh = False
+    if not fresh:
+        del _tables[_key(path)]
+        return None
+    return entry[1], entry[2]
+
+
+def clear() -> None:
+    _expected.clear()
+    _tables.clear()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+各脚本共用的时间 / 时长解析（排程、核对、生成脚本与 检查数据脚本 的检查器）：
+- 日期时间：YYYY/M/D H:MM[:SS] 或 YYYY-M-D H:MM[:SS]（同一种分隔符），两端空白忽略；无效返回 None
+- 日期：YYYY/M/D 或 YYYY-M-D
+- 时长：H:MM:SS 或 MM:SS → 分钟（float，含秒）；无效返回 None
+- None / NaN / NaT 视为空值
+
+单值解析：先走手写的快速路径（正则拆分 + int），不符合时回退到 strptime / 逐段 int，
+快速路径只接受回退路径也接受的写法，所以结果与回退路径完全一致；
+字符串按值做有界 LRU 缓存（时长只有几百种取值，时间落在整分钟上，重复很多）。
+
+整列解析（需要 numpy / pandas，第一次整列解析时才导入）：先按不同的值去重；时间列再按“字符形状”（数字 / 分隔符 / 空格的排列）
+分批，同一形状的值各字段位置固定，整批按列取数并校验日期；形状不认识的少数值逐个走单值解析。
+"""
+
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+from schedule_timeline import to_seconds
+
+np = None
+pd = None
+
+
+DATETIME_CACHE_SIZE = 1 << 16
+DURATION_CACHE_SIZE = 4096
+MISSING = -1  # 整列解析为秒数时，无法解析的值
+
+DATETIME_FORMATS = ('%Y/%m/%d %H:%M', '%Y/%m/%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S')
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d')
+
+# 快速路径（只用 ASCII 数字：\d 还会匹配全角等数字，那些交给回退路径）
+_DATETIME_RE = re.compile(r'([0-9]{4})([/-])([0-9]{1,2})\2([0-9]{1,2}) +([0-9]{1,2}):([0-9]{1,2})(?::([0-9]{1,2}))?')
+_DATE_RE = re.compile(r'([0-9]{4})([/-])([0-9]{1,2})\2([0-9]{1,2})')
+_DURATION_RE = re.compile(r'([0-9]+):([0-9]+)(?::([0-9]+))?')
+
+
+def _text(value):
+    """None / NaN / NaT → None；其余转为去掉两端空白的字符串"""
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        if value != value:  # NaN / NaT
+            return None
+        value = str(value)
+    return value.strip()
+
+
+@lru_cache(maxsize=DATETIME_CACHE_SIZE)
+def _parse_datetime_text(s: str):
+    m = _DATETIME_RE.fullmatch(s)
+    if m:
+        y, _, mo, d, h, mi, sec = m.groups()
+        try:
+            return datetime(int(y), int(mo), int(d), int(h), int(mi), int(sec or 0))
+        except ValueError:
+            # 月 / 日 / 时分秒超出范围：strptime 同样不接受
+            return None
+    for fmt in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(s, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_datetime(value):
+    """日期时间字符串 → datetime；无效或空返回 None"""
+    s = _text(value)
+    return _parse_datetime_text(s) if s else None
+
+
+@lru_cache(maxsize=DATETIME_CACHE_SIZE)
+def _parse_date_text(s: str):
+    m = _DATE_RE.fullmatch(s)
+    if m:
+        try:
+            return date(int(m.group(1)), int(m.group(3)), int(m.group(4)))
+        except ValueError:
+            return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_date(value):
+    """日期字符串 → date；无效或空返回 None"""
+    s = _text(value)
+    return _parse_date_text(s) if s else None
+
+
+@lru_cache(maxsize=DURATION_CACHE_SIZE)
+def _duration_text(s: str):
+    m = _DURATION_RE.fullmatch(s)
+    if m:
+        a, b, c = m.groups()
+        if c is None:
+            return int(a) + int(b) / 60.0
+        return int(a) * 60 + int(b) + int(c) / 60.0
+    parts = s.split(':')
+    try:
+        if len(parts) == 3:
+            h, mi, sec = map(int, parts)
+            return h * 60 + mi + sec / 60.0
+        if len(parts) == 2:
+            mi, sec = map(int, parts)
+            return mi + sec / 60.0
+    except ValueError:
+        pass
+    return None
+
+
+def duration_minutes(value):
+    """时长 'H:MM:SS' / 'MM:SS' → 分钟（float，含秒）；无效或空返回 None"""
+    s = _text(value)
+    return _duration_text(s) if s else None
+
+
+def hms_minutes(value):
+    """只接受 'H:MM:SS' 的 duration_minutes（check_data 的標準視聴時間：'10:30' 之类报告为无效）"""
+    s = _text(value)
+    return _duration_text(s) if s and s.count(':') == 2 else None
+
+
+def cache_info() -> dict:
+    """各缓存的命中情况（调优缓存大小用）"""
+    return {'datetime': _parse_datetime_text.cache_info(), 'date': _parse_date_text.cache_info(),
+            'duration': _duration_text.cache_info()}
+
+
+# ---- 整列版本 ----
+def require_pandas():
+    """导入 numpy / pandas（只用单值解析的脚本不必加载）"""
+    global np, pd
+    if pd is not None:
+        return
+    try:
+        import numpy
+        import pandas
+    except ImportError:
+        raise ImportError("整列解析需要 numpy 和 pandas：pip install numpy pandas")
+    np, pd = numpy, pandas
+
+
+def map_unique(values, parse) -> list:
+    """只对不同的值调用 parse，按原顺序展开为列表（空值 → parse(None)）"""
+    require_pandas()
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), sort=False)
+    parsed = [parse(v) for v in uniques]
+    empty = parse(None)
+    return [parsed[c] if c >= 0 else empty for c in codes.tolist()]
+
+
+def datetime_column(values) -> list:
+    """整列 → datetime / None 的列表（与逐个 parse_datetime 相同）"""
+    return map_unique(values, parse_datetime)
+
+
+def date_column(values) -> list:
+    return map_unique(values, parse_date)
+
+
+def duration_column(values) -> list:
+    """整列 → 分钟 / None 的列表（与逐个 duration_minutes 相同）"""
+    return map_unique(values, duration_minutes)
+
+
+def hms_column(values) -> list:
+    """整列 → 分钟 / None 的列表（与逐个 hms_minutes 相同）"""
+    return map_unique(values, hms_minutes)
+
+
+# 时间列按字符形状分批：d 数字、e 定长字符串末尾的填充，其余字符原样（不认识的字符记为 x）
+_SHAPE_RE = re.compile(r' *(dddd)([/-])(dd?)\2(dd?) +(dd?):(dd?)(?::(dd?))? *e*')
+_SHAPE_CHUNK = 1 << 18
+_DAYS_IN_MONTH = None
+
+
+def _field(block, span):
+    """一批同形状的值中固定列位置的数字字段 → 整数数组"""
+    value = np.zeros(len(block), dtype=np.int64)
+    for j in range(*span):
+        value = value * 10 + (block[:, j].astype(np.int64) - 48)
+    return value
+
+
+def _days_from_civil(y, m, d):
+    """公历日期 → 自 1970-01-01 起的日序号（与 schedule_timeline.day_index 相同）"""
+    y = y - (m <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * (m + np.where(m > 2, -3, 9)) + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def _shape_seconds(texts, out, slow) -> None:
+    """texts 为定长 unicode 数组；能按形状解析的写入 out，其余下标追加到 slow"""
+    global _DAYS_IN_MONTH
+    if _DAYS_IN_MONTH is None:
+        _DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+    chars = texts.view(np.uint32).reshape(len(texts), -1)
+    cls = np.full(chars.shape, ord('x'), dtype=np.uint8)
+    cls[(chars >= 48) & (chars <= 57)] = ord('d')
+    for ch in '/-: ':
+        cls[chars == ord(ch)] = ord(ch)
+    cls[chars == 0] = ord('e')
+    shape_codes, shapes = pd.factorize(cls.view(f'S{chars.shape[1]}').ravel(), sort=False)
+    by_shape = np.argsort(shape_codes, kind='stable')
+    bounds = np.r_[0, np.cumsum(np.bincount(shape_codes, minlength=len(shapes)))]
+    for k, shape in enumerate(shapes):
+        rows = by_shape[bounds[k]:bounds[k + 1]]
+        m = _SHAPE_RE.fullmatch(shape.decode('ascii'))
+        if m is None:
+            slow.extend(rows.tolist())
+            continue
+        block = chars[rows]
+        y, mo, d, h, mi = (_field(block, m.span(g)) for g in (1, 3, 4, 5, 6))
+        sec = _field(block, m.span(7)) if m.group(7) else np.zeros(len(rows), dtype=np.int64)
+        leap = (y % 4 == 0) & ((y % 100 != 0) | (y % 400 == 0))
+        month_ok = (mo >= 1) & (mo <= 12)
+        dim = _DAYS_IN_MONTH[np.clip(mo, 1, 12) - 1] + ((mo == 2) & leap)
+        ok = (y >= 1) & month_ok & (d >= 1) & (d <= dim) & (h < 24) & (mi < 60) & (sec < 60)
+        seconds = _days_from_civil(y, mo, d) * 86400 + h * 3600 + mi * 60 + sec
+        # 字段超出范围：与单值快速路径一样视为无法解析
+        out[rows] = np.where(ok, seconds, MISSING)
+
+
+def datetime_seconds_column(values, missing: int = MISSING) -> "np.ndarray":
+    """
+    整列 → 自 1970-01-01 起的整数秒（schedule_timeline 的时间线），无法解析为 missing；
+    结果与逐个 parse_datetime 再换算相同
+    """
+    require_pandas()
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), sort=False)
+    out = np.full(len(uniques), MISSING, dtype=np.int64)
+    slow = []
+    for lo in range(0, len(uniques), _SHAPE_CHUNK):
+        part = uniques[lo:lo + _SHAPE_CHUNK]
+        # 定长数组会丢掉末尾的 \0，含 \0 的值走单值解析
+        is_text = np.array([isinstance(v, str) and '\x00' not in v for v in part], dtype=bool)
+        texts = np.array([v if ok else '' for v, ok in zip(part, is_text)], dtype=str)
+        if texts.itemsize == 0:
+            texts = texts.astype('U1')
+        sub = np.full(len(part), MISSING, dtype=np.int64)
+        rest = []
+        _shape_seconds(texts, sub, rest)
+        sub[~is_text] = MISSING
+        out[lo:lo + len(part)] = sub
+        slow.extend(lo + i for i in rest if is_text[i])
+        slow.extend(lo + i for i in np.flatnonzero(~is_text).tolist())
+    for i in slow:
+        dt = parse_datetime(uniques[i])
+        out[i] = MISSING if dt is None else to_seconds(dt)
+    result = out[codes]
+    result[(codes < 0) | (result == MISSING)] = missing
+    return result
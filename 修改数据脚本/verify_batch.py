@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+verify_llm_schedule.py 的列式核对引擎（--engine numpy）：
+- 整表按列读入一次（全部为字符串），时间 / 时长 / rest 各列只解析“不同的值”（pd.factorize）；
+  时间列用 value_parsing.datetime_seconds_column（与 python 引擎逐个 parse_datetime 的结果相同）
+- 行按（user_id 首次出现的先后, 行序）稳定排序；每个用户从第一条可解析的 first_finished_time 起参与核对
+- 重放按“第 k 条”同步推进所有用户：每一步对当前仍有第 k 条的全部用户做一次向量运算
+  （schedule_kernel 的 place_rows_np / next_current_np，与逐条规则相同），不符时按同样方式从文件值接续
+- 重放结束后按（用户首次出现的先后, 行序）逐条交给 emit 写出，不在内存中组装、排序全部记录（顺序与 python 引擎相同）
+
+安装依赖：
+  pip install numpy pandas
+"""
+
+import sys
+
+from schedule_kernel import (
+    RULE_FIRST, RULE_RESYNC, UTC_SHIFT_SEC, calendar_tables, duration_from_minutes, new_calendar,
+    next_current_np, parse_time_string, place_rows_np, rule_label,
+)
+from schedule_timeline import DAY_SEC, H13, format_seconds
+from value_parsing import MISSING, datetime_seconds_column as datetime_seconds
+from verify_llm_schedule import (
+    KIND_LOCAL, KIND_NEXT, KIND_REST, KIND_START, KIND_UNPARSEABLE, REQUIRED_COLUMNS, kind_label,
+)
+
+try:
+    import numpy as np
+    import pandas as pd
+except Exception:
+    np = None
+    pd = None
+
+
+def require_numpy():
+    if np is None or pd is None:
+        print("缺少 numpy / pandas，请先安装：pip install numpy pandas", file=sys.stderr)
+        sys.exit(1)
+
+
+def _parse_unique(values, parse) -> "np.ndarray":
+    """只对不同的值调用 parse，再按编码展开为整列"""
+    codes, uniques = pd.factorize(values, sort=False)
+    parsed = np.array([parse(v) for v in uniques], dtype=np.int64)
+    return parsed[codes]
+
+
+def duration_column(values) -> "np.ndarray":
+    return _parse_unique(values, lambda v: duration_from_minutes(parse_time_string(v)))
+
+
+def rest_column(values) -> "np.ndarray":
+    return _parse_unique(values, lambda v: int(v.strip()) if v.strip().isdigit() else MISSING)
+
+
+def verify_file(f, emit):
+    """
+    每条不符记录调用一次 emit(记录)，返回核对行数；记录与顺序均与 python 引擎相同
+    """
+    require_numpy()
+    return verify_frame(pd.read_csv(f, dtype=str, keep_default_na=False), emit)
+
+
+def verify_table(header, rows, emit):
+    """已解析的表（表头 + 字符串行列表，如流水线中上一步留在内存里的输出）"""
+    require_numpy()
+    return verify_frame(pd.DataFrame(rows, columns=header, dtype=object), emit)
+
+
+def verify_frame(df, emit):
+    """各列均为字符串的 DataFrame"""
+    missing = [name for name in REQUIRED_COLUMNS.values() if name not in df.columns]
+    if missing:
+        raise ValueError(f"Header columns not found: {missing}; header={list(df.columns)}")
+    col = {key: df[name].to_numpy(dtype=object) for key, name in REQUIRED_COLUMNS.items()}
+
+    # 分组：user_id 首次出现的先后，组内保持行序；“留”行不参与
+    user_code = pd.factorize(col['user'], sort=False)[0]
+    active = np.array([v.strip() != "留" for v in col['flag']], dtype=bool)
+    order = np.argsort(user_code, kind='stable')
+    order = order[active[order]]
+    users = user_code[order]
+
+    # 每个用户第一条可解析的 first_finished_time 之前的行从未更新过，不核对
+    fft = datetime_seconds(col['fft'][order])
+    ok_fft = (fft != MISSING).astype(np.int64)
+    new_user = np.r_[True, users[1:] != users[:-1]]
+    user_start = np.flatnonzero(new_user)
+    csum = np.cumsum(ok_fft)
+    before = (csum - ok_fft)[user_start]
+    seen = csum - np.repeat(before, np.diff(np.r_[user_start, len(users)]))
+    keep = seen > 0
+    order = order[keep]
+    users = users[keep]
+    fft = fft[keep]
+    n = len(order)
+    if n == 0:
+        return 0
+
+    # 紧凑的用户编号与组内位置
+    new_user = np.r_[True, users[1:] != users[:-1]]
+    user_start = np.flatnonzero(new_user)
+    lengths = np.diff(np.r_[user_start, n])
+    uid = np.repeat(np.arange(len(user_start)), lengths)
+    pos = np.arange(n) - user_start[uid]
+
+    dur = duration_column(col['dur'][order])
+    rest = rest_column(col['rest'][order])
+    act_start = datetime_seconds(col['utc'][order])
+    act_next = datetime_seconds(col['next'][order])
+    act_local = datetime_seconds(col['local'][order])
+
+    # 工作日表：覆盖所有出现过的日期，再留出每条最多跨几天的余量
+    days = np.concatenate([fft[fft != MISSING], act_start[act_start != MISSING]]) // DAY_SEC
+    tables = calendar_tables(new_calendar(), int(days.min()) - 7,
+                             int(days.max()) + 3 * int(lengths.max()) + int(dur.max()) // DAY_SEC + 14)
+    safe = (int(days.min()) * DAY_SEC)
+
+    exp_start = np.zeros(n, dtype=np.int64)
+    exp_end = np.zeros(n, dtype=np.int64)
+    kinds = np.zeros(n, dtype=np.int64)
+    rules = np.zeros(n, dtype=np.int64)
+
+    # 每个用户的重放状态
+    current = fft[user_start] + UTC_SHIFT_SEC
+    valid = np.ones(len(user_start), dtype=bool)
+    carry = np.full(len(user_start), RULE_FIRST, dtype=np.int64)
+    prev_end = current.copy()   # 上一条重放出的结束时间，接续时沿用它的秒数
+
+    by_pos = np.argsort(pos, kind='stable')
+    bounds = np.r_[0, np.cumsum(np.bincount(pos))]
+    for k in range(len(bounds) - 1):
+        ids = by_pos[bounds[k]:bounds[k + 1]]   # 第 k 条所在的行
+        u = uid[ids]
+        cur = current[u]
+        car = carry[u]
+        a = act_start[ids]
+        a_ok = a != MISSING
+
+        # 没有可接续的起点：从文件中的开始时间 + 上一条重放结束的秒数接续（同 verify_llm_schedule.resync_start），
+        # 这一条允许相差 1 分钟；文件中也无法解析时记为 unparseable
+        need = ~valid[u]
+        unparse = need & ~a_ok
+        resumed = np.where(a % DAY_SEC == H13, a, a // 60 * 60 + prev_end[u] % 60)
+        cur = np.where(need, np.where(a_ok, resumed, safe), cur)
+        car = np.where(need, RULE_RESYNC, car)
+        slack = np.where(need, 1, 0)
+
+        start, end, day_start, placed = place_rows_np(cur, dur[ids], tables)
+        bits = np.where(unparse, RULE_RESYNC, placed | car)
+        kind = np.where(_off_by(a, start, slack), KIND_START, 0)
+        kind |= np.where(_off_by(act_next[ids], end, slack), KIND_NEXT, 0)
+        kind |= np.where(_off_by(act_local[ids], start - UTC_SHIFT_SEC, slack), KIND_LOCAL, 0)
+        kind |= np.where(rest[ids] == MISSING, KIND_REST, 0)
+        kind = np.where(unparse, KIND_UNPARSEABLE, kind)
+        exp_start[ids] = start
+        exp_end[ids] = end
+        kinds[ids] = kind
+        rules[ids] = bits
+
+        # 开始与结束都不符的行从文件值接续（保留重放出的秒数）；只有开始不符、结束与重放一致时沿用重放的链
+        resync = ((kind & KIND_START) != 0) & ((kind & KIND_NEXT) != 0) & ~unparse
+        resync_start = np.where(a_ok, a // 60 * 60 + start % 60, start)
+        start = np.where(resync, resync_start, start)
+        end = np.where(resync, start + dur[ids], end)
+        day_start = np.where(resync, start // DAY_SEC * DAY_SEC, day_start)
+        rest_ok = rest[ids] != MISSING
+        nxt, advanced = next_current_np(end, np.where(rest_ok, rest[ids], 0), day_start, tables)
+        alive = ~unparse & ~(resync & ~a_ok) & rest_ok
+        prev_end[u] = np.where(unparse, prev_end[u], end)
+        current[u] = np.where(alive, nxt, safe)
+        valid[u] = alive
+        carry[u] = np.where(alive, np.where(resync, RULE_RESYNC, 0) | advanced, RULE_RESYNC)
+
+    _emit_records(order, kinds, rules, exp_start, exp_end, col, emit)
+    return n
+
+
+def _off_by(actual, expected, slack) -> "np.ndarray":
+    """文件值无法解析，或与期望值相差超过 slack 分钟（同 verify_llm_schedule.off_by）"""
+    return (actual == MISSING) | (np.abs(actual // 60 - expected // 60) > slack)
+
+
+def _emit_records(order, kinds, rules, exp_start, exp_end, col, emit):
+    """按 order 的顺序（已按用户分组、组内行序）写出不符记录（格式同 verify_llm_schedule.make_record）"""
+    for j in np.flatnonzero(kinds):
+        i = int(order[j])
+        if kinds[j] & KIND_UNPARSEABLE:
+            expected = ["", "", ""]
+        else:
+            start = int(exp_start[j])
+            expected = [format_seconds(start), format_seconds(int(exp_end[j])),
+                        format_seconds(start - UTC_SHIFT_SEC)]
+        emit([i + 2, col['user'][i], kind_label(int(kinds[j])), rule_label(int(rules[j]))] + expected + [
+            col['utc'][i], col['next'][i], col['local'][i], col['rest'][i]])
@@ -1,135 +1,300 @@
+"""
+Verify rescheduled LLM data against the shared scheduling kernel (schedule_kernel).
+
+Each user is replayed from first_finished_time + 9h using the rest_time recorded in the file;
+new_started_at_UTC / next_started_at / new_started_at are compared per row (minute precision).
+Every mismatch can be written to a report (.jsonl, or .csv by extension) with the fields that differ
+and the rules that produced the expected value. Records are written as each user is finished
+(users in order of first appearance, rows in file order). Exit code is 1 when any row does not match.
+
+Usage:
+  python verify_llm_schedule.py --input 副本LLM+data基础_修改.csv --report mismatches.jsonl
+  python verify_llm_schedule.py --input big.csv --engine numpy --report mismatches.csv
+  ... | python verify_llm_schedule.py --input - --show 0
+"""
+
+import argparse
 import csv
-from datetime import datetime, timedelta
+import io
+import json
+import sys
+from collections import defaultdict
+
+from schedule_kernel import (
+    RULE_FIRST, RULE_RESYNC, UTC_SHIFT_SEC, duration_from_minutes, new_calendar, next_current_rules,
+    parse_datetime, parse_time_string, place_row_rules, replay, rule_label,
+)
+from schedule_timeline import DAY_SEC, H13, format_seconds, to_seconds
+import table_handoff
 
 INPUT_FILE = "副本LLM+data基础_修改_new.csv"
 
-def parse_dt(s: str):
+REQUIRED_COLUMNS = {
+    "user": "user_id",
+    "flag": "flag",
+    "fft": "first_finished_time",
+    "local": "new_started_at",
+    "utc": "new_started_at_UTC",
+    "next": "next_started_at",
+    "rest": "rest_time",
+    "dur": "course_video_length",
+}
+
+# mismatch kinds (bit flags, shared with verify_batch)
+KIND_START = 1
+KIND_NEXT = 2
+KIND_LOCAL = 4
+KIND_REST = 8
+KIND_UNPARSEABLE = 16
+KIND_NAMES = [
+    (KIND_START, "start"), (KIND_NEXT, "next"), (KIND_LOCAL, "local"),
+    (KIND_REST, "rest_invalid"), (KIND_UNPARSEABLE, "unparseable"),
+]
+
+REPORT_COLUMNS = [
+    "row", "user_id", "mismatch", "rule",
+    "expected_utc", "expected_next", "expected_local",
+    "actual_utc", "actual_next", "actual_local", "rest_time",
+]
+
+
+def kind_label(kinds: int) -> str:
+    return "+".join(name for bit, name in KIND_NAMES if kinds & bit)
+
+
+def parse_sec(s: str):
+    dt = parse_datetime(s)
+    return None if dt is None else to_seconds(dt)
+
+
+def parse_minute(s: str):
+    sec = parse_sec(s)
+    return None if sec is None else sec // 60
+
+
+def resync_start(actual_start: int, prev_end: int) -> int:
+    """
+    start to resume from when the chain is lost: the file's minute plus the seconds of the last
+    replayed end (rest and the 9:00 jump keep them); a 13:00 start comes from the lunch rule,
+    which starts on the whole minute
+    """
+    if actual_start % DAY_SEC == H13:
+        return actual_start
+    return actual_start // 60 * 60 + prev_end % 60
+
+
+def off_by(actual, expected_sec, slack) -> bool:
+    """actual (seconds or None) differs from expected_sec by more than slack minutes"""
+    return actual is None or abs(actual // 60 - expected_sec // 60) > slack
+
+
+def parse_rest(s: str):
     s = (s or "").strip()
-    if not s:
-        return None
-    try:
-        m = __import__("re").match(r"^(\d{4})/(\d{1,2})/(\d{1,2})\s+(\d{1,2}):(\d{2})$", s)
-        if not m:
-            return None
-        y, mo, d, h, mi = map(int, m.groups())
-        return datetime(y, mo, d, h, mi)
-    except Exception:
-        return None
-
-def is_workday(dt: datetime) -> bool:
-    return dt.weekday() < 5
-
-def get_next_workday(dt: datetime) -> datetime:
-    nd = dt + timedelta(days=1)
-    while nd.weekday() >= 5:
-        nd += timedelta(days=1)
-    return nd
-
-def main():
-    with open(INPUT_FILE, "r", encoding="utf-8-sig", newline="") as f:
-        reader = csv.reader(f)
-        header = next(reader)
-        # column indices
-        try:
-            user_idx = header.index("user_id")
-            flag_idx = header.index("flag")
-            utc_idx = header.index("new_started_at_UTC")
-            next_idx = header.index("next_started_at")
-            rest_idx = header.index("rest_time")
-            dur_idx = header.index("course_video_length")
-        except ValueError:
-            print("Header columns not found; header=", header)
-            return
-
-        rows = list(reader)
+    return int(s) if s.isdigit() else None
+
+
+def make_record(i, r, cols, kinds, rules, start=None, end=None) -> list:
+    """one report line; row is the line number in the file (header = line 1)"""
+    expected = ["", "", ""] if start is None else [
+        format_seconds(start), format_seconds(end), format_seconds(start - UTC_SHIFT_SEC)]
+    return [i + 2, r[cols["user"]], kind_label(kinds), rule_label(rules)] + expected + [
+        r[cols["utc"]], r[cols["next"]], r[cols["local"]], r[cols["rest"]]]
+
+
+def verify_user(idxs, rows, cols, calendar, mismatches):
+    """
+    Replay one user and append a report record per mismatching row.
+    A row whose start disagrees but whose next_started_at matches the replayed end keeps the
+    replayed chain (only the start field is wrong). When both disagree the replay resumes from the
+    start written in the file (keeping the replayed seconds, since the file has minutes only),
+    so one bad row does not cascade. After an invalid rest_time or an unparseable start the next
+    row resumes from its own start plus the seconds of the last replayed end (see resync_start),
+    and that row alone is compared with a tolerance of one minute (the seconds are a guess).
+    Returns the number of rows checked.
+    """
+    active = [i for i in idxs if rows[i][cols["flag"]].strip() != "留"]
+    # rows before the first parseable first_finished_time were never updated
+    first = 0
+    while first < len(active) and parse_datetime(rows[active[first]][cols["fft"]]) is None:
+        first += 1
+    active = active[first:]
+    if not active:
+        return 0
+
+    durations = [duration_from_minutes(parse_time_string(rows[i][cols["dur"]])) for i in active]
+    rests = [parse_rest(rows[i][cols["rest"]]) for i in active]
+    current = parse_sec(rows[active[0]][cols["fft"]]) + UTC_SHIFT_SEC
+
+    # fast path: exact replay of the whole chain
+    if None not in rests:
+        starts, ends = replay(current, durations, rests, calendar)
+        if all(parse_minute(rows[i][cols["utc"]]) == starts[k] // 60
+               and parse_minute(rows[i][cols["next"]]) == ends[k] // 60
+               and parse_minute(rows[i][cols["local"]]) == (starts[k] - UTC_SHIFT_SEC) // 60
+               for k, i in enumerate(active)):
+            return len(active)
+
+    # row by row
+    carry = RULE_FIRST
+    prev_end = current  # last replayed end, for the seconds of a resync
+    for k, i in enumerate(active):
+        r = rows[i]
+        actual_start = parse_sec(r[cols["utc"]])
+        slack = 0
+        if current is None:
+            if actual_start is None:
+                mismatches.append(make_record(i, r, cols, KIND_UNPARSEABLE, RULE_RESYNC))
+                continue
+            current = resync_start(actual_start, prev_end)
+            carry = RULE_RESYNC
+            slack = 1
+        start, end, day_start, rules = place_row_rules(current, durations[k], calendar)
+        rules |= carry
+        kinds = 0
+        if off_by(actual_start, start, slack):
+            kinds |= KIND_START
+        if off_by(parse_sec(r[cols["next"]]), end, slack):
+            kinds |= KIND_NEXT
+        if off_by(parse_sec(r[cols["local"]]), start - UTC_SHIFT_SEC, slack):
+            kinds |= KIND_LOCAL
+        if rests[k] is None:
+            kinds |= KIND_REST
+        carry = 0
+        if kinds:
+            mismatches.append(make_record(i, r, cols, kinds, rules, start, end))
+        if kinds & KIND_START and kinds & KIND_NEXT:
+            carry = RULE_RESYNC
+            if actual_start is None:
+                current, prev_end = None, end
+                continue
+            start = actual_start // 60 * 60 + start % 60
+            end, day_start = start + durations[k], start // DAY_SEC * DAY_SEC
+        prev_end = end
+        if rests[k] is None:
+            current = None
+            carry = RULE_RESYNC
+            continue
+        current, rules = next_current_rules(end, rests[k], day_start, calendar)
+        carry |= rules
+    return len(active)
+
+
+def open_input(path):
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", newline="")
+    return open(path, "r", encoding="utf-8-sig", newline="")
+
+
+def column_indices(header) -> dict:
+    missing = [name for name in REQUIRED_COLUMNS.values() if name not in header]
+    if missing:
+        raise ValueError(f"Header columns not found: {missing}; header={header}")
+    return {key: header.index(name) for key, name in REQUIRED_COLUMNS.items()}
+
+
+def verify_rows(f, emit):
+    """python engine: calls emit(record) for every mismatch, returns the number of rows checked"""
+    reader = csv.reader(f)
+    header = next(reader)
+    return verify_table(header, list(reader), emit)
+
+
+def verify_table(header, rows, emit):
+    """python engine on an already parsed table (header + rows of strings); each user's records go to emit when the user is done"""
+    cols = column_indices(header)
 
     # group by user_id preserving order
-    from collections import defaultdict
     groups = defaultdict(list)
     for i, r in enumerate(rows):
-        groups[r[user_idx]].append(i)
-
-    total_pairs = 0
-    matches = 0
-    mismatches = []
-
-    for uid, idxs in groups.items():
-        # scan consecutive non-留 rows
-        prev_i = None
-        for i in idxs:
-            r = rows[i]
-            if r[flag_idx].strip() == "留":
-                continue
-            if prev_i is None:
-                prev_i = i
-                continue
-            r_prev = rows[prev_i]
-            if r_prev[flag_idx].strip() == "留":
-                prev_i = i
-                continue
+        groups[r[cols["user"]]].append(i)
 
-            total_pairs += 1
-            prev_next = parse_dt(r_prev[next_idx])
-            rest = int((r_prev[rest_idx] or "0")) if (r_prev[rest_idx] or "").isdigit() else 0
-            cur_utc = parse_dt(r[utc_idx])
+    calendar = new_calendar()
+    total = 0
+    for idxs in groups.values():
+        mismatches = []
+        total += verify_user(idxs, rows, cols, calendar, mismatches)
+        for record in mismatches:
+            emit(record)
+    return total
 
-            if prev_next is None or cur_utc is None:
-                prev_i = i
-                continue
 
-            expected = prev_next + timedelta(minutes=rest)
-
-            # lunch window (consider end time falling in lunch)
-            lunch_start = expected.replace(hour=12, minute=0, second=0, microsecond=0)
-            lunch_end = expected.replace(hour=13, minute=0, second=0, microsecond=0)
-            # compute end with current row's duration
-            dur_s = r[dur_idx]
-            def parse_dur(s: str) -> int:
-                s = (s or "").strip()
-                if not s:
-                    return 0
-                try:
-                    parts = s.split(":")
-                    if len(parts) == 3:
-                        h, m, sec = parts
-                        mm = int(m)
-                    elif len(parts) == 2:
-                        h = "0"; m, sec = parts
-                        mm = int(m)
-                    else:
-                        return 0
-                    return mm
-                except Exception:
-                    return 0
-            minutes = parse_dur(dur_s)
-            expected_end = expected + timedelta(minutes=minutes)
-            if expected_end > lunch_start and expected_end < lunch_end:
-                expected = lunch_end
-            elif expected < lunch_start and expected_end > lunch_end:
-                expected = lunch_end
-
-            # after hours
-            if expected.hour >= 18 or (expected.hour == 17 and expected.minute > 30):
-                expected = get_next_workday(expected).replace(hour=9, minute=0)
-
-            # weekend
-            if not is_workday(expected):
-                expected = get_next_workday(expected).replace(hour=9, minute=0)
-
-            if expected == cur_utc:
-                matches += 1
+class ReportWriter:
+    """streams mismatch records to .jsonl (default) or .csv"""
+
+    def __init__(self, path):
+        self.f = open(path, "w", encoding="utf-8", newline="")
+        self.csv = csv.writer(self.f) if path.lower().endswith(".csv") else None
+        if self.csv:
+            self.csv.writerow(REPORT_COLUMNS)
+
+    def write(self, record):
+        if self.csv:
+            self.csv.writerow(record)
+        else:
+            self.f.write(json.dumps(dict(zip(REPORT_COLUMNS, record)), ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.f.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify rescheduled rows by replaying the scheduling kernel")
+    parser.add_argument("--input", default=INPUT_FILE, help="CSV to verify (- for stdin)")
+    parser.add_argument("--engine", choices=["python", "numpy"], default="python",
+                        help="numpy: columnar engine for large files (needs numpy and pandas)")
+    parser.add_argument("--report", default=None, help="write every mismatch to this .jsonl / .csv file")
+    parser.add_argument("--show", type=int, default=5, help="print the first N mismatches")
+    args = parser.parse_args(argv)
+
+    report = None
+    shown = []
+    rules = defaultdict(int)
+
+    def emit(record):
+        rules[record[3]] += 1
+        if report:
+            report.write(record)
+        if len(shown) < args.show:
+            shown.append(record)
+
+    # in a pipeline the previous step may hand over the parsed table instead of the CSV
+    table = table_handoff.get(args.input)
+    try:
+        if args.report:
+            report = ReportWriter(args.report)
+        if table is not None:
+            if args.engine == "numpy":
+                import verify_batch
+                total = verify_batch.verify_table(*table, emit)
             else:
-                exp_str = f"{expected.year}/{expected.month}/{expected.day} {expected.hour}:{expected.minute:02d}"
-                mismatches.append((uid, prev_i, i, r_prev[utc_idx], r_prev[next_idx], r_prev[rest_idx], r[utc_idx], exp_str))
+                total = verify_table(*table, emit)
+        else:
+            with open_input(args.input) as f:
+                if args.engine == "numpy":
+                    import verify_batch
+                    total = verify_batch.verify_file(f, emit)
+                else:
+                    total = verify_rows(f, emit)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+    finally:
+        if report:
+            report.close()
+    count = sum(rules.values())
 
-            prev_i = i
+    print(f"检查行数: {total}")
+    print(f"符合调度规则: {total - count}")
+    print(f"不符合: {count}")
+    for rule, n in sorted(rules.items(), key=lambda item: -item[1]):
+        print(f"  {rule}: {n}")
+    for rec in shown:
+        print(f"UID={rec[1]} 行{rec[0]} [{rec[2]}; {rec[3]}]: UTC={rec[7]}, next={rec[8]}, rest={rec[10]}, "
+              f"期望={rec[4]} -> {rec[5]}")
+    if report:
+        print(f"报告: {args.report}")
+    sys.exit(1 if count else 0)
 
-    print(f"检查用户连续行对: {total_pairs}")
-    print(f"符合调度规则: {matches}")
-    print(f"不符合: {len(mismatches)}")
-    for m in mismatches[:5]:
-        uid, pi, ci, prev_utc, prev_next, prev_rest, cur_utc, exp = m
-        print(f"UID={uid} 行{pi}->{ci}: prevUTC={prev_utc}, prevNext={prev_next}, rest={prev_rest}, curUTC={cur_utc}, 期望={exp}")
 
 if __name__ == "__main__":
     main()
@@ -18,6 +18,8 @@ Pillow 图片压缩脚本：支持批量目录处理、尺寸限制、质量设
   pip install pillow
 """
 
+from __future__ import annotations  # 未安装 Pillow 时注解里的 Image.Image 不求值，--help 仍可用
+
 import argparse
 import csv
 import os
@@ -180,7 +182,7 @@ def iter_inputs(root: Path, recursive: bool, exts: set[str]):
                 yield p
 
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description='Pillow 图片压缩脚本')
     parser.add_argument('--input', required=True, help='输入文件或目录')
     parser.add_argument('--output', required=True, help='输出目录')
@@ -202,11 +204,11 @@ def main():
     parser.add_argument('--dry-run', action='store_true', help='仅显示计划，不实际写入')
     parser.add_argument('--retry-if-larger', action='store_true', help='若压缩后更大，则尝试自适应降低质量以小于原文件体积')
     parser.add_argument('--retry-quality', type=int, default=75, help='重试时起始质量（JPEG/WebP）')
-    parser.add_argument('--retry-ratio', type=float, default=0.98, help='重试目标比例（例如0.98表示结果≤原体积的98%）')
+    parser.add_argument('--retry-ratio', type=float, default=0.98, help='重试目标比例（例如0.98表示结果≤原体积的98%%）')
     parser.add_argument('--report', default=None, help='输出报告CSV路径（记录前后体积对比与是否写入）')
     parser.add_argument('--report-encoding', default='utf-8-sig', help='报告文件编码（默认utf-8-sig，便于Excel）')
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     in_path = Path(args.input)
     out_root = Path(args.output)
     out_fmt = (args.format.lower() if args.format else None)
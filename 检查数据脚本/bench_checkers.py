@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查脚本基准测试：合成 itschool / dxai 形状的视听记录 CSV，按比例注入各规则的违规数据，
+然后端到端（及分阶段）计时 check_data / chack_data_dxai，并与注入的“标准答案”核对。
+
+- 行数可配置（可到百万级），按 --files 平均分到多个 "userName#course.csv" 文件
+- 每条规则的注入比例可单独配置（--rate 统一设置，--rates 逐条覆盖）
+- 日期格式与时长格式按真实导出随机选择（斜杠/横杠、带/不带秒、H:MM:SS / MM:SS）
+- 被注入行的前一行保持正常，保证每次注入只触发预期的规则
+
+使用：
+  python bench_checkers.py --rows 200000 --files 4 --rate 0.01
+  python bench_checkers.py --kind dxai --rows 1000000 --rates "cond2=0.05,holiday=0"
+核对不一致（漏报或误报）时返回码为 1。
+"""
+
+import argparse
+import csv
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, date
+from functools import lru_cache
+
+import check_data
+import check_stats
+import chack_data_dxai
+
+
+# 可注入的规则（itschool 额外包含模块/课程顺序）
+DXAI_RULES = ['format', 'std', 'cond0', 'cond1', 'cond2', 'window', 'holiday']
+ITSCHOOL_RULES = DXAI_RULES + ['module', 'lesson']
+
+# 每条规则额外必然触发的规则（结束早于开始时必然也早于“开始+标准时间”）
+IMPLIED_RULES = {'cond0': {'cond1'}}
+
+# 检查脚本输出的问题描述 -> 规则名（按前缀匹配）
+REASON_PREFIXES = [
+    ("条件 1 失败：时间格式无效", 'format'),
+    ("无效的标准观看时间", 'std'),
+    ("条件 0 失败", 'cond0'),
+    ("条件 1 失败：结束时间早于", 'cond1'),
+    ("条件 2 失败", 'cond2'),
+    ("条件 3 失败：时间超出有效工作时段", 'window'),
+    ("条件 3 失败：周末或日本节假日", 'holiday'),
+    ("モジュール順序エラー", 'module'),
+    ("レッスン順序エラー", 'lesson'),
+]
+
+ITSCHOOL_COLUMNS = ['モジュール', 'レッスン', '視聴開始時間', '視聴完了時間', '標準視聴時間']
+DXAI_COLUMNS = ['レッスン', '開始時間', '完了時間', '標準視聴時間']
+
+# 真实导出中出现过的日期格式
+DT_FORMATS = ['slash', 'slash_sec', 'dash', 'dash_sec']
+
+# 每章的行数（章节号按此递增），每个课程系列的分集数
+ROWS_PER_CHAPTER = 12
+PARTS_PER_LESSON = 3
+
+
+def rule_of_reason(reason: str):
+    for prefix, rule in REASON_PREFIXES:
+        if reason.startswith(prefix):
+            return rule
+    return None
+
+
+@lru_cache(maxsize=None)
+def is_business_day(d: date) -> bool:
+    return check_data.is_weekday_jp(d)
+
+
+def next_business_day(d: date) -> date:
+    d = d + timedelta(days=1)
+    while not is_business_day(d):
+        d = d + timedelta(days=1)
+    return d
+
+
+def next_non_business_day(d: date) -> date:
+    d = d + timedelta(days=1)
+    while is_business_day(d):
+        d = d + timedelta(days=1)
+    return d
+
+
+def format_dt(dt: datetime, style: str) -> str:
+    if style == 'slash':
+        return f"{dt.year}/{dt.month}/{dt.day} {dt.hour}:{dt.minute:02d}"
+    if style == 'slash_sec':
+        return f"{dt.year}/{dt.month}/{dt.day} {dt.hour}:{dt.minute:02d}:00"
+    if style == 'dash':
+        return dt.strftime('%Y-%m-%d %H:%M')
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def format_duration(seconds: int, short: bool) -> str:
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    if short and h == 0:
+        return f"{m:02d}:{s:02d}"
+    return f"{h}:{m:02d}:{s:02d}"
+
+
+def segment_end(dt: datetime) -> datetime:
+    """所在工作时段的最晚结束时间（结束时刻的小时须落在 [9,12) ∪ [13,18)）"""
+    if dt.hour < 12:
+        return dt.replace(hour=11, minute=59, second=0)
+    return dt.replace(hour=17, minute=59, second=0)
+
+
+def segment_start(dt: datetime) -> datetime:
+    if dt.hour < 12:
+        return dt.replace(hour=9, minute=0, second=0)
+    return dt.replace(hour=13, minute=0, second=0)
+
+
+def pick_rule(rules, rates, rng: random.Random):
+    """按各规则比例抽取要注入的规则；不注入返回 None"""
+    u = rng.random()
+    acc = 0.0
+    for rule in rules:
+        acc += rates.get(rule, 0.0)
+        if u < acc:
+            return rule
+    return None
+
+
+def synth_file(path, kind, n_rows, rates, rng: random.Random, start_day: date):
+    """
+    生成一个文件，返回标准答案 {(行号, 规则名), ...}
+    时间线按工作日推进：每条 = 开始 + 时长(向上取整到分钟) + 0..2 分钟，间隔 2..10 分钟，
+    放不进当前时段则跳到 13:00 或下一个工作日 9:00。
+    """
+    rules = ITSCHOOL_RULES if kind == 'itschool' else DXAI_RULES
+    dt_style = rng.choice(DT_FORMATS)
+    short_duration = kind == 'dxai' and rng.random() < 0.5
+    expected = set()
+
+    day = start_day if is_business_day(start_day) else next_business_day(start_day)
+    cursor = datetime.combine(day, datetime.min.time()).replace(hour=9, minute=rng.randint(0, 20))
+    prev_end = None         # 同一天前一条的结束时间（用于条件 2 注入）
+    prev_injected = True    # 第一行不注入（没有前一行可比较）
+
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(ITSCHOOL_COLUMNS if kind == 'itschool' else DXAI_COLUMNS)
+
+        for i in range(n_rows):
+            dur_sec = rng.randint(3 * 60, 35 * 60)
+            dur_min = -(-dur_sec // 60)
+
+            # 放不进当前时段则换时段 / 换天
+            start = cursor
+            if start.hour == 12:
+                start = start.replace(hour=13, minute=rng.randint(0, 5))
+                prev_end = None
+            if start + timedelta(minutes=dur_min + 2) > segment_end(start):
+                if start.hour < 12:
+                    start = start.replace(hour=13, minute=rng.randint(0, 5))
+                else:
+                    day = next_business_day(start.date())
+                    start = datetime.combine(day, datetime.min.time()).replace(hour=9, minute=rng.randint(0, 5))
+                prev_end = None
+            end = start + timedelta(minutes=dur_min + rng.randint(0, 2))
+            next_cursor = end + timedelta(minutes=rng.randint(2, 10))
+
+            chapter = i // ROWS_PER_CHAPTER + 1
+            pos = i % ROWS_PER_CHAPTER
+            lesson_no = pos // PARTS_PER_LESSON + 1
+            part = pos % PARTS_PER_LESSON + 1
+            module_val = f"第{chapter}章 データ処理"
+            start_str = None
+            std_str = format_duration(dur_sec, short_duration)
+
+            rule = None if prev_injected else pick_rule(rules, rates, rng)
+            if rule == 'format':
+                start_str = '不明'
+            elif rule == 'std':
+                std_str = '--:--'
+            elif rule == 'cond0':
+                if start - timedelta(minutes=2) >= segment_start(start):
+                    end = start - timedelta(minutes=2)
+                else:
+                    rule = None
+            elif rule == 'cond1':
+                end = start + timedelta(minutes=dur_min - 2)
+            elif rule == 'cond2':
+                overlap_start = prev_end - timedelta(minutes=1) if prev_end is not None else None
+                if overlap_start is not None and \
+                        overlap_start + timedelta(minutes=dur_min + 2) <= segment_end(overlap_start):
+                    start = overlap_start
+                    end = start + timedelta(minutes=dur_min + rng.randint(0, 2))
+                    next_cursor = end + timedelta(minutes=rng.randint(2, 10))
+                else:
+                    rule = None
+            elif rule == 'window':
+                # 当天 18:00 以后的最后一条，之后换到下一个工作日
+                start = start.replace(hour=18, minute=rng.randint(0, 30))
+                end = start + timedelta(minutes=dur_min + rng.randint(0, 2))
+                day = next_business_day(start.date())
+                next_cursor = datetime.combine(day, datetime.min.time()).replace(hour=9, minute=rng.randint(0, 20))
+            elif rule == 'holiday':
+                # 放到下一个周末/节假日，之后换到其后的工作日
+                off_day = next_non_business_day(start.date())
+                start = datetime.combine(off_day, datetime.min.time()).replace(hour=10, minute=rng.randint(0, 30))
+                end = start + timedelta(minutes=dur_min + rng.randint(0, 2))
+                day = next_business_day(off_day)
+                next_cursor = datetime.combine(day, datetime.min.time()).replace(hour=9, minute=rng.randint(0, 20))
+            elif rule == 'module':
+                if pos > 0 and chapter > 1:
+                    module_val = f"第{chapter - 1}章 データ処理"
+                else:
+                    rule = None
+            elif rule == 'lesson':
+                if part > 1:
+                    part -= 1
+                else:
+                    rule = None
+
+            if rule is not None:
+                expected.add((i, rule))
+                for implied in IMPLIED_RULES.get(rule, ()):
+                    expected.add((i, implied))
+            prev_injected = rule is not None
+
+            if start_str is None:
+                start_str = format_dt(start, dt_style)
+            end_str = format_dt(end, dt_style)
+            lesson_val = f"レッスン{chapter}-{lesson_no}（{part}）"
+            if kind == 'itschool':
+                writer.writerow([module_val, lesson_val, start_str, end_str, std_str])
+            else:
+                writer.writerow([lesson_val, start_str, end_str, std_str])
+
+            prev_end = end if rule not in ('window', 'holiday') else None
+            cursor = next_cursor
+
+    return expected
+
+
+def parse_rates(rate: float, overrides: str, rules):
+    rates = {r: rate for r in rules}
+    for tok in (overrides or '').split(','):
+        tok = tok.strip()
+        if not tok:
+            continue
+        name, _, value = tok.partition('=')
+        name = name.strip()
+        if name not in rates:
+            raise RuntimeError(f"未知规则：{name}（可选：{', '.join(rules)}）")
+        rates[name] = float(value)
+    if sum(rates.values()) >= 1.0:
+        raise RuntimeError('注入比例之和须小于 1')
+    return rates
+
+
+def generate(kind, folder, rows, files, rates, rng, start_day):
+    """生成数据集，返回 ({文件名: 标准答案集合}, 生成耗时秒)"""
+    courses = list(check_data.course_requirements.keys())
+    truth = {}
+    t0 = time.perf_counter()
+    per_file = rows // files
+    for k in range(files):
+        n = per_file + (1 if k < rows % files else 0)
+        name = f"user{k:03d}#{courses[k % len(courses)]}.csv"
+        truth[name] = synth_file(os.path.join(folder, name), kind, n, rates, rng, start_day)
+    return truth, time.perf_counter() - t0
+
+
+def run_checker(kind, folder, truth):
+    """运行检查并计时，返回 (总耗时, check_stats 统计, 检出集合)"""
+    stats = check_stats.new_stats()
+    found = {}
+    t0 = time.perf_counter()
+    for name in truth:
+        path = os.path.join(folder, name)
+        if kind == 'itschool':
+            result = check_data.check_file(path, stats)
+            reasons = list(result['issues']) + list(result['order_issues'])
+        else:
+            result = chack_data_dxai.check_file(path, stats)
+            reasons = list(result['issues'])
+        found[name] = {(idx, rule_of_reason(reason)) for idx, reason in reasons}
+    return time.perf_counter() - t0, check_stats.finish(stats), found
+
+
+def verify(rules, truth, found):
+    """按规则统计：注入数 / 检出数 / 漏报 / 误报"""
+    stats = {r: {'injected': 0, 'detected': 0, 'missed': 0, 'unexpected': 0} for r in rules}
+    for name, expected in truth.items():
+        got = found.get(name, set())
+        for _idx, rule in expected:
+            stats[rule]['injected'] += 1
+        for _idx, rule in expected & got:
+            stats[rule]['detected'] += 1
+        for _idx, rule in expected - got:
+            stats[rule]['missed'] += 1
+        for _idx, rule in got - expected:
+            stats.setdefault(rule, {'injected': 0, 'detected': 0, 'missed': 0, 'unexpected': 0})
+            stats[rule]['unexpected'] += 1
+    return stats
+
+
+def bench_kind(kind, args, rng, start_day):
+    rules = ITSCHOOL_RULES if kind == 'itschool' else DXAI_RULES
+    rates = parse_rates(args.rate, args.rates, rules)
+
+    folder = os.path.join(args.workdir, kind)
+    os.makedirs(folder, exist_ok=True)
+    truth, gen_sec = generate(kind, folder, args.rows, args.files, rates, rng, start_day)
+    total_sec, stats, found = run_checker(kind, folder, truth)
+    verdict = verify(rules, truth, found)
+
+    print(f"\n=== {kind}：{args.rows} 行 / {args.files} 个文件 ===")
+    print(f"生成耗时：{gen_sec:.2f}s")
+    print(f"检查耗时：{total_sec:.2f}s（{args.rows / total_sec if total_sec > 0 else 0:,.0f} 行/秒）")
+    check_stats.print_summary(stats)
+    if args.stats_json:
+        check_stats.write_json(stats, f"{args.stats_json}.{kind}.json")
+
+    print(f"{'规则':<10}{'注入':>8}{'检出':>8}{'漏报':>8}{'误报':>8}")
+    ok = True
+    for rule, st in verdict.items():
+        print(f"{str(rule):<10}{st['injected']:>8}{st['detected']:>8}{st['missed']:>8}{st['unexpected']:>8}")
+        if st['missed'] or st['unexpected']:
+            ok = False
+    print("✅ 检出结果与注入一致" if ok else "❌ 检出结果与注入不一致")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='检查脚本基准测试（合成数据 + 注入违规 + 计时 + 核对）')
+    parser.add_argument('--kind', choices=['itschool', 'dxai', 'both'], default='both')
+    parser.add_argument('--rows', type=int, default=100000, help='每种数据的总行数')
+    parser.add_argument('--files', type=int, default=4, help='文件数（行数平均分配）')
+    parser.add_argument('--rate', type=float, default=0.01, help='每条规则的注入比例')
+    parser.add_argument('--rates', default=None, help='逐条覆盖注入比例，如 "cond2=0.05,holiday=0"')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--start-date', default='2025/1/6', help='时间线起始日期')
+    parser.add_argument('--stats-json', default=None, help='导出统计 JSON 的路径前缀（按数据种类加后缀）')
+    parser.add_argument('--workdir', default=None, help='生成文件的目录（缺省用临时目录并在结束后删除）')
+    args = parser.parse_args()
+
+    if args.files < 1 or args.rows < args.files:
+        raise RuntimeError('--rows 须不小于 --files，且 --files ≥ 1')
+
+    keep = args.workdir is not None
+    if not keep:
+        args.workdir = tempfile.mkdtemp(prefix='bench_checkers_')
+    start_day = datetime.strptime(args.start_date, "%Y/%m/%d").date()
+    rng = random.Random(args.seed)
+
+    kinds = ['itschool', 'dxai'] if args.kind == 'both' else [args.kind]
+    try:
+        ok = all([bench_kind(kind, args, rng, start_day) for kind in kinds])
+    finally:
+        if not keep:
+            shutil.rmtree(args.workdir, ignore_errors=True)
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
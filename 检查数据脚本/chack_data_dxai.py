@@ -1,21 +1,34 @@
-import pandas as pd
-from datetime import datetime, timedelta
-import holidays
+from datetime import datetime
+from functools import lru_cache
 import os
 import glob
-import math
+import argparse
+
+import check_stats
+import check_xlsx
+from check_data import evaluate_time_rules, value_parsing
+
+# pandas 到读取 CSV 时才加载（同 check_data.require_pandas），trip7ai check-dxai --help 不必等待
+pd = None
+
+
+def require_pandas():
+    global pd
+    if pd is None:
+        import pandas
+        pd = pandas
+
 
 # ========= 可配置：CSV 文件夹路径 =========
 folder_path = r"C:\Users\user\Desktop\modify-data\csv\dxai"
 # ======================================
 
 # ---- 通用：时间解析（自动兼容 yyyy/m/d h:mm、是否带秒、斜杠/横杠） ----
-def parse_dt(s):
-    """返回 python datetime 或 None"""
-    if pd.isna(s):
-        return None
+@lru_cache(maxsize=value_parsing.DATETIME_CACHE_SIZE)
+def _parse_dt_pandas(s):
+    """其他写法（ISO 的 T、只有日期等）交给 pandas"""
     try:
-        ts = pd.to_datetime(str(s).strip(), errors='coerce')
+        ts = pd.to_datetime(s, errors='coerce')
     except Exception:
         return None
     if pd.isna(ts):
@@ -23,156 +36,155 @@ def parse_dt(s):
     return ts.to_pydatetime()
 
 
+def parse_dt(s):
+    """返回 python datetime 或 None"""
+    if pd.isna(s):
+        return None
+    dt = value_parsing.parse_datetime(s)
+    if dt is not None:
+        return dt
+    s = str(s).strip()
+    return _parse_dt_pandas(s) if s else None
+
+
+def is_valid_dt(x):
+    """有效的 datetime（排除 None / NaT）"""
+    return isinstance(x, datetime) and not pd.isna(x)
+
+
 def parse_d(s):
     """返回 date 或 None"""
     dt = parse_dt(s)
     return dt.date() if isinstance(dt, datetime) else None
 
-# 標準視聴時間 "HH:MM:SS" 或 "MM:SS" -> 分钟（float）
-def time_to_minutes(time_str):
-    if pd.isna(time_str):
-        return None
-    parts = str(time_str).strip().split(':')
-    try:
-        if len(parts) == 3:
-            h, m, s = map(int, parts)
-        elif len(parts) == 2:
-            h, (m, s) = 0, map(int, parts)  # 25:44 -> 0:25:44
-        else:
-            return None
-        return h * 60 + m + s / 60.0
-    except Exception:
-        return None
+# 標準視聴時間 "HH:MM:SS" 或 "MM:SS"（25:44 -> 0:25:44）-> 分钟（float）
+time_to_minutes = value_parsing.duration_minutes
 
-# 工作时段校验：落在 [09:00,12:00) ∪ [13:00,18:00)
-def is_valid_time_window(start_dt, end_dt):
-    def in_window(t):
-        return (9 <= t.hour < 12) or (13 <= t.hour < 18)
-    return in_window(start_dt) and in_window(end_dt)
-
-# 工作日（非周末、非日本节假日）——安全版
-def is_weekday_jp(date_obj):
-    # 屏蔽 None / NaN
-    if date_obj is None:
-        return False
-    if isinstance(date_obj, float) and math.isnan(date_obj):
-        return False
-    # 允许传 datetime
-    if isinstance(date_obj, datetime):
-        date_obj = date_obj.date()
-    # 不是 date 就返回 False
-    if not hasattr(date_obj, "year"):
-        return False
-    try:
-        y = int(date_obj.year)  # 若为 NaN 会抛异常
-    except Exception:
-        return False
-    jp_holidays = holidays.Japan(years=y)
-    return (date_obj.weekday() < 5) and (date_obj not in jp_holidays)
-
-# 读取文件夹内所有 CSV
-csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
-# 新增：输出检查文件清单
-print(f"一共检查的文件有：{len(csv_files)} 个")
-for fp in csv_files:
-    print(f"- {os.path.basename(fp)}")
-problematic_files = []
-
-for file_path in csv_files:
+# 时间规则检查所需的列（依截图采用開始時間 / 完了時間 / 標準視聴時間）
+REQUIRED_COLS = ['開始時間', '完了時間', '標準視聴時間']
+
+# 读取 CSV（优先 utf-8-sig，失败兜底默认编码）
+def read_csv_file(file_path):
+    require_pandas()
     try:
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
+        return pd.read_csv(file_path, encoding='utf-8-sig')
     except UnicodeDecodeError:
-        df = pd.read_csv(file_path)
-
-    # 列名检查：依截图采用開始時間 / 完了時間 / 標準視聴時間
-    required_cols = ['開始時間', '完了時間', '標準視聴時間']
-    missing = [c for c in required_cols if c not in df.columns]
-    if missing:
-        print(f"文件 {os.path.basename(file_path)} 缺少必要列：{', '.join(missing)}，已跳过。")
-        continue
-
-    # 计算标准观看分钟
-    df['標準視聴時間_分'] = df['標準視聴時間'].apply(time_to_minutes)
-
-    # 生成可排序的起始时间列与原索引
-    df['_start_dt'] = df['開始時間'].apply(parse_dt)
-    df['_end_dt']   = df['完了時間'].apply(parse_dt)
-    df['_date_only'] = df['_start_dt'].apply(lambda x: x.date() if isinstance(x, datetime) else None)
-    df['_orig_idx'] = df.index
-
-    # 排序：先按日期再按开始时间（稳定排序）
-    work = df.sort_values(by=['_date_only', '_start_dt'], kind='mergesort').reset_index(drop=True)
-
-    issues = set()
-
-    for i, row in work.iterrows():
-        orig_idx = int(row['_orig_idx'])
-        start_dt = row['_start_dt']
-        end_dt   = row['_end_dt']
-        std_minutes = row['標準視聴時間_分']
-
-        # 基础有效性：必须是有效 datetime
-        if (not isinstance(start_dt, datetime)) or (not isinstance(end_dt, datetime)):
-            issues.add((orig_idx, "条件 1 失败：时间格式无效（开始/结束）"))
+        return pd.read_csv(file_path)
+
+# 检查单个文件，结果写回源文件
+def check_file(file_path, stats=None, xlsx_path=None):
+    """
+    stats：check_stats.new_stats() 的返回值，记录各阶段/各规则的耗时与计数（None 表示不统计）
+    xlsx_path：另外输出标红的 .xlsx（None 表示不输出）
+    返回：{'file', 'missing_cols', 'issues'}，issues 为 {(行号, 描述), ...}
+    """
+    result = {'file': os.path.basename(file_path), 'missing_cols': [], 'issues': set()}
+    rec = check_stats.file_stats(stats, result['file'])
+
+    with check_stats.timed(rec, 'read'):
+        df = read_csv_file(file_path)
+    check_stats.add_rows(rec, len(df))
+
+    # 列名检查
+    result['missing_cols'] = [c for c in REQUIRED_COLS if c not in df.columns]
+    if result['missing_cols']:
+        return result
+
+    with check_stats.timed(rec, 'parse'):
+        # 计算标准观看分钟
+        df['標準視聴時間_分'] = value_parsing.duration_column(df['標準視聴時間'])
+
+        # 生成可排序的起始时间列与原索引
+        df['_start_dt'] = value_parsing.map_unique(df['開始時間'], parse_dt)
+        df['_end_dt']   = value_parsing.map_unique(df['完了時間'], parse_dt)
+        df['_date_only'] = df['_start_dt'].apply(lambda x: x.date() if is_valid_dt(x) else None)
+        df['_orig_idx'] = df.index
+
+    with check_stats.timed(rec, 'sort'):
+        # 排序：先按日期再按开始时间（稳定排序）
+        work = df.sort_values(by=['_date_only', '_start_dt'], kind='mergesort').reset_index(drop=True)
+
+    # 条件 0-3 与 check_data 使用同一套规则函数
+    with check_stats.timed(rec, 'rules'):
+        issues, _prev = evaluate_time_rules(
+            work['_orig_idx'].tolist(), work['_start_dt'].tolist(), work['_end_dt'].tolist(),
+            work['標準視聴時間_分'].tolist(), rec=rec)
+        result['issues'] = issues
+
+    with check_stats.timed(rec, 'write'):
+        # 写高亮并保存（CSV 不支持真正背景色，这里仅做标记列）
+        df['Highlight'] = ''
+        for idx, _reason in issues:
+            df.at[idx, 'Highlight'] = 'background-color: red'
+
+        # 清理工作列
+        for col in ['_start_dt', '_end_dt', '_date_only', '_orig_idx']:
+            if col in df.columns:
+                df.drop(columns=[col], inplace=True)
+
+        # 保存回源文件
+        df.to_csv(file_path, index=False, encoding='utf-8-sig')
+
+    if xlsx_path:
+        with check_stats.timed(rec, 'xlsx'):
+            check_xlsx.write_xlsx(xlsx_path, df, issues)
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='dxai 视听记录数据检查')
+    parser.add_argument('--folder', default=folder_path, help='CSV 文件夹路径')
+    parser.add_argument('--quiet', action='store_true', help='不逐行打印问题，只打印每个文件的件数')
+    parser.add_argument('--stats', action='store_true', help='结束时打印各阶段/各规则的耗时与计数')
+    parser.add_argument('--stats-json', default=None, help='将耗时与计数导出为 JSON 文件')
+    parser.add_argument('--xlsx', action='store_true', help='另外输出问题行标红的 .xlsx（与 CSV 同名）')
+    parser.add_argument('--xlsx-dir', default=None, help='.xlsx 输出目录（缺省为 CSV 所在目录；指定即开启 --xlsx）')
+    args = parser.parse_args(argv)
+    if args.xlsx or args.xlsx_dir:
+        check_xlsx.require_openpyxl()
+
+    stats = check_stats.new_stats() if (args.stats or args.stats_json) else None
+
+    # 读取文件夹内所有 CSV
+    csv_files = glob.glob(os.path.join(args.folder, "*.csv"))
+    # 新增：输出检查文件清单
+    print(f"一共检查的文件有：{len(csv_files)} 个")
+    for fp in csv_files:
+        print(f"- {os.path.basename(fp)}")
+    problematic_files = []
+
+    for file_path in csv_files:
+        xlsx_path = check_xlsx.xlsx_path_for(file_path, args.xlsx_dir) if (args.xlsx or args.xlsx_dir) else None
+        result = check_file(file_path, stats, xlsx_path)
+        if result['missing_cols']:
+            print(f"文件 {result['file']} 缺少必要列：{', '.join(result['missing_cols'])}，已跳过。")
             continue
 
-        # 条件 0：结束早于开始 或 跨日/跨月（通常视为异常）
-        if (end_dt < start_dt) or (end_dt.date() != start_dt.date()):
-            issues.add((orig_idx, "条件 0 失败：结束时间早于开始或跨日/跨月"))
-
-        # 標準視聴時間 转 timedelta
-        if pd.isna(std_minutes):
-            issues.add((orig_idx, "无效的标准观看时间：NaN 或无效格式"))
-            duration = None
-        else:
-            try:
-                duration = timedelta(minutes=float(std_minutes))
-            except Exception:
-                duration = None
-                issues.add((orig_idx, "无效的标准观看时间：无法转为分钟"))
-
-        # 条件 1：结束 >= 开始 + 标准观看时间
-        if duration is not None:
-            if end_dt < start_dt + duration:
-                issues.add((orig_idx, "条件 1 失败：结束时间早于“开始+标准观看时间”"))
-
-        # 条件 2：同一天时，下一条开始 > 上一条结束
-        if i > 0:
-            prev_row = work.iloc[i - 1]
-            prev_end = prev_row['_end_dt']
-            prev_start = prev_row['_start_dt']
-            if isinstance(prev_start, datetime) and isinstance(prev_end, datetime):
-                if start_dt.date() == prev_start.date() and start_dt < prev_end:
-                    issues.add((orig_idx, "条件 2 失败：开始时间未晚于前一视频结束时间（同日）"))
-
-        # 条件 3：工作时段 + 工作日
-        if not is_valid_time_window(start_dt, end_dt):
-            issues.add((orig_idx, "条件 3 失败：时间超出有效工作时段（含12:00-13:00排除）"))
-        if not is_weekday_jp(start_dt.date()):
-            issues.add((orig_idx, "条件 3 失败：周末或日本节假日"))
-
-    # 有问题则记录文件名
-    if issues:
-        problematic_files.append(os.path.basename(file_path))
-
-    # 写高亮并保存（CSV 不支持真正背景色，这里仅做标记列）
-    df['Highlight'] = ''
-    for idx, reason in issues:
-        df.at[idx, 'Highlight'] = 'background-color: red'
-        print(f"文件 {os.path.basename(file_path)} 的第 {idx + 1} 行存在问题：{reason}")
-
-    # 清理工作列
-    for col in ['_start_dt', '_end_dt', '_date_only', '_orig_idx']:
-        if col in df.columns:
-            df.drop(columns=[col], inplace=True)
-
-    # 保存回源文件
-    df.to_csv(file_path, index=False, encoding='utf-8-sig')
-
-# 汇总输出
-if problematic_files:
-    print("\n以下文件存在问题：")
-    for f in problematic_files:
-        print(f"- {f}")
-else:
-    print("所有文件均无问题。")
+        # 有问题则记录文件名
+        if result['issues']:
+            problematic_files.append(result['file'])
+            # 整个文件的问题一次写出；quiet 时只打印件数
+            if args.quiet:
+                print(f"文件 {result['file']} 存在问题 {len(result['issues'])} 条")
+            else:
+                print("\n".join(f"文件 {result['file']} 的第 {idx + 1} 行存在问题：{reason}"
+                                for idx, reason in sorted(result['issues'])))
+
+    # 汇总输出
+    if problematic_files:
+        print("\n以下文件存在问题：")
+        for f in problematic_files:
+            print(f"- {f}")
+    else:
+        print("所有文件均无问题。")
+
+    if stats is not None:
+        check_stats.finish(stats)
+        if args.stats:
+            check_stats.print_summary(stats)
+        if args.stats_json:
+            check_stats.write_json(stats, args.stats_json)
+            print(f"\n统计已导出：{args.stats_json}")
+
+
+if __name__ == "__main__":
+    main()
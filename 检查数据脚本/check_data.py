@@ -1,22 +1,47 @@
-import pandas as pd
 from datetime import datetime, timedelta
-import holidays
 import os
 import glob
 import sys
 import codecs
 import re
+import time
+import argparse
+import heapq
+import unicodedata
 from collections import defaultdict
+from functools import lru_cache
 
-# Windows控制台UTF-8编码支持
-if sys.platform == 'win32':
-    sys.stdout = codecs.getwriter("utf-8")(sys.stdout.detach())
+import check_stats
+import check_xlsx
+
+# 时间 / 时长解析与排程脚本共用 value_parsing（在同级的 修改数据脚本 目录）
+try:
+    import value_parsing
+except ImportError:
+    sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "修改数据脚本"))
+    import value_parsing
+
+# pandas 导入较慢（约 0.5 s），读取 CSV、评估规则时才加载，trip7ai check --help 不必等待
+pd = None
+
+
+def require_pandas():
+    global pd
+    if pd is None:
+        import pandas
+        pd = pandas
 
 # ========= 可配置：CSV 文件夹路径 =========
 base_dir = os.path.dirname(os.path.abspath(__file__))
 folder_path = os.path.join(base_dir, "csv", "itschool")
 # ======================================
 
+# ========= 可配置：流式模式分块行数 =========
+# 多 GB 的合并导出使用 --stream 分块读取，内存占用只与分块大小有关
+# 注意：流式模式要求输入已按开始时间排序（条件 2 只与前一行比较）
+stream_chunk_size = 50000
+# ======================================
+
 # ========= 可配置：课程数据量要求 =========
 # 格式：{"课程名": 要求的数据条数}
 course_requirements = {
@@ -35,40 +60,12 @@ course_requirements = {
 }
 # ======================================
 
-# ---- 通用：时间解析（兼容横杠/斜杠，带/不带秒） ----
-def parse_dt(s):
-    if pd.isna(s):
-        return None
-    s = str(s).strip()
-    fmts = ('%Y-%m-%d %H:%M', '%Y/%m/%d %H:%M',
-            '%Y-%m-%d %H:%M:%S', '%Y/%m/%d %H:%M:%S')
-    for fmt in fmts:
-        try:
-            return datetime.strptime(s, fmt)
-        except ValueError:
-            continue
-    return None
+# ---- 通用：时间解析（兼容横杠/斜杠，带/不带秒；带缓存，整列版本见 value_parsing） ----
+parse_dt = value_parsing.parse_datetime
+parse_d = value_parsing.parse_date
 
-def parse_d(s):
-    if pd.isna(s):
-        return None
-    s = str(s).strip()
-    for fmt in ('%Y-%m-%d', '%Y/%m/%d'):
-        try:
-            return datetime.strptime(s, fmt).date()
-        except ValueError:
-            continue
-    return None
-
-# 標準視聴時間 "HH:MM:SS" -> 分钟（float）
-def time_to_minutes(time_str):
-    if pd.isna(time_str):
-        return None
-    try:
-        h, m, s = map(int, str(time_str).split(':'))
-        return h * 60 + m + s / 60.0
-    except Exception:
-        return None
+# 標準視聴時間 "HH:MM:SS" -> 分钟（float）；只有两段的 "MM:SS" 报告为无效（DXAI 的检查才接受）
+time_to_minutes = value_parsing.hms_minutes
 
 # 工作时段校验：落在 [09:00,12:00) ∪ [13:00,18:00)
 def is_valid_time_window(start_dt, end_dt):
@@ -76,46 +73,70 @@ def is_valid_time_window(start_dt, end_dt):
         return (9 <= t.hour < 12) or (13 <= t.hour < 18)
     return in_window(start_dt) and in_window(end_dt)
 
+# 日本节假日表：每年只构建一次（常驻服务中一直保持）
+@lru_cache(maxsize=None)
+def japan_holidays(year):
+    import holidays  # 导入较慢，第一次判定工作日时才加载
+    return frozenset(holidays.Japan(years=year).keys())
+
 # 工作日（非周末、非日本节假日）
 def is_weekday_jp(date_obj):
     if date_obj is None:
         return False
     try:
+        if isinstance(date_obj, datetime):
+            date_obj = date_obj.date()
         # 确保 year 是有效的整数
         year = int(date_obj.year)
-        jp_holidays = holidays.Japan(years=year)
-        return (date_obj.weekday() < 5) and (date_obj not in jp_holidays)
+        return (date_obj.weekday() < 5) and (date_obj not in japan_holidays(year))
     except (ValueError, TypeError, AttributeError):
         # 处理 NaN 或其他无效值
         return False
 
-# 从文件名或CSV内容中提取课程名
-def extract_course_name(file_path, df):
+# 可能包含课程名的列
+COURSE_COLUMNS = ['コース名', 'course', 'Course', '课程名', '課程名']
+
+# 按文件名与课程列的首个非空值匹配配置中的课程名
+def match_course_name(file_path, first_values):
     """
-    尝试从文件名或CSV内容中提取课程名
-    优先级：1. 文件名匹配 2. CSV中的课程列
+    first_values：{列名: 该列首个非空值}，只包含 CSV 中存在的课程列
     """
     filename = os.path.basename(file_path)
-    
+
     # 方法1：从文件名中匹配课程名
     for course in course_requirements.keys():
         if course in filename:
             return course
-    
-    # 方法2：检查CSV中是否有课程相关的列
-    course_columns = ['コース名', 'course', 'Course', '课程名', '課程名']
-    for col in course_columns:
-        if col in df.columns:
+
+    # 方法2：按列优先级检查课程列的首个非空值
+    for col in COURSE_COLUMNS:
+        if first_values.get(col) is None:
+            continue
+        course_name = str(first_values[col])
+        # 检查是否匹配配置中的课程
+        for req_course in course_requirements.keys():
+            if req_course in course_name or course_name in req_course:
+                return req_course
+
+    return None
+
+# 记录课程列的首个非空值（流式模式逐块调用，已找到的列不再更新）
+def collect_course_values(df, first_values):
+    for col in COURSE_COLUMNS:
+        if col in df.columns and first_values.get(col) is None:
             # 取第一个非空值作为课程名
-            course_values = df[col].dropna().unique()
+            course_values = df[col].dropna()
             if len(course_values) > 0:
-                course_name = str(course_values[0])
-                # 检查是否匹配配置中的课程
-                for req_course in course_requirements.keys():
-                    if req_course in course_name or course_name in req_course:
-                        return req_course
-    
-    return None
+                first_values[col] = course_values.iloc[0]
+    return first_values
+
+# 从文件名或CSV内容中提取课程名
+def extract_course_name(file_path, df):
+    """
+    尝试从文件名或CSV内容中提取课程名
+    优先级：1. 文件名匹配 2. CSV中的课程列
+    """
+    return match_course_name(file_path, collect_course_values(df, {}))
 
 # 检查数据量是否足够
 def check_data_count(file_path, df):
@@ -124,12 +145,14 @@ def check_data_count(file_path, df):
     返回：(是否满足, 课程名, 实际数量, 要求数量, 缺少数量)
     """
     course_name = extract_course_name(file_path, df)
-    
+    return evaluate_data_count(course_name, len(df))
+
+# 按课程名与实际行数判断数据量（流式模式在读完全部分块后调用）
+def evaluate_data_count(course_name, actual_count):
     if course_name is None:
-        return True, None, len(df), 0, 0  # 未匹配到课程，不检查
+        return True, None, actual_count, 0, 0  # 未匹配到课程，不检查
     
     required_count = course_requirements.get(course_name, 0)
-    actual_count = len(df)
     
     if actual_count < required_count:
         missing_count = required_count - actual_count
@@ -194,6 +217,47 @@ def extract_lesson_base_and_number(lesson_str):
     
     return None, None
 
+# 模块顺序：逐行推进（state 跨分块保留上一个章节号）
+def step_module_order(idx, module_value, state, issues):
+    chapter_num = extract_chapter_number(module_value)
+    if chapter_num is None:
+        return
+    
+    prev_chapter = state.get('prev_chapter', 0)
+    if chapter_num > prev_chapter + 1:
+        # 跳章了
+        issues.append((idx, f"モジュール順序エラー：第{prev_chapter}章の後に第{chapter_num}章が出現（{module_value}）"))
+    elif chapter_num < prev_chapter:
+        # 章节倒退了
+        issues.append((idx, f"モジュール順序エラー：第{chapter_num}章が第{prev_chapter}章の後に出現（{module_value}）"))
+    
+    if chapter_num > prev_chapter:
+        state['prev_chapter'] = chapter_num
+
+# 课程顺序：逐行推进（state 记录每个系列上一条的序号）
+def step_lesson_order(idx, module_value, lesson_value, has_module, state, issues):
+    """
+    有模块列时按 (模块, 基础名称) 区分系列，模块为空的行不参与检查；
+    没有模块列时只按基础名称区分
+    """
+    if has_module and pd.isna(module_value):
+        return
+    
+    base_name, lesson_num = extract_lesson_base_and_number(lesson_value)
+    if base_name is None or lesson_num is None:
+        return
+    
+    key = (module_value, base_name) if has_module else base_name
+    prev_num = state.get(key)
+    if prev_num is not None:
+        if lesson_num <= prev_num:
+            issues.append((idx, f"レッスン順序エラー：{base_name}シリーズで（{lesson_num}）が（{prev_num}）の後に出現（{lesson_value}）"))
+        elif lesson_num > prev_num + 1:
+            # 可选：检查是否跳号（如果需要严格连续的话）
+            # issues.append((idx, f"レッスン順序警告：{base_name}シリーズで（{prev_num}）の後に（{lesson_num}）が出現、連続していない（{lesson_value}）"))
+            pass
+    state[key] = lesson_num
+
 # 检查模块顺序
 def check_module_order(df):
     """
@@ -205,29 +269,9 @@ def check_module_order(df):
     if 'モジュール' not in df.columns:
         return issues
     
-    # 提取章节号并记录原始行号
-    chapter_data = []
-    for idx, row in df.iterrows():
-        chapter_num = extract_chapter_number(row['モジュール'])
-        if chapter_num is not None:
-            chapter_data.append((idx, chapter_num, row['モジュール']))
-    
-    if not chapter_data:
-        return issues
-    
-    # 检查章节顺序
-    prev_chapter = 0
-    
-    for idx, chapter_num, module_name in chapter_data:
-        if chapter_num > prev_chapter + 1:
-            # 跳章了
-            issues.append((idx, f"モジュール順序エラー：第{prev_chapter}章の後に第{chapter_num}章が出現（{module_name}）"))
-        elif chapter_num < prev_chapter:
-            # 章节倒退了
-            issues.append((idx, f"モジュール順序エラー：第{chapter_num}章が第{prev_chapter}章の後に出現（{module_name}）"))
-        
-        if chapter_num > prev_chapter:
-            prev_chapter = chapter_num
+    state = {}
+    for idx, module_value in df['モジュール'].items():
+        step_module_order(idx, module_value, state, issues)
     
     return issues
 
@@ -235,7 +279,7 @@ def check_module_order(df):
 def check_lesson_order(df):
     """
     检查同一系列课程中序号的顺序是否正确
-    只检查同一基础名称的课程序号顺序
+    只检查同一基础名称的课程序号顺序（按CSV中的出现顺序）
     返回：问题列表 [(行号, 问题描述), ...]
     """
     issues = []
@@ -243,216 +287,626 @@ def check_lesson_order(df):
     if 'レッスン' not in df.columns:
         return issues
     
-    # 按模块分组检查课程顺序
-    if 'モジュール' in df.columns:
-        for module_name, group in df.groupby('モジュール'):
-            # 收集同一模块内的课程信息
-            lesson_series = defaultdict(list)  # {基础名称: [(行号, 序号, 完整名称), ...]}
-            
-            for idx, row in group.iterrows():
-                base_name, lesson_num = extract_lesson_base_and_number(row['レッスン'])
-                if base_name is not None and lesson_num is not None:
-                    lesson_series[base_name].append((idx, lesson_num, row['レッスン']))
-            
-            # 检查每个系列的顺序
-            for base_name, lessons in lesson_series.items():
-                if len(lessons) <= 1:
-                    continue
-                
-                # 按原始行号排序（保持在CSV中的出现顺序）
-                lessons.sort(key=lambda x: x[0])
-                
-                # 检查序号是否递增
-                for i in range(1, len(lessons)):
-                    prev_idx, prev_num, prev_name = lessons[i-1]
-                    curr_idx, curr_num, curr_name = lessons[i]
-                    
-                    if curr_num <= prev_num:
-                        issues.append((curr_idx, f"レッスン順序エラー：{base_name}シリーズで（{curr_num}）が（{prev_num}）の後に出現（{curr_name}）"))
-                    elif curr_num > prev_num + 1:
-                        # 可选：检查是否跳号（如果需要严格连续的话）
-                        # issues.append((curr_idx, f"レッスン順序警告：{base_name}シリーズで（{prev_num}）の後に（{curr_num}）が出現、連続していない（{curr_name}）"))
-                        pass
-    else:
-        # 没有模块列，直接检查整个文件的课程顺序
-        lesson_series = defaultdict(list)
-        
-        for idx, row in df.iterrows():
-            base_name, lesson_num = extract_lesson_base_and_number(row['レッスン'])
-            if base_name is not None and lesson_num is not None:
-                lesson_series[base_name].append((idx, lesson_num, row['レッスン']))
-        
-        # 检查每个系列的顺序
-        for base_name, lessons in lesson_series.items():
-            if len(lessons) <= 1:
-                continue
-            
-            lessons.sort(key=lambda x: x[0])
-            
-            for i in range(1, len(lessons)):
-                prev_idx, prev_num, prev_name = lessons[i-1]
-                curr_idx, curr_num, curr_name = lessons[i]
-                
-                if curr_num <= prev_num:
-                    issues.append((curr_idx, f"レッスン順序エラー：{base_name}シリーズで（{curr_num}）が（{prev_num}）の後に出現（{curr_name}）"))
+    has_module = 'モジュール' in df.columns
+    modules = df['モジュール'] if has_module else pd.Series(None, index=df.index)
+    state = {}
+    for idx, module_value, lesson_value in zip(df.index, modules, df['レッスン']):
+        step_lesson_order(idx, module_value, lesson_value, has_module, state, issues)
     
     return issues
 
-# 读取文件夹内所有 CSV
-csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
+# 时间规则检查所需的列
+REQUIRED_TIME_COLS = ['視聴開始時間', '視聴完了時間', '標準視聴時間']
+
+# 有效的 datetime（排除 None / NaT）
+def is_valid_dt(x):
+    return x is not None and not pd.isna(x)
 
-problematic_files = []
-insufficient_data_files = []  # 数据量不足的文件
-order_issue_files = []  # 顺序问题的文件
+# ---- 时间规则（条件 0-3）：每条规则一个判定函数，返回问题描述或 None ----
+# 参数统一为 (开始, 结束, 标准分钟, 前一行开始, 前一行结束)，开始/结束已保证有效
 
-for file_path in csv_files:
+REASON_FORMAT = "条件 1 失败：时间格式无效（开始/结束）"
+
+# 条件 0：结束早于开始 或 跨日/跨月（通常视为异常）
+def rule_cond0(start_dt, end_dt, std_minutes, prev_start, prev_end):
+    if (end_dt < start_dt) or (end_dt.date() != start_dt.date()):
+        return "条件 0 失败：结束时间早于开始或跨日/跨月"
+    return None
+
+# 標準視聴時間 转 timedelta（无效返回 None）
+def std_duration(std_minutes):
+    if std_minutes is None or pd.isna(std_minutes):
+        return None
     try:
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
+        return timedelta(minutes=float(std_minutes))
+    except Exception:
+        return None
+
+# 标准观看时间本身无效
+def rule_std(start_dt, end_dt, std_minutes, prev_start, prev_end):
+    if std_minutes is None or pd.isna(std_minutes):
+        return "无效的标准观看时间：NaN 或无效格式"
+    if std_duration(std_minutes) is None:
+        return "无效的标准观看时间：无法转为分钟"
+    return None
+
+# 条件 1：结束 >= 开始 + 标准观看时间（用 datetime 比较，保留日期；没有标准时长时不判定）
+def rule_cond1(start_dt, end_dt, std_minutes, prev_start, prev_end):
+    duration = std_duration(std_minutes)
+    if duration is not None and end_dt < start_dt + duration:
+        return "条件 1 失败：结束时间早于“开始+标准观看时间”"
+    return None
+
+# 条件 2：同一天时，下一条开始 > 上一条结束
+def rule_cond2(start_dt, end_dt, std_minutes, prev_start, prev_end):
+    if is_valid_dt(prev_start) and is_valid_dt(prev_end):
+        if start_dt.date() == prev_start.date() and start_dt < prev_end:
+            return "条件 2 失败：开始时间未晚于前一视频结束时间（同日）"
+    return None
+
+# 条件 3：工作时段
+def rule_window(start_dt, end_dt, std_minutes, prev_start, prev_end):
+    if not is_valid_time_window(start_dt, end_dt):
+        return "条件 3 失败：时间超出有效工作时段（含12:00-13:00排除）"
+    return None
+
+# 条件 3：工作日
+def rule_holiday(start_dt, end_dt, std_minutes, prev_start, prev_end):
+    if not is_weekday_jp(start_dt.date()):
+        return "条件 3 失败：周末或日本节假日"
+    return None
+
+# 规则表（名称用于统计与基准测试）
+TIME_RULES = [
+    ('cond0', rule_cond0),
+    ('std', rule_std),
+    ('cond1', rule_cond1),
+    ('cond2', rule_cond2),
+    ('window', rule_window),
+    ('holiday', rule_holiday),
+]
+
+# 单行时间规则（条件 0-3）
+def check_time_row(start_dt, end_dt, std_minutes, prev_start, prev_end):
+    """
+    prev_start / prev_end：排序后前一行的开始/结束时间（第一行传 None）
+    返回：问题描述列表
+    """
+    # 基础有效性
+    if not is_valid_dt(start_dt) or not is_valid_dt(end_dt):
+        return [REASON_FORMAT]
+    reasons = []
+    for _name, rule in TIME_RULES:
+        reason = rule(start_dt, end_dt, std_minutes, prev_start, prev_end)
+        if reason is not None:
+            reasons.append(reason)
+    return reasons
+
+# 按规则逐列评估一批已排序的行（in-memory 整表、流式逐块共用）
+def evaluate_time_rules(idx_list, starts, ends, std_list, prev=(None, None), rec=None):
+    """
+    结果与逐行调用 check_time_row 相同；按规则分别循环，便于按规则计时计数。
+    “前一行”取之前最后一个开始时间有效的行（排序后开始时间无效的行都在末尾），
+    prev 为上一块传下来的 (开始, 结束)。
+    rec：check_stats.file_stats 的返回值（None 表示不统计）
+    返回：(问题集合 {(行号, 描述)}, 新的 prev)
+    """
+    require_pandas()
+    issues = set()
+    n = len(idx_list)
+
+    t0 = time.perf_counter()
+    prev_starts = [None] * n
+    prev_ends = [None] * n
+    valid = []
+    prev_start, prev_end = prev
+    for k in range(n):
+        prev_starts[k] = prev_start
+        prev_ends[k] = prev_end
+        start_dt = starts[k]
+        if is_valid_dt(start_dt):
+            if is_valid_dt(ends[k]):
+                valid.append(k)
+            prev_start, prev_end = start_dt, ends[k]
+    invalid = n - len(valid)
+    if invalid:
+        valid_set = set(valid)
+        for k in range(n):
+            if k not in valid_set:
+                issues.add((int(idx_list[k]), REASON_FORMAT))
+    check_stats.record_rule(rec, 'format', n, invalid, time.perf_counter() - t0)
+
+    for name, rule in TIME_RULES:
+        t0 = time.perf_counter()
+        violations = 0
+        for k in valid:
+            reason = rule(starts[k], ends[k], std_list[k], prev_starts[k], prev_ends[k])
+            if reason is not None:
+                issues.add((int(idx_list[k]), reason))
+                violations += 1
+        check_stats.record_rule(rec, name, len(valid), violations, time.perf_counter() - t0)
+
+    return issues, (prev_start, prev_end)
+
+# 读取 CSV（优先 utf-8-sig，失败兜底默认编码）
+def read_csv_file(file_path, **kwargs):
+    require_pandas()
+    try:
+        return pd.read_csv(file_path, encoding='utf-8-sig', **kwargs)
     except UnicodeDecodeError:
         # 兜底尝试默认编码
-        df = pd.read_csv(file_path)
+        return pd.read_csv(file_path, **kwargs)
+
+# 单个文件的检查结果（in-memory 与流式模式结构一致）
+def new_file_result(file_path):
+    return {
+        'file': os.path.basename(file_path),
+        'count': None,         # evaluate_data_count 的返回值
+        'order_issues': [],    # [(行号, 描述), ...]
+        'missing_cols': [],    # 缺失的时间列（非空时跳过时间检查）
+        'issues': set(),       # {(行号, 描述), ...}
+    }
 
-    # 检查数据量
-    is_sufficient, course_name, actual_count, required_count, missing_count = check_data_count(file_path, df)
-    if not is_sufficient:
-        insufficient_data_files.append({
-            'file': os.path.basename(file_path),
-            'course': course_name,
-            'actual': actual_count,
-            'required': required_count,
-            'missing': missing_count
-        })
-        print(f"データ量不足：ファイル {os.path.basename(file_path)} (コース: {course_name}) 実際データ {actual_count} 件、要求 {required_count} 件、不足 {missing_count} 件")
-
-    # 检查顺序
+# 顺序检查与数据量检查（按规则计时计数）
+def check_order_and_count(file_path, df, result, rec):
+    t0 = time.perf_counter()
+    result['count'] = check_data_count(file_path, df)
+    check_stats.record_rule(rec, 'count', 1, 0 if result['count'][0] else 1, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
     module_issues = check_module_order(df)
+    check_stats.record_rule(rec, 'module', len(df), len(module_issues), time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
     lesson_issues = check_lesson_order(df)
-    
-    order_issues = module_issues + lesson_issues
-    if order_issues:
-        order_issue_files.append(os.path.basename(file_path))
-        print(f"\n=== ファイル {os.path.basename(file_path)} の順序チェック結果 ===")
-        for idx, issue_desc in order_issues:
-            print(f"順序問題：第 {idx + 1} 行 - {issue_desc}")
-    else:
-        print(f"\n=== ファイル {os.path.basename(file_path)} の順序チェック結果 ===")
-        print("順序問題なし")
+    check_stats.record_rule(rec, 'lesson', len(df), len(lesson_issues), time.perf_counter() - t0)
 
-    # 缺失必须列时跳过时间相关检查
-    required_cols = ['視聴開始時間', '視聴完了時間', '標準視聴時間']
-    missing_cols = [col for col in required_cols if col not in df.columns]
-    if missing_cols:
-        print(f"ファイル {os.path.basename(file_path)} 必要列不足：{', '.join(missing_cols)}、データ品質チェックをスキップ。")
-        continue
+    result['order_issues'] = module_issues + lesson_issues
 
-    # 计算标准观看分钟
-    df['標準視聴時間_分'] = df['標準視聴時間'].apply(time_to_minutes)
+# 检查单个文件（整表读入内存，结果写回源文件）
+def check_file(file_path, stats=None, xlsx_path=None):
+    """
+    stats：check_stats.new_stats() 的返回值，记录各阶段/各规则的耗时与计数（None 表示不统计）
+    xlsx_path：另外输出标红的 .xlsx（None 表示不输出）
+    """
+    result = new_file_result(file_path)
+    rec = check_stats.file_stats(stats, result['file'])
 
-    # 生成可排序的起始时间列与原索引
-    df['_start_dt'] = df['視聴開始時間'].apply(parse_dt)
-    df['_end_dt'] = df['視聴完了時間'].apply(parse_dt)
-    df['_date_only'] = df['_start_dt'].apply(lambda x: x.date() if pd.notna(x) else None)
-    df['_orig_idx'] = df.index
+    with check_stats.timed(rec, 'read'):
+        df = read_csv_file(file_path)
+    check_stats.add_rows(rec, len(df))
 
-    # 为了"条件2 同一天上一条结束 < 下一条开始"正确，按开始时间排序
-    work = df.sort_values(by=['_date_only', '_start_dt'], kind='mergesort').reset_index(drop=True)
+    # 检查数据量与顺序
+    with check_stats.timed(rec, 'order'):
+        check_order_and_count(file_path, df, result, rec)
 
-    issues = set()
+    # 缺失必须列时跳过时间相关检查
+    result['missing_cols'] = [col for col in REQUIRED_TIME_COLS if col not in df.columns]
+    if result['missing_cols']:
+        return result
+
+    with check_stats.timed(rec, 'parse'):
+        # 计算标准观看分钟
+        df['標準視聴時間_分'] = value_parsing.hms_column(df['標準視聴時間'])
+
+        # 生成可排序的起始时间列与原索引
+        df['_start_dt'] = value_parsing.datetime_column(df['視聴開始時間'])
+        df['_end_dt'] = value_parsing.datetime_column(df['視聴完了時間'])
+        df['_date_only'] = df['_start_dt'].apply(lambda x: x.date() if pd.notna(x) else None)
+        df['_orig_idx'] = df.index
+
+    with check_stats.timed(rec, 'sort'):
+        # 为了"条件2 同一天上一条结束 < 下一条开始"正确，按开始时间排序
+        work = df.sort_values(by=['_date_only', '_start_dt'], kind='mergesort').reset_index(drop=True)
+
+    with check_stats.timed(rec, 'rules'):
+        issues, _prev = evaluate_time_rules(
+            work['_orig_idx'].tolist(), work['_start_dt'].tolist(), work['_end_dt'].tolist(),
+            work['標準視聴時間_分'].tolist(), rec=rec)
+        result['issues'] = issues
+
+    with check_stats.timed(rec, 'write'):
+        # 写高亮并保存
+        df['Highlight'] = ''
+        for idx, _reason in issues:
+            # 允许多条原因覆盖；这里仅写一个标记，控制台打印详细原因
+            df.at[idx, 'Highlight'] = 'background-color: red'
+
+        # 清理工作列
+        for col in ['_start_dt', '_end_dt', '_date_only', '_orig_idx']:
+            if col in df.columns:
+                df.drop(columns=[col], inplace=True)
+
+        # 保存回源文件
+        df.to_csv(file_path, index=False, encoding='utf-8-sig')
+
+    if xlsx_path:
+        with check_stats.timed(rec, 'xlsx'):
+            check_xlsx.write_xlsx(xlsx_path, df, issues)
+    return result
+
+# 分块读取（utf-8-sig，同 check_file；pandas 的默认编码也是 utf-8，兜底没有意义，解码失败照常报错）
+# 只有表头、没有数据行时产出一个只有列名的空块，调用方照常写出表头（含 Highlight 列）
+def iter_csv_chunks(file_path, chunksize, **kwargs):
+    require_pandas()
+    reader = pd.read_csv(file_path, encoding='utf-8-sig', chunksize=chunksize, **kwargs)
+    first = next(reader, None)
+    if first is None:
+        yield pd.read_csv(file_path, encoding='utf-8-sig', nrows=0, **kwargs)
+        return
+    yield first
+    yield from reader
+
+# 检查单个文件（流式：分块读取，逐块写入临时文件后替换源文件）
+def check_file_streaming(file_path, chunksize=None, stats=None, xlsx_path=None):
+    """
+    内存占用只与分块大小有关：跨分块只保留
+    - 前一行的开始/结束时间（条件 2）
+    - 章节号 / 课程序号的顺序状态
+    - 课程列首个非空值与累计行数（数据量检查）
+    输入已按开始时间排序时，问题输出与 check_file 一致。
+    """
+    chunksize = chunksize or stream_chunk_size
+    result = new_file_result(file_path)
+    rec = check_stats.file_stats(stats, result['file'])
+    issues = result['issues']
+    module_issues = []
+    lesson_issues = []
+    module_state = {}
+    lesson_state = {}
+    course_values = {}
+    row_count = 0
+    prev = (None, None)
+    tmp_path = None
+    out = None
+    xlsx_writer = None
+    chunks = iter_csv_chunks(file_path, chunksize)
 
-    for i, row in work.iterrows():
-        orig_idx = int(row['_orig_idx'])
-        start_dt = row['_start_dt']
-        end_dt = row['_end_dt']
-        std_minutes = row['標準視聴時間_分']
+    try:
+        while True:
+            with check_stats.timed(rec, 'read'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+
+            if out is None and row_count == 0:
+                # 第一块：确定列结构；缺少时间列时与 in-memory 模式一样不写回
+                result['missing_cols'] = [col for col in REQUIRED_TIME_COLS if col not in chunk.columns]
+                if not result['missing_cols']:
+                    tmp_path = file_path + '.tmp'
+                    out = open(tmp_path, 'w', encoding='utf-8-sig', newline='')
+                    write_header = True
+
+            row_count += len(chunk)
+            check_stats.add_rows(rec, len(chunk))
+            collect_course_values(chunk, course_values)
+
+            # 顺序检查
+            with check_stats.timed(rec, 'order'):
+                has_module = 'モジュール' in chunk.columns
+                if has_module:
+                    t0 = time.perf_counter()
+                    n_before = len(module_issues)
+                    for idx, module_value in chunk['モジュール'].items():
+                        step_module_order(idx, module_value, module_state, module_issues)
+                    check_stats.record_rule(rec, 'module', len(chunk), len(module_issues) - n_before,
+                                            time.perf_counter() - t0)
+                if 'レッスン' in chunk.columns:
+                    t0 = time.perf_counter()
+                    n_before = len(lesson_issues)
+                    modules = chunk['モジュール'] if has_module else [None] * len(chunk)
+                    for idx, module_value, lesson_value in zip(chunk.index, modules, chunk['レッスン']):
+                        step_lesson_order(idx, module_value, lesson_value, has_module, lesson_state, lesson_issues)
+                    check_stats.record_rule(rec, 'lesson', len(chunk), len(lesson_issues) - n_before,
+                                            time.perf_counter() - t0)
+
+            if out is None:
+                continue
 
-        # 基础有效性
-        if start_dt is None or end_dt is None:
-            issues.add((orig_idx, "条件 1 失败：时间格式无效（开始/结束）"))
-            continue
+            # 时间检查：只在本块内生成辅助值，不挂到整表上
+            with check_stats.timed(rec, 'parse'):
+                chunk['標準視聴時間_分'] = value_parsing.hms_column(chunk['標準視聴時間'])
+                starts = value_parsing.datetime_column(chunk['視聴開始時間'])
+                ends = value_parsing.datetime_column(chunk['視聴完了時間'])
+
+            with check_stats.timed(rec, 'rules'):
+                chunk_issues, prev = evaluate_time_rules(
+                    chunk.index.tolist(), starts, ends, chunk['標準視聴時間_分'].tolist(), prev, rec)
+                issues |= chunk_issues
+
+            with check_stats.timed(rec, 'write'):
+                flagged = {idx for idx, _reason in chunk_issues}
+                chunk['Highlight'] = ['background-color: red' if idx in flagged else '' for idx in chunk.index]
+                chunk.to_csv(out, index=False, header=write_header)
+                write_header = False
+
+            if xlsx_path:
+                with check_stats.timed(rec, 'xlsx'):
+                    if xlsx_writer is None:
+                        xlsx_writer = check_xlsx.open_writer(xlsx_path, chunk.columns)
+                    check_xlsx.write_dataframe_rows(xlsx_writer, chunk, check_xlsx.reasons_by_row(chunk_issues))
+    except BaseException:
+        if out is not None:
+            out.close()
+            os.remove(tmp_path)
+        raise
+
+    if out is not None:
+        with check_stats.timed(rec, 'write'):
+            out.close()
+            # 保存回源文件
+            os.replace(tmp_path, file_path)
+    if xlsx_writer is not None:
+        with check_stats.timed(rec, 'xlsx'):
+            check_xlsx.close_writer(xlsx_writer)
+
+    result['count'] = evaluate_data_count(match_course_name(file_path, course_values), row_count)
+    check_stats.record_rule(rec, 'count', 1, 0 if result['count'][0] else 1, 0.0)
+    result['order_issues'] = module_issues + lesson_issues
+    return result
+
+# 从文件名 "userName#course.csv" 提取用户名（不符合命名规则返回 None）
+def extract_user_name(file_path):
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    if '#' not in stem:
+        return None
+    user_name = stem.split('#', 1)[0].strip()
+    return user_name or None
 
-        # 条件 0：结束早于开始 或 跨日/跨月（通常视为异常）
-        if (end_dt < start_dt) or (end_dt.date() != start_dt.date()):
-            issues.add((orig_idx, "条件 0 失败：结束时间早于开始或跨日/跨月"))
-            # 继续做其他检查以便给出更多信号（不直接 continue）
+# 跨文件：按用户收集所有视听区间
+def load_user_intervals(csv_files, chunksize=None):
+    """
+    只读取开始/结束两列并分块解析
+    返回：{用户名: [(开始, 结束, 文件名, 行号), ...]}，只收录开始 < 结束的有效区间
+    """
+    time_cols = ('視聴開始時間', '視聴完了時間')
+    user_intervals = defaultdict(list)
+    for file_path in csv_files:
+        user_name = extract_user_name(file_path)
+        if user_name is None:
+            continue
+        file_name = os.path.basename(file_path)
+        for chunk in iter_csv_chunks(file_path, chunksize or stream_chunk_size,
+                                     usecols=lambda c: c in time_cols):
+            if any(col not in chunk.columns for col in time_cols):
+                break
+            for idx, start_raw, end_raw in zip(chunk.index, chunk['視聴開始時間'], chunk['視聴完了時間']):
+                start_dt = parse_dt(start_raw)
+                end_dt = parse_dt(end_raw)
+                if is_valid_dt(start_dt) and is_valid_dt(end_dt) and start_dt < end_dt:
+                    user_intervals[user_name].append((start_dt, end_dt, file_name, int(idx)))
+    return user_intervals
+
+# 区间扫描：找出同一用户不同文件之间时间重叠的记录对
+def find_cross_file_overlaps(intervals):
+    """
+    按开始时间排序后扫描，用最小堆维护“尚未结束”的区间，
+    复杂度 O(n log n + 重叠对数)。首尾相接（开始 == 上一条结束）不算重叠，与条件 2 一致。
+    同一文件内的重叠已由条件 2 检查，这里只报告跨文件的记录对。
+    返回：[(区间A, 区间B), ...]，A 的开始时间不晚于 B
+    """
+    intervals = sorted(intervals, key=lambda iv: (iv[0], iv[1]))
+    active = []  # 堆：(结束时间, 序号)
+    pairs = []
+    for i, current in enumerate(intervals):
+        start_dt, end_dt, file_name, _row = current
+        # 弹出已在本条开始前结束的区间
+        while active and active[0][0] <= start_dt:
+            heapq.heappop(active)
+        for _end, j in active:
+            other = intervals[j]
+            if other[2] != file_name:
+                pairs.append((other, current))
+        heapq.heappush(active, (end_dt, i))
+    return pairs
+
+# 跨文件重叠检查：返回 {用户名: 重叠记录对列表}（只含有重叠的用户）
+def check_cross_file_overlaps(csv_files, chunksize=None):
+    overlaps = {}
+    for user_name, intervals in load_user_intervals(csv_files, chunksize).items():
+        pairs = find_cross_file_overlaps(intervals)
+        if pairs:
+            overlaps[user_name] = pairs
+    return overlaps
+
+# 打印跨文件重叠检查结果
+def print_cross_file_overlaps(overlaps):
+    print("\n=== ユーザー横断の時間重複チェック結果 ===")
+    if not overlaps:
+        print("ファイル間の時間重複はありません。")
+        return
+    for user_name, pairs in overlaps.items():
+        print(f"\nユーザー {user_name}：重複 {len(pairs)} 件")
+        for a, b in pairs:
+            print(f"- {a[2]} 第 {a[3] + 1} 行（{a[0]:%Y/%m/%d %H:%M}～{a[1]:%Y/%m/%d %H:%M}）"
+                  f" と {b[2]} 第 {b[3] + 1} 行（{b[0]:%Y/%m/%d %H:%M}～{b[1]:%Y/%m/%d %H:%M}）が重複")
+
+# 重复记录：规范化后的 (用户, レッスン, 开始, 结束)
+def normalize_record_key(user_name, lesson, start_raw, end_raw):
+    """
+    时间解析成 datetime（斜杠/横杠、带不带秒视为相同），无法解析时用去空白后的原文；
+    レッスン 做 NFKC（全角/半角统一）并压缩空白
+    """
+    def norm_time(raw):
+        dt = parse_dt(raw)
+        return dt if is_valid_dt(dt) else ('' if pd.isna(raw) else str(raw).strip())
+    lesson_key = '' if lesson is None or pd.isna(lesson) else ' '.join(unicodedata.normalize('NFKC', str(lesson)).split())
+    return (user_name, lesson_key, norm_time(start_raw), norm_time(end_raw))
+
+# 跨文件扫描重复记录
+def find_duplicate_records(csv_files, chunksize=None):
+    """
+    一次遍历所有文件，以规范化键建哈希索引：
+    - first_seen：{键: (文件名, 行号)}，内存与不同键的数量成正比
+    - 键第二次出现时才建立簇，之后的出现追加到簇里
+    文件名不符合 "userName#course.csv" 时以文件名代替用户名（只能发现同一文件内的重复）
+    返回：[(键, [(文件名, 行号), ...]), ...]，按首次出现的顺序
+    """
+    key_cols = ('レッスン', '視聴開始時間', '視聴完了時間')
+    first_seen = {}
+    clusters = {}
+    for file_path in csv_files:
+        file_name = os.path.basename(file_path)
+        user_name = extract_user_name(file_path) or file_name
+        for chunk in iter_csv_chunks(file_path, chunksize or stream_chunk_size,
+                                     usecols=lambda c: c in key_cols):
+            if any(col not in chunk.columns for col in key_cols[1:]):
+                break
+            lessons = chunk['レッスン'] if 'レッスン' in chunk.columns else [None] * len(chunk)
+            for idx, lesson, start_raw, end_raw in zip(chunk.index, lessons,
+                                                       chunk['視聴開始時間'], chunk['視聴完了時間']):
+                key = normalize_record_key(user_name, lesson, start_raw, end_raw)
+                location = (file_name, int(idx))
+                first = first_seen.setdefault(key, location)
+                if first is location:
+                    continue
+                cluster = clusters.get(key)
+                if cluster is None:
+                    clusters[key] = [first, location]
+                else:
+                    cluster.append(location)
+    return list(clusters.items())
+
+# 打印重复记录检查结果
+def print_duplicate_records(duplicates):
+    print("\n=== 重複レコードチェック結果 ===")
+    if not duplicates:
+        print("重複レコードはありません。")
+        return
+    print(f"重複グループ：{len(duplicates)} 件")
+    for (user_name, lesson, start_key, end_key), locations in duplicates:
+        start_text = f"{start_key:%Y/%m/%d %H:%M:%S}" if isinstance(start_key, datetime) else start_key
+        end_text = f"{end_key:%Y/%m/%d %H:%M:%S}" if isinstance(end_key, datetime) else end_key
+        where = "、".join(f"{file_name} 第 {row + 1} 行" for file_name, row in locations)
+        print(f"- ユーザー {user_name} / {lesson or '(レッスンなし)'} / {start_text}～{end_text}："
+              f"{len(locations)} 件（{where}）")
+
+# 打印单个文件的检查结果（整块一次写出；quiet 时只打印件数，不逐行输出）
+def print_file_result(result, quiet=False):
+    file_name = result['file']
+    lines = []
+
+    is_sufficient, course_name, actual_count, required_count, missing_count = result['count']
+    if not is_sufficient:
+        lines.append(f"データ量不足：ファイル {file_name} (コース: {course_name}) 実際データ {actual_count} 件、要求 {required_count} 件、不足 {missing_count} 件")
 
-        # 標準視聴時間 转 timedelta
-        if pd.isna(std_minutes):
-            issues.add((orig_idx, "无效的标准观看时间：NaN 或无效格式"))
-            # 没有标准时长也继续其他检查
-            duration = None
+    lines.append(f"\n=== ファイル {file_name} の順序チェック結果 ===")
+    if not result['order_issues']:
+        lines.append("順序問題なし")
+    elif quiet:
+        lines.append(f"順序問題：{len(result['order_issues'])} 件")
+    else:
+        for idx, issue_desc in result['order_issues']:
+            lines.append(f"順序問題：第 {idx + 1} 行 - {issue_desc}")
+
+    if result['missing_cols']:
+        lines.append(f"ファイル {file_name} 必要列不足：{', '.join(result['missing_cols'])}、データ品質チェックをスキップ。")
+    elif quiet:
+        if result['issues']:
+            rows = len({idx for idx, _reason in result['issues']})
+            lines.append(f"ファイル {file_name}：問題 {len(result['issues'])} 件（{rows} 行）")
+    else:
+        for idx, reason in sorted(result['issues']):
+            lines.append(f"ファイル {file_name} の第 {idx + 1} 行に問題：{reason}")
+
+    print("\n".join(lines))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='itschool 视听记录数据检查')
+    parser.add_argument('--folder', default=folder_path, help='CSV 文件夹路径')
+    parser.add_argument('--stream', action='store_true',
+                        help='分块流式检查（超大文件用；要求输入已按开始时间排序）')
+    parser.add_argument('--chunksize', type=int, default=stream_chunk_size, help='流式模式每块行数')
+    parser.add_argument('--cross-file', action='store_true',
+                        help='额外检查同一用户不同课程文件之间的时间重叠')
+    parser.add_argument('--duplicates', action='store_true',
+                        help='额外检查整个文件夹内重复的视听记录（用户、レッスン、开始、结束相同）')
+    parser.add_argument('--quiet', action='store_true', help='不逐行打印问题，只打印每个文件的件数')
+    parser.add_argument('--stats', action='store_true', help='结束时打印各阶段/各规则的耗时与计数')
+    parser.add_argument('--stats-json', default=None, help='将耗时与计数导出为 JSON 文件')
+    parser.add_argument('--xlsx', action='store_true', help='另外输出问题行标红的 .xlsx（与 CSV 同名）')
+    parser.add_argument('--xlsx-dir', default=None, help='.xlsx 输出目录（缺省为 CSV 所在目录；指定即开启 --xlsx）')
+    args = parser.parse_args(argv)
+    if args.xlsx or args.xlsx_dir:
+        check_xlsx.require_openpyxl()
+
+    stats = check_stats.new_stats() if (args.stats or args.stats_json) else None
+
+    # 读取文件夹内所有 CSV
+    csv_files = glob.glob(os.path.join(args.folder, "*.csv"))
+
+    problematic_files = []
+    insufficient_data_files = []  # 数据量不足的文件
+    order_issue_files = []  # 顺序问题的文件
+
+    for file_path in csv_files:
+        xlsx_path = check_xlsx.xlsx_path_for(file_path, args.xlsx_dir) if (args.xlsx or args.xlsx_dir) else None
+        if args.stream:
+            result = check_file_streaming(file_path, args.chunksize, stats, xlsx_path)
         else:
-            try:
-                duration = timedelta(minutes=float(std_minutes))
-            except Exception:
-                duration = None
-                issues.add((orig_idx, "无效的标准观看时间：无法转为分钟"))
-
-        # 条件 1：结束 >= 开始 + 标准观看时间（用 datetime 比较，保留日期）
-        if duration is not None:
-            if end_dt < start_dt + duration:
-                issues.add((orig_idx, "条件 1 失败：结束时间早于“开始+标准观看时间”"))
-
-        # 条件 2：同一天时，下一条开始 > 上一条结束
-        if i > 0:
-            prev_row = work.iloc[i - 1]
-            prev_end = prev_row['_end_dt']
-            prev_start = prev_row['_start_dt']
-            if (prev_start is not None and prev_end is not None and
-                start_dt.date() == prev_start.date()):
-                if start_dt < prev_end:
-                    issues.add((orig_idx, "条件 2 失败：开始时间未晚于前一视频结束时间（同日）"))
-
-        # 条件 3：工作时段 + 工作日
-        if start_dt is not None and end_dt is not None:
-            if not is_valid_time_window(start_dt, end_dt):
-                issues.add((orig_idx, "条件 3 失败：时间超出有效工作时段（含12:00-13:00排除）"))
-            if not is_weekday_jp(start_dt.date()):
-                issues.add((orig_idx, "条件 3 失败：周末或日本节假日"))
-
-    # 有问题则记录文件名
-    if issues:
-        problematic_files.append(os.path.basename(file_path))
-
-    # 写高亮并保存
-    df['Highlight'] = ''
-    for idx, reason in issues:
-        # 允许多条原因覆盖；这里仅写一个标记，控制台打印详细原因
-        df.at[idx, 'Highlight'] = 'background-color: red'
-        print(f"ファイル {os.path.basename(file_path)} の第 {idx + 1} 行に問題：{reason}")
-
-    # 清理工作列
-    for col in ['_start_dt', '_end_dt', '_date_only', '_orig_idx']:
-        if col in df.columns:
-            df.drop(columns=[col], inplace=True)
-
-    # 保存回源文件
-    df.to_csv(file_path, index=False, encoding='utf-8-sig')
-
-# 汇总输出
-print("\n=== データ品質チェック結果 ===")
-if problematic_files:
-    print("\n以下のファイルにデータ品質問題があります：")
-    for f in problematic_files:
-        print(f"- {f}")
-else:
-    print("すべてのファイルのデータ品質は正常です。")
-
-print("\n=== データ量チェック結果 ===")
-if insufficient_data_files:
-    print("\n以下のファイルのデータ量が不足しています：")
-    for file_info in insufficient_data_files:
-        print(f"- {file_info['file']} (コース: {file_info['course']}) - 実際: {file_info['actual']} 件、要求: {file_info['required']} 件、不足: {file_info['missing']} 件")
-else:
-    print("すべてのファイルのデータ量は要求を満たしています。")
-
-print("\n=== 順序チェック結果 ===")
-if order_issue_files:
-    print("\n以下のファイルに順序問題があります：")
-    for f in order_issue_files:
-        print(f"- {f}")
-else:
-    print("すべてのファイルの順序は正常です。")
-
-print("\n=== コースデータ量要求設定 ===")
-for course, count in course_requirements.items():
-    print(f"- {course}: {count} 件")
+            result = check_file(file_path, stats, xlsx_path)
+        print_file_result(result, args.quiet)
+
+        is_sufficient, course_name, actual_count, required_count, missing_count = result['count']
+        if not is_sufficient:
+            insufficient_data_files.append({
+                'file': result['file'],
+                'course': course_name,
+                'actual': actual_count,
+                'required': required_count,
+                'missing': missing_count
+            })
+        if result['order_issues']:
+            order_issue_files.append(result['file'])
+        # 有问题则记录文件名
+        if result['issues']:
+            problematic_files.append(result['file'])
+
+    # 汇总输出
+    print("\n=== データ品質チェック結果 ===")
+    if problematic_files:
+        print("\n以下のファイルにデータ品質問題があります：")
+        for f in problematic_files:
+            print(f"- {f}")
+    else:
+        print("すべてのファイルのデータ品質は正常です。")
+
+    print("\n=== データ量チェック結果 ===")
+    if insufficient_data_files:
+        print("\n以下のファイルのデータ量が不足しています：")
+        for file_info in insufficient_data_files:
+            print(f"- {file_info['file']} (コース: {file_info['course']}) - 実際: {file_info['actual']} 件、要求: {file_info['required']} 件、不足: {file_info['missing']} 件")
+    else:
+        print("すべてのファイルのデータ量は要求を満たしています。")
+
+    print("\n=== 順序チェック結果 ===")
+    if order_issue_files:
+        print("\n以下のファイルに順序問題があります：")
+        for f in order_issue_files:
+            print(f"- {f}")
+    else:
+        print("すべてのファイルの順序は正常です。")
+
+    if args.cross_file:
+        print_cross_file_overlaps(check_cross_file_overlaps(csv_files, args.chunksize))
+    if args.duplicates:
+        print_duplicate_records(find_duplicate_records(csv_files, args.chunksize))
+
+    print("\n=== コースデータ量要求設定 ===")
+    for course, count in course_requirements.items():
+        print(f"- {course}: {count} 件")
+
+    if stats is not None:
+        check_stats.finish(stats)
+        if args.stats:
+            check_stats.print_summary(stats)
+        if args.stats_json:
+            check_stats.write_json(stats, args.stats_json)
+            print(f"\n統計を出力しました：{args.stats_json}")
+
+
+if __name__ == "__main__":
+    # Windows控制台UTF-8编码支持
+    if sys.platform == 'win32':
+        sys.stdout = codecs.getwriter("utf-8")(sys.stdout.detach())
+    main()
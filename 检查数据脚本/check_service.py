@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻检查服务：启动时一次性加载 pandas / holidays、构建节假日表和课程配置，
+之后每次检查只付出检查本身的时间（不再有每个文件数秒的启动开销）。
+
+监听 localhost HTTP（--port）或 Unix socket（--unix），接口：
+  GET  /health                       状态与运行时长
+  POST /check   JSON 请求体            检查服务器上的文件
+       {"path": "csv/itschool/xxx#コース.csv", "kind": "itschool" | "dxai",
+        "stream": false, "write_back": false, "xlsx": false}
+       write_back 默认 false：在临时副本上检查，不改动服务器上的 CSV；为 true 时原地写回 Highlight 列
+       xlsx 为 true 时在原 CSV 旁写出同名 .xlsx（与 write_back 无关），路径在返回 JSON 的 xlsx 中
+  POST /check?kind=itschool&name=xxx%23コース.csv   请求体为 CSV 内容（上传检查，不写回任何文件）
+       name 按 UTF-8 解码（百分号编码或直接写 UTF-8 均可）
+
+返回 JSON：文件名、数据量、顺序问题、时间问题（行号从 1 开始）及服务端耗时 elapsed_ms。
+HTTPServer 逐个处理请求，同一时间只有一个检查在写文件。
+
+使用：
+  python check_service.py --port 8765
+  curl -s localhost:8765/check -d '{"path": "csv/itschool/a#大規模言語モデル.csv"}'
+  curl -s localhost:8765/check --url-query "name=a#大規模言語モデル.csv" --data-binary @a.csv -H "Content-Type: text/csv"
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import socketserver
+import tempfile
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import check_data
+import check_xlsx
+import chack_data_dxai
+
+
+STARTED_AT = time.time()
+
+
+def warm_up():
+    """预热：节假日表（前后各一年）、pandas 的 CSV 解析路径"""
+    this_year = date.today().year
+    for year in range(this_year - 1, this_year + 2):
+        check_data.japan_holidays(year)
+    sample = "視聴開始時間,視聴完了時間,標準視聴時間\n2025/1/6 9:00,2025/1/6 9:30,0:25:00\n"
+    check_data.require_pandas()
+    chack_data_dxai.require_pandas()
+    df = check_data.pd.read_csv(io.StringIO(sample))
+    check_data.evaluate_time_rules(
+        list(df.index), check_data.value_parsing.datetime_column(df['視聴開始時間']),
+        check_data.value_parsing.datetime_column(df['視聴完了時間']),
+        check_data.value_parsing.hms_column(df['標準視聴時間']))
+
+
+def result_to_json(result) -> dict:
+    """检查结果（含 set / tuple）转为 JSON 友好的结构，行号从 1 开始"""
+    data = {
+        'file': result['file'],
+        'missing_cols': result['missing_cols'],
+        'issues': [{'row': idx + 1, 'reason': reason} for idx, reason in sorted(result['issues'])],
+    }
+    if 'count' in result:
+        is_sufficient, course_name, actual_count, required_count, missing_count = result['count']
+        data['count'] = {
+            'sufficient': is_sufficient, 'course': course_name, 'actual': actual_count,
+            'required': required_count, 'missing': missing_count,
+        }
+    if 'order_issues' in result:
+        data['order_issues'] = [{'row': idx + 1, 'reason': reason} for idx, reason in result['order_issues']]
+    return data
+
+
+def run_check(file_path, kind='itschool', stream=False, xlsx_path=None):
+    if kind == 'dxai':
+        return chack_data_dxai.check_file(file_path, xlsx_path=xlsx_path)
+    if stream:
+        return check_data.check_file_streaming(file_path, xlsx_path=xlsx_path)
+    return check_data.check_file(file_path, xlsx_path=xlsx_path)
+
+
+def check_path(request: dict) -> dict:
+    """检查服务器上的文件；默认（write_back=False）在临时副本上检查，xlsx 仍写在原文件旁"""
+    file_path = request.get('path')
+    if not file_path or not os.path.isfile(file_path):
+        raise FileNotFoundError(f"ファイルが見つかりません：{file_path}")
+    kind = request.get('kind', 'itschool')
+    stream = bool(request.get('stream', False))
+    xlsx_path = check_xlsx.xlsx_path_for(file_path) if request.get('xlsx', False) else None
+    if request.get('write_back', False):
+        data = result_to_json(run_check(file_path, kind, stream, xlsx_path))
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix='check_service_')
+        try:
+            tmp_path = os.path.join(tmp_dir, os.path.basename(file_path))
+            shutil.copyfile(file_path, tmp_path)
+            data = result_to_json(run_check(tmp_path, kind, stream, xlsx_path))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    if xlsx_path:
+        data['xlsx'] = xlsx_path
+    return data
+
+
+def check_upload(body: bytes, name: str, kind='itschool') -> dict:
+    """检查上传的 CSV 内容（文件名用于课程匹配），不写回任何文件"""
+    tmp_dir = tempfile.mkdtemp(prefix='check_service_')
+    try:
+        tmp_path = os.path.join(tmp_dir, os.path.basename(name) or 'upload.csv')
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        return result_to_json(run_check(tmp_path, kind))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def decode_query(raw: str) -> dict:
+    """
+    请求行按 latin-1 解码，直接写在 URL 里的 UTF-8 文件名会变成乱码：先还原为字节再按 UTF-8 解码
+    （百分号编码的部分是 ASCII，不受影响），之后再交给 parse_qs
+    """
+    try:
+        raw = raw.encode('latin-1').decode('utf-8')
+    except UnicodeError:
+        pass
+    return {k: v[-1] for k, v in parse_qs(raw).items()}
+
+
+class CheckHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self):
+        # Unix socket 的 client_address 是空字符串
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/health':
+            self._send_json(200, {'status': 'ok', 'uptime_sec': round(time.time() - STARTED_AT, 1)})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/check':
+            self._send_json(404, {'error': 'not found'})
+            return
+        query = decode_query(url.query)
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+        t0 = time.perf_counter()
+        try:
+            # 带 name 参数或 text/csv 时为上传检查，否则请求体为 JSON
+            if 'name' in query or self.headers.get('Content-Type', '').startswith('text/csv'):
+                payload = check_upload(body, query.get('name', 'upload.csv'), query.get('kind', 'itschool'))
+            else:
+                payload = check_path(json.loads(body.decode('utf-8') or '{}'))
+        except FileNotFoundError as e:
+            self._send_json(404, {'error': str(e)})
+            return
+        except Exception as e:
+            self._send_json(400, {'error': f"{type(e).__name__}: {e}"})
+            return
+        payload['elapsed_ms'] = round((time.perf_counter() - t0) * 1000.0, 2)
+        self._send_json(200, payload)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class UnixHTTPServer(socketserver.UnixStreamServer):
+    """HTTPServer 的 Unix socket 版本"""
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='常驻检查服务（localhost HTTP / Unix socket）')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', default=None, help='改为监听 Unix socket 路径')
+    parser.add_argument('--quiet', action='store_true', help='不输出访问日志')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    warm_up()
+    print(f"预热完成：{(time.perf_counter() - t0) * 1000.0:.0f} ms")
+
+    if args.unix:
+        if os.path.exists(args.unix):
+            os.remove(args.unix)
+        server = UnixHTTPServer(args.unix, CheckHandler)
+        print(f"监听 Unix socket：{args.unix}")
+    else:
+        server = HTTPServer((args.host, args.port), CheckHandler)
+        print(f"监听：http://{args.host}:{args.port}")
+    server.quiet = args.quiet
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+
+
+if __name__ == '__main__':
+    main()
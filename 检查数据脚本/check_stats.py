@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查脚本的计时与计数（check_data / chack_data_dxai 共用）
+
+按文件记录：
+- 各阶段耗时（read / order / parse / sort / rules / write）
+- 各规则耗时、评估行数、违规数
+结束时可导出 JSON（--stats-json），或打印汇总表（--stats）。
+
+所有记录函数都接受 None（未开启统计），此时不做任何事。
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+def new_stats() -> dict:
+    return {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'wall_sec': 0.0,
+        'files': {},
+        '_t0': time.perf_counter(),
+    }
+
+
+def file_stats(stats, file_name):
+    """取得（或创建）单个文件的记录；stats 为 None 时返回 None"""
+    if stats is None:
+        return None
+    return stats['files'].setdefault(file_name, {'rows': 0, 'phases': {}, 'rules': {}})
+
+
+def add_phase(rec, phase: str, sec: float):
+    if rec is None:
+        return
+    rec['phases'][phase] = rec['phases'].get(phase, 0.0) + sec
+
+
+@contextmanager
+def timed(rec, phase: str):
+    """计时一个阶段（同名阶段累加，流式模式逐块调用）"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase(rec, phase, time.perf_counter() - t0)
+
+
+def add_rows(rec, n: int):
+    if rec is None:
+        return
+    rec['rows'] += n
+
+
+def record_rule(rec, rule: str, evaluated: int, violations: int, sec: float):
+    if rec is None:
+        return
+    st = rec['rules'].setdefault(rule, {'evaluated': 0, 'violations': 0, 'sec': 0.0})
+    st['evaluated'] += evaluated
+    st['violations'] += violations
+    st['sec'] += sec
+
+
+def totals(stats) -> dict:
+    """汇总所有文件：{'rows', 'phases': {...}, 'rules': {...}}"""
+    rows = 0
+    phases = {}
+    rules = {}
+    for rec in stats['files'].values():
+        rows += rec['rows']
+        for phase, sec in rec['phases'].items():
+            phases[phase] = phases.get(phase, 0.0) + sec
+        for rule, st in rec['rules'].items():
+            acc = rules.setdefault(rule, {'evaluated': 0, 'violations': 0, 'sec': 0.0})
+            acc['evaluated'] += st['evaluated']
+            acc['violations'] += st['violations']
+            acc['sec'] += st['sec']
+    return {'rows': rows, 'phases': phases, 'rules': rules}
+
+
+def finish(stats):
+    """记录整次运行的墙钟时间（可重复调用，以最后一次为准）"""
+    stats['wall_sec'] = time.perf_counter() - stats['_t0']
+    return stats
+
+
+def to_dict(stats) -> dict:
+    data = {k: v for k, v in stats.items() if not k.startswith('_')}
+    data['totals'] = totals(stats)
+    return data
+
+
+def write_json(stats, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(to_dict(stats), f, ensure_ascii=False, indent=2)
+
+
+def print_summary(stats):
+    """打印汇总表（阶段耗时 + 规则耗时/评估数/违规数）"""
+    tot = totals(stats)
+    wall = stats['wall_sec']
+    lines = [
+        "",
+        "=== 実行統計 ===",
+        f"ファイル数: {len(stats['files'])}  行数: {tot['rows']}  総時間: {wall:.3f}s",
+        f"{'フェーズ':<10}{'秒':>10}{'割合':>8}",
+    ]
+    for phase, sec in tot['phases'].items():
+        share = sec / wall * 100.0 if wall > 0 else 0.0
+        lines.append(f"{phase:<12}{sec:>10.3f}{share:>7.1f}%")
+    lines.append(f"{'ルール':<10}{'秒':>10}{'評価':>10}{'違反':>10}")
+    for rule, st in tot['rules'].items():
+        lines.append(f"{rule:<12}{st['sec']:>10.3f}{st['evaluated']:>10}{st['violations']:>10}")
+    print("\n".join(lines))
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检查结果的 XLSX 输出（check_data / chack_data_dxai 共用）
+
+CSV 的 Highlight 列只能写文字标记，Excel 不会显示颜色；这里输出真正标红的 .xlsx：
+- 使用 openpyxl 的 write-only 模式逐行写出，内存占用不随行数增长
+- 问题行的所有单元格共用同一个红色填充样式
+- 问题行的 Highlight 列写该行未通过的规则（普通单元格，可筛选；不用批注：
+  write-only 模式下批注对象要留在内存里直到保存，问题行多时内存随之增长）
+
+安装依赖：
+  pip install openpyxl
+"""
+
+import math
+import os
+import sys
+
+# openpyxl 导入较慢，第一次写 .xlsx 时才加载（require_openpyxl）
+Workbook = WriteOnlyCell = PatternFill = None
+
+
+HIGHLIGHT_COLUMN = 'Highlight'
+REASON_SEPARATOR = ' / '
+
+
+def require_openpyxl():
+    global Workbook, WriteOnlyCell, PatternFill
+    if Workbook is not None:
+        return
+    try:
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import PatternFill
+    except Exception:
+        print("缺少 openpyxl，请先安装：pip install openpyxl", file=sys.stderr)
+        sys.exit(1)
+
+
+def xlsx_path_for(file_path, out_dir=None) -> str:
+    """与 CSV 同名的 .xlsx 路径（out_dir 缺省时放在 CSV 同目录）"""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    folder = out_dir or os.path.dirname(os.path.abspath(file_path))
+    return os.path.join(folder, stem + '.xlsx')
+
+
+def reasons_by_row(issues) -> dict:
+    """{(行号, 描述), ...} -> {行号: [描述, ...]}"""
+    grouped = {}
+    for idx, reason in issues:
+        grouped.setdefault(idx, []).append(reason)
+    return grouped
+
+
+def open_writer(path, header) -> dict:
+    require_openpyxl()
+    wb = Workbook(write_only=True)
+    # Excel 的工作表名最长 31 字符，且不能含 []:*?/\
+    title = ''.join(c for c in os.path.splitext(os.path.basename(path))[0] if c not in '[]:*?/\\')[:31]
+    ws = wb.create_sheet(title=title or 'Sheet1')
+    header = list(header)
+    ws.append(header)
+    return {
+        'wb': wb,
+        'ws': ws,
+        'path': path,
+        'width': len(header),
+        'highlight_col': header.index(HIGHLIGHT_COLUMN) if HIGHLIGHT_COLUMN in header else None,
+        'fill': PatternFill(start_color='FFFF0000', end_color='FFFF0000', fill_type='solid'),
+    }
+
+
+def _clean(value):
+    # NaN 写成空单元格
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def write_rows(writer, rows, reasons):
+    """
+    rows：可迭代的 (行号, 值序列)；reasons：{行号: [描述, ...]}
+    正常行直接写值，问题行逐格套用共享的红色填充，Highlight 列的值换成该行的原因
+    """
+    ws = writer['ws']
+    fill = writer['fill']
+    highlight_col = writer['highlight_col']
+    for idx, values in rows:
+        row_reasons = reasons.get(idx)
+        if not row_reasons:
+            ws.append([_clean(v) for v in values])
+            continue
+        cells = []
+        for col, value in enumerate(values):
+            if col == highlight_col:
+                value = REASON_SEPARATOR.join(sorted(row_reasons))
+            cell = WriteOnlyCell(ws, value=_clean(value))
+            cell.fill = fill
+            cells.append(cell)
+        ws.append(cells)
+
+
+def write_dataframe_rows(writer, df, reasons):
+    """写出 DataFrame（或分块）的全部行"""
+    write_rows(writer, zip(df.index, df.itertuples(index=False, name=None)), reasons)
+
+
+def close_writer(writer):
+    writer['wb'].save(writer['path'])
+
+
+def write_xlsx(path, df, issues):
+    """整表写出为标红的 .xlsx"""
+    writer = open_writer(path, df.columns)
+    write_dataframe_rows(writer, df, reasons_by_row(issues))
+    close_writer(writer)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+check_data 问题行的自动修复：对 itschool 视听记录计算最少的时间平移，使条件 0-3 成立
+- 条件 0：结束不早于开始、不跨日
+- 条件 1：结束 >= 开始 + 标准观看时间
+- 条件 2：同日内下一条开始不早于上一条结束
+- 条件 3：开始/结束落在 [9,12) ∪ [13,18)，且为工作日（非周末、非日本节假日）
+
+修复方式：
+- 本身满足条件 0、1、3 的行先作为已占用的时间段（检查脚本没有报告问题的行保持原样）
+- 按检查脚本相同的顺序（日期、开始时间）处理有问题的行：本身满足条件 0、1、3、
+  且不与其他占用重叠的行（如只有标准时间无效）保持原样；其余移到原开始时间之后、或同日上一段占用结束之后
+  最早的空档（不与任何已占用的时间段重叠），选平移量小的；时长保持原值，不足标准时间时补足到标准时间
+- 修复后的行也计入占用，之后的行避开它，因此只移动检查脚本报告的行，不会把没有问题的行连锁挤走
+- 时间格式无效、时长超过一个时段（5 小时）的行无法自动修复，原样保留并报告；
+  标准时间无效的行报告为无法修复，但仍按原时长参与其他条件的调整
+
+使用：
+  python repair_data.py --folder csv/itschool                  # 只输出差异，不改文件
+  python repair_data.py --file "xxx#コース.csv" --apply --diff diff.csv
+"""
+
+import argparse
+import csv
+import glob
+import math
+import os
+from datetime import datetime, timedelta, time
+from functools import lru_cache
+
+import pandas as pd
+
+import check_data
+
+
+START_COL = '視聴開始時間'
+END_COL = '視聴完了時間'
+STD_COL = '標準視聴時間'
+
+# 一个时段内能容纳的最长时长（13:00 开始，结束须早于 18:00）
+MAX_LENGTH_MIN = 5 * 60 - 1
+
+@lru_cache(maxsize=None)
+def is_business_day(d) -> bool:
+    return check_data.is_weekday_jp(d)
+
+
+def next_day_9(dt: datetime) -> datetime:
+    return datetime.combine(dt.date() + timedelta(days=1), time(9, 0))
+
+
+def earliest_slot(t: datetime, length: int):
+    """t 以后最早能放下 length 分钟的开始时间：
+    工作日，开始与结束都落在同一个时段（上午 9:00–11:59，下午 13:00–17:59）。
+    放不下（length 过长）返回 None。
+    """
+    if length > MAX_LENGTH_MIN:
+        return None
+    # 向上取整到分钟
+    if t.second or t.microsecond:
+        t = t.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    while True:
+        if not is_business_day(t.date()) or t.hour >= 18:
+            t = next_day_9(t)
+            continue
+        if t.hour < 9:
+            t = t.replace(hour=9, minute=0)
+        elif t.hour == 12:
+            t = t.replace(hour=13, minute=0)
+        seg_last = t.replace(hour=11, minute=59) if t.hour < 12 else t.replace(hour=17, minute=59)
+        if t + timedelta(minutes=length) <= seg_last:
+            return t
+        t = t.replace(hour=13, minute=0) if t.hour < 12 else next_day_9(t)
+
+
+def overlaps(busy: dict, start: datetime, end: datetime) -> list:
+    """busy（日期 → [(开始, 结束), ...]）中与 [start, end) 重叠的时间段的结束时间"""
+    return [e for s, e in busy.get(start.date(), ()) if s < end and start < e]
+
+
+def occupy(busy: dict, start: datetime, end: datetime) -> None:
+    """同日、结束不早于开始的时间段才计入占用（其余本身就违反条件 0，不参与重叠判断）"""
+    if end >= start and end.date() == start.date():
+        busy.setdefault(start.date(), []).append((start, end))
+
+
+def earliest_free_slot(t: datetime, length: int, busy: dict):
+    """t 以后最早能放下 length 分钟、且不与 busy 重叠的开始时间（规则同 earliest_slot）"""
+    while True:
+        slot = earliest_slot(t, length)
+        if slot is None:
+            return None
+        clash = overlaps(busy, slot, slot + timedelta(minutes=length))
+        if not clash:
+            return slot
+        t = max(clash)
+
+
+def format_like(original: str, dt: datetime) -> str:
+    """按原值的格式（横杠/斜杠、是否带秒）输出"""
+    s = str(original).strip()
+    with_sec = s.count(':') >= 2
+    if '-' in s:
+        return dt.strftime('%Y-%m-%d %H:%M:%S' if with_sec else '%Y-%m-%d %H:%M')
+    text = f"{dt.year}/{dt.month}/{dt.day} {dt.hour}:{dt.minute:02d}"
+    return text + ':00' if with_sec else text
+
+
+def row_is_compliant(start_dt, end_dt, std_minutes, cursor) -> bool:
+    """本行在当前“上一行结束”为 cursor 时是否满足条件 0-3"""
+    if cursor is not None and start_dt < cursor:
+        return False
+    for name, rule in check_data.TIME_RULES:
+        if name in ('cond2', 'std'):
+            continue
+        if rule(start_dt, end_dt, std_minutes, None, None) is not None:
+            return False
+    return True
+
+
+def evaluate_df(df: pd.DataFrame):
+    """解析时间列并按检查脚本的顺序（日期、开始时间，无效在后）评估条件 0-3
+    返回：(starts, ends, stds, order, issues)，order 为排序后的位置列表
+    """
+    starts = check_data.value_parsing.datetime_column(df[START_COL])
+    ends = check_data.value_parsing.datetime_column(df[END_COL])
+    stds = check_data.value_parsing.hms_column(df[STD_COL])
+    order = sorted(range(len(df)), key=lambda k: (
+        starts[k] is None, starts[k].date() if starts[k] else None, starts[k] or datetime.min))
+    issues, _prev = check_data.evaluate_time_rules(
+        [df.index[k] for k in order], [starts[k] for k in order],
+        [ends[k] for k in order], [stds[k] for k in order])
+    return starts, ends, stds, order, issues
+
+
+def plan_repairs(df: pd.DataFrame):
+    """
+    计算修复方案（不修改 df）
+    返回：(changes, unrepairable)
+      changes：[(行号, 新开始, 新结束, 检查脚本报告的原因列表), ...]；只包含检查脚本报告的行
+      unrepairable：[(行号, 原因), ...]
+    """
+    starts, ends, stds, order, issues = evaluate_df(df)
+
+    # 检查脚本的判定结果，用于标注修改原因
+    reasons_by_row = {}
+    for idx, reason in issues:
+        reasons_by_row.setdefault(idx, []).append(reason)
+
+    # 本身满足条件 0、1、3 的行先作为占用（其中没有问题的行原样保留）
+    busy = {}
+    for k in order:
+        if starts[k] is not None and ends[k] is not None and row_is_compliant(
+                starts[k], ends[k], stds[k] if check_data.std_duration(stds[k]) is not None else 0, None):
+            occupy(busy, starts[k], ends[k])
+
+    changes = []
+    unrepairable = []
+    for k in order:
+        idx = df.index[k]
+        if idx not in reasons_by_row:
+            continue
+        start_dt, end_dt, std_minutes = starts[k], ends[k], stds[k]
+
+        if start_dt is None or end_dt is None:
+            unrepairable.append((idx, check_data.REASON_FORMAT))
+            continue
+        std_valid = check_data.std_duration(std_minutes) is not None
+        if not std_valid:
+            # 标准时间无法修复，但时间段本身仍按其他条件调整
+            unrepairable.append((idx, "无效的标准观看时间"))
+            std_minutes = 0
+
+        if row_is_compliant(start_dt, end_dt, std_minutes, None):
+            # 先去掉本行自己的占用，仍不与其他行重叠则保持原样
+            busy[start_dt.date()].remove((start_dt, end_dt))
+            if not overlaps(busy, start_dt, end_dt):
+                occupy(busy, start_dt, end_dt)
+                continue
+
+        # 时长：保持原值，不足标准时间时补足
+        required = math.ceil(std_minutes)
+        original = None
+        if end_dt >= start_dt and end_dt.date() == start_dt.date():
+            original = int((end_dt - start_dt).total_seconds() // 60)
+        length = required if original is None or original < required else original
+        if length > MAX_LENGTH_MIN:
+            length = required
+
+        # 候选：原开始时间之后最早的空档 / 同日上一段占用结束之后最早的空档，选平移量小的
+        prev_ends = [e for _s, e in busy.get(start_dt.date(), ()) if e <= start_dt]
+        prev_end = max(prev_ends) if prev_ends else datetime.combine(start_dt.date(), time(9, 0))
+        candidates = []
+        for base in (start_dt, prev_end):
+            slot = earliest_free_slot(base, length, busy)
+            if slot is not None:
+                candidates.append((abs((slot - start_dt).total_seconds()), slot))
+        if not candidates:
+            unrepairable.append((idx, f"視聴時間 {length} 分が 1 つの時間帯に収まりません"))
+            occupy(busy, start_dt, end_dt)
+            continue
+        _shift, new_start = min(candidates, key=lambda c: c[0])
+        new_end = new_start + timedelta(minutes=length)
+        changes.append((idx, new_start, new_end, reasons_by_row[idx]))
+        occupy(busy, new_start, new_end)
+
+    return changes, unrepairable
+
+
+def repair_file(file_path, apply=False):
+    """
+    修复单个文件；apply 时写回源文件（其他列原样保留）
+    返回：{'file', 'diff': [...], 'unrepairable': [...], 'remaining': 修复后仍存在的时间问题数}
+    """
+    df = check_data.read_csv_file(file_path, dtype=str, keep_default_na=False)
+    file_name = os.path.basename(file_path)
+    result = {'file': file_name, 'diff': [], 'unrepairable': [], 'remaining': 0}
+    if any(col not in df.columns for col in (START_COL, END_COL, STD_COL)):
+        return result
+
+    changes, unrepairable = plan_repairs(df)
+    result['unrepairable'] = unrepairable
+
+    for idx, new_start, new_end, reasons in changes:
+        reason = ' / '.join(sorted(set(reasons)))
+        for col, new_dt in ((START_COL, new_start), (END_COL, new_end)):
+            old = df.at[idx, col]
+            new = format_like(old, new_dt)
+            if new != old:
+                result['diff'].append({
+                    'file': file_name, 'row': idx + 1, 'column': col,
+                    'before': old, 'after': new, 'reason': reason,
+                })
+                df.at[idx, col] = new
+
+    # 修复后再按检查脚本的规则核对一遍（不含无法修复的行）
+    _starts, _ends, _stds, _order, issues = evaluate_df(df)
+    skipped = {idx for idx, _reason in unrepairable}
+    result['remaining'] = len([1 for idx, _reason in issues if idx not in skipped])
+
+    if apply and result['diff']:
+        df.to_csv(file_path, index=False, encoding='utf-8-sig')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='check_data 问题行的自动修复（最少时间平移）')
+    parser.add_argument('--folder', default=check_data.folder_path, help='CSV 文件夹路径')
+    parser.add_argument('--file', action='append', default=None, help='只修复指定文件（可多次指定）')
+    parser.add_argument('--apply', action='store_true', help='将修复结果写回源文件（缺省只输出差异）')
+    parser.add_argument('--diff', default=None, help='差异输出 CSV 路径')
+    args = parser.parse_args()
+
+    csv_files = args.file or glob.glob(os.path.join(args.folder, "*.csv"))
+
+    all_diff = []
+    for file_path in csv_files:
+        result = repair_file(file_path, apply=args.apply)
+        all_diff.extend(result['diff'])
+        changed_rows = len({d['row'] for d in result['diff']})
+        print(f"\n=== ファイル {result['file']} の修正結果 ===")
+        print(f"修正行数：{changed_rows}")
+        lines = [f"第 {d['row']} 行 {d['column']}：{d['before']} → {d['after']}（{d['reason']}）"
+                 for d in result['diff']]
+        for idx, reason in result['unrepairable']:
+            lines.append(f"第 {idx + 1} 行は自動修正できません：{reason}")
+        if lines:
+            print("\n".join(lines))
+        if result['remaining']:
+            print(f"⚠ 修正後も時間の問題が {result['remaining']} 件残っています")
+
+    if args.diff:
+        with open(args.diff, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['file', 'row', 'column', 'before', 'after', 'reason'])
+            writer.writeheader()
+            writer.writerows(all_diff)
+        print(f"\n差分を出力しました：{args.diff}")
+    if not args.apply and all_diff:
+        print("\n※ --apply を指定するとファイルに書き戻します。")
+
+
+if __name__ == '__main__':
+    main()